@@ -0,0 +1,101 @@
+# benchmarks/bench_json.py
+"""
+Decode-and-parse microbenchmark for BattleMetrics server pages.
+
+    python benchmarks/bench_json.py --pages 200 --page-size 100
+
+Builds realistic /servers pages with the fake BattleMetrics server objects and compares:
+- the old path: json.loads on the text, then one info dict per server
+- each installed JSON backend on the raw bytes, then one ServerInfo record per server
+Times are per page; memory is what the parsed records of one page keep alive.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_battlemetrics import FakeBattleMetrics
+from src.services import json_codec
+from src.services.battlemetrics_api import _parse_server
+
+def legacy_parse(server: dict):
+    """
+    The info dict _parse_server built before ServerInfo records.
+    """
+    attributes = server.get("attributes", {})
+    relationships = server.get("relationships", {})
+    game_id = None
+    if 'game' in relationships and 'data' in relationships['game']:
+        game_id = relationships['game']['data'].get('id')
+    if game_id != "48815":
+        return {"error": "Not an Ark: Survival Ascended server"}
+    return {
+        "status": attributes.get("status"),
+        "name": attributes.get("name"),
+        "players": attributes.get("players"),
+        "maxPlayers": attributes.get("maxPlayers"),
+        "details": attributes.get("details", {}),
+        "gameId": game_id,
+        "id": server.get("id"),
+        "ip": attributes.get("ip"),
+        "port": attributes.get("port"),
+    }
+
+def make_pages(pages: int, page_size: int):
+    fake = FakeBattleMetrics()
+    return [json.dumps({"data": [fake.server(page * page_size + i + 1, page) for i in range(page_size)],
+                        "links": {}}).encode()
+            for page in range(pages)]
+
+def retained_bytes(parse_page, body: bytes):
+    """
+    Bytes still allocated after parsing one page and keeping only the parsed records.
+    """
+    tracemalloc.start()
+    records = parse_page(body)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return size
+
+def bench(name: str, parse_page, bodies, repeat: int):
+    parse_page(bodies[0]) # Warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for body in bodies:
+            parse_page(body)
+    per_page = (time.perf_counter() - started) / (repeat * len(bodies))
+    return {"path": name, "us_per_page": per_page * 1e6, "retained_kb": retained_bytes(parse_page, bodies[0]) / 1024}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark decoding and parsing BattleMetrics server pages.")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    bodies = make_pages(args.pages, args.page_size)
+
+    rows = [bench("json + dicts (old)",
+                  lambda body: [legacy_parse(server) for server in json.loads(body.decode())["data"]],
+                  bodies, args.repeat)]
+    for backend in ("json", "msgspec", "orjson"):
+        try:
+            _, loads = json_codec._select_backend(backend)
+        except ValueError:
+            continue
+        rows.append(bench(f"{backend} + ServerInfo",
+                          lambda body, loads=loads: [_parse_server(server) for server in loads(body)["data"]],
+                          bodies, args.repeat))
+
+    print(f"{len(bodies[0]) / 1024:.1f} KB per {args.page_size}-server page; default backend: {json_codec.BACKEND}")
+    baseline = rows[0]["us_per_page"]
+    print(f"{'path':>24} | {'us/page':>10} | {'speedup':>8} | {'retained KB':>12}")
+    for row in rows:
+        print(f"{row['path']:>24} | {row['us_per_page']:>10.1f} | {baseline / row['us_per_page']:>7.2f}x | {row['retained_kb']:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/bench_schema.py
+"""
+Compares the original population_data layout (TEXT server_id in every row, rowid table)
+with the migrated one (integer key into servers, WITHOUT ROWID).
+
+    python benchmarks/bench_schema.py --servers 200 --days 14
+
+It builds a database in the original layout from synthetic samples, copies it, and
+migrates the copy in place with init_db(). It then reports file sizes, the migration
+time, and the timings of the range scans the graph commands and retention run.
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+# Make config.py and src/ importable when run from anywhere
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from benchmarks.history import server_ids as make_server_ids, synthetic_history
+from src.utils import database
+
+LEGACY_QUERIES = {
+    "range": 'SELECT timestamp, population FROM population_data WHERE server_id = ? AND timestamp >= ? ORDER BY timestamp',
+    "multi": 'SELECT server_id, timestamp, population FROM population_data WHERE server_id IN ({}) AND timestamp >= ? '
+             'ORDER BY server_id, timestamp',
+}
+INTERNED_QUERIES = {
+    "range": 'SELECT p.timestamp, p.population FROM servers s JOIN population_data p ON p.server_key = s.id '
+             'WHERE s.server_id = ? AND p.timestamp >= ? ORDER BY p.timestamp',
+    "multi": 'SELECT s.server_id, p.timestamp, p.population FROM servers s JOIN population_data p ON p.server_key = s.id '
+             'WHERE s.server_id IN ({}) AND p.timestamp >= ? ORDER BY s.server_id, p.timestamp',
+}
+
+def build_legacy_db(path: str, args, end: int):
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE population_data (
+            server_id TEXT NOT NULL,
+            timestamp INTEGER NOT NULL,
+            population INTEGER NOT NULL,
+            PRIMARY KEY (server_id, timestamp)
+        )
+    ''')
+    samples = 0
+    for sweep in synthetic_history(args.servers, args.days, args.interval, end):
+        conn.executemany('INSERT INTO population_data VALUES (?, ?, ?)', sweep)
+        samples += len(sweep)
+    conn.commit()
+    conn.execute('VACUUM')
+    conn.close()
+    return samples
+
+def time_queries(path: str, queries, args, end: int):
+    conn = sqlite3.connect(path)
+    rng = random.Random(3)
+    server_ids = make_server_ids(args.servers)
+
+    def timed(sql, make_params, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(sql, make_params()).fetchall()
+        return (time.perf_counter() - started) / repeat * 1000 # ms per query
+
+    multi = min(20, args.servers)
+    results = {
+        "range_24h_ms": timed(queries["range"], lambda: (rng.choice(server_ids), end - 24 * 3600), args.reads),
+        "range_7d_ms": timed(queries["range"], lambda: (rng.choice(server_ids), end - 7 * 24 * 3600), args.reads),
+        "multi_24h_ms": timed(queries["multi"].format(", ".join("?" * multi)),
+                              lambda: (*rng.sample(server_ids, multi), end - 24 * 3600), max(1, args.reads // 5)),
+    }
+    started = time.perf_counter()
+    conn.execute('DELETE FROM population_data WHERE timestamp < ?', (end - (args.days * 24 - 1) * 3600,))
+    conn.commit()
+    results["prune_1h_ms"] = (time.perf_counter() - started) * 1000
+    conn.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the population_data schema migration.")
+    parser.add_argument("--servers", type=int, default=200)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--interval", type=int, default=60, help="Seconds between samples")
+    parser.add_argument("--reads", type=int, default=200, help="Queries per range benchmark")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        end = int(time.time())
+        legacy_path = os.path.join(workdir, "legacy.db")
+        samples = build_legacy_db(legacy_path, args, end)
+        config.DATABASE_FILE = os.path.join(workdir, "migrated.db")
+        shutil.copy(legacy_path, config.DATABASE_FILE)
+
+        started = time.perf_counter()
+        database.init_db()
+        migration_seconds = time.perf_counter() - started
+        database.close_db()
+
+        rows = {
+            "legacy": {"bytes": os.path.getsize(legacy_path), **time_queries(legacy_path, LEGACY_QUERIES, args, end)},
+            "migrated": {"bytes": os.path.getsize(config.DATABASE_FILE),
+                         **time_queries(config.DATABASE_FILE, INTERNED_QUERIES, args, end)},
+        }
+
+    print(f"{samples} samples, migrated in {migration_seconds:.1f}s")
+    columns = list(rows["legacy"])
+    print(" | ".join(f"{column:>14}" for column in ["schema"] + columns))
+    for name, row in rows.items():
+        print(" | ".join([f"{name:>14}"] + [f"{row[column]:>14.2f}" if isinstance(row[column], float)
+                                            else f"{row[column]:>14}" for column in columns]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/bench_storage.py
+"""
+Read/write benchmark for the raw population sample stores.
+
+    python benchmarks/bench_storage.py --servers 200 --days 7 --interval 60
+
+For each backend, it loads synthetic history and then measures:
+- collector-style sweeps: one sample per server, appended together
+- 24h and 7d reads for single servers
+- a 24h read for 20 servers at once
+- the size on disk
+Everything runs in a temporary directory.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Make config.py and src/ importable when run from anywhere
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from benchmarks.history import server_ids as make_server_ids, synthetic_history
+from src.utils import database
+from src.utils import timeseries
+
+def directory_size(path: str):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def timed(func, repeat: int):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000 # ms per call
+
+def bench_backend(backend: str, args, workdir: str):
+    config.DATABASE_FILE = os.path.join(workdir, backend, "pop_data.db")
+    config.POP_COLUMNAR_DIR = os.path.join(workdir, backend, "population")
+    database.close_db()
+    database.init_db()
+    store = timeseries.make_store(backend)
+    end = int(time.time())
+    sweeps = list(synthetic_history(args.servers, args.days, args.interval, end - args.sweeps * args.interval))
+    samples = sum(len(sweep) for sweep in sweeps)
+
+    # History goes in as one large append per server, like the migration tool
+    started = time.perf_counter()
+    with database.transaction() as cursor:
+        store.append(cursor, [row for sweep in sweeps for row in sweep])
+    load_seconds = time.perf_counter() - started
+
+    live = [[(sid, end - (args.sweeps - i) * args.interval, pop) for sid, _, pop in sweeps[i % len(sweeps)]]
+            for i in range(args.sweeps)]
+    started = time.perf_counter()
+    for sweep in live:
+        with database.transaction() as cursor:
+            store.append(cursor, sweep)
+    sweep_ms = (time.perf_counter() - started) / args.sweeps * 1000
+
+    rng = random.Random(2)
+    server_ids = make_server_ids(args.servers)
+
+    def read(ids, hours):
+        with database.transaction() as cursor:
+            store.read(cursor, ids, end - hours * 3600)
+
+    results = {
+        "backend": backend,
+        "samples": samples,
+        "load_samples_per_s": samples / load_seconds,
+        "sweep_ms": sweep_ms,
+        "read_24h_ms": timed(lambda: read([rng.choice(server_ids)], 24), args.reads),
+        "read_7d_ms": timed(lambda: read([rng.choice(server_ids)], 7 * 24), args.reads),
+        "read_24h_x20_ms": timed(lambda: read(rng.sample(server_ids, min(20, len(server_ids))), 24), max(1, args.reads // 5)),
+    }
+    database.close_db()
+    results["bytes_on_disk"] = directory_size(os.path.join(workdir, backend))
+    results["bytes_per_sample"] = results["bytes_on_disk"] / (samples + args.sweeps * args.servers)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the raw population sample stores.")
+    parser.add_argument("--servers", type=int, default=200)
+    parser.add_argument("--days", type=int, default=7, help="Days of history loaded before measuring")
+    parser.add_argument("--interval", type=int, default=60, help="Seconds between samples")
+    parser.add_argument("--sweeps", type=int, default=50, help="Live sweeps appended after the history")
+    parser.add_argument("--reads", type=int, default=100, help="Reads per read benchmark")
+    parser.add_argument("--backends", nargs="+", default=["sqlite", "columnar"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        rows = [bench_backend(backend, args, workdir) for backend in args.backends]
+
+    columns = list(rows[0])
+    print(" | ".join(f"{column:>18}" for column in columns))
+    for row in rows:
+        print(" | ".join(f"{value:>18.2f}" if isinstance(value, float) else f"{value:>18}" for value in row.values()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# benchmarks/fake_battlemetrics.py
+"""
+Local stand-in for the BattleMetrics /servers and /servers/{id} endpoints.
+
+    python benchmarks/fake_battlemetrics.py --port 8800 --latency 0.05 --rate-429 0.01
+
+Any numeric server ID exists. Collection requests without an ids whitelist return a
+fleet of 'fleet_size' ASA official servers. Pagination follows links.next like the real API.
+Sparse fieldsets (fields[server]=...) are honoured, and responses carry an ETag that
+If-None-Match can match for a 304.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import socket
+
+from aiohttp import web
+
+ASA_GAME_ID = "48815"
+MAPS = ("TheIsland", "ScorchedEarth", "TheCenter", "Aberration", "Extinction", "Ragnarok")
+
+def free_port():
+    """
+    Returns a TCP port that is free on localhost right now.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class FakeBattleMetrics:
+    """
+    - 'latency' seconds are added to every response.
+    - 'rate_429' is the fraction of requests answered with 429 and Retry-After: 'retry_after'.
+    - 'fleet_size' is the number of official servers listed by unfiltered collection requests.
+    - 'official' controls the details.official flag on every server.
+    - Populations change every 'drift_every' requests, so repeated polls in between get 304s.
+    Request counts and response body bytes are kept in 'stats'.
+    """
+    def __init__(self, latency: float = 0.0, rate_429: float = 0.0, retry_after: float = 1.0,
+                 fleet_size: int = 1000, official: bool = True, seed: int = 1, drift_every: int = 1):
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.fleet_size = fleet_size
+        self.official = official
+        self._rng = random.Random(seed)
+        self.drift_every = max(1, drift_every)
+        self.stats = {"requests": 0, "rate_limited": 0, "servers_returned": 0, "not_modified": 0, "bytes_sent": 0}
+        self._runner = None
+        self.base_url = None
+
+    def server(self, server_id: int, tick: int = 0):
+        """
+        A BattleMetrics server object. Population drifts with 'tick' so repeated polls see changes.
+        """
+        number = 2000 + server_id % 8000
+        return {
+            "type": "server",
+            "id": str(server_id),
+            "attributes": {
+                "name": f"NA-PVP-Official-{MAPS[server_id % len(MAPS)]}{number}",
+                "status": "online",
+                "players": (server_id * 7 + tick) % 71,
+                "maxPlayers": 70,
+                "ip": "127.0.0.1",
+                "port": 7777,
+                "details": {
+                    "official": self.official,
+                    # Roughly the size of the real blob, which polling never needs
+                    "map": MAPS[server_id % len(MAPS)],
+                    "modIds": [str(900000 + i) for i in range(12)],
+                    "rules": {f"rule{i}": i for i in range(40)},
+                },
+            },
+            "relationships": {"game": {"data": {"type": "game", "id": ASA_GAME_ID}}},
+        }
+
+    async def _begin(self):
+        """
+        Applies latency and the 429 rate. Returns a 429 response to send, or None.
+        """
+        self.stats["requests"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.rate_429 and self._rng.random() < self.rate_429:
+            self.stats["rate_limited"] += 1
+            return web.json_response({"errors": [{"status": "429"}]}, status=429,
+                                     headers={"Retry-After": str(self.retry_after)})
+        return None
+
+    def _respond(self, request, document: dict):
+        """
+        JSON response for 'document' after applying fields[server], or a 304 if the client
+        already has it.
+        """
+        fields = request.query.get("fields[server]")
+        if fields is not None:
+            wanted = set(fields.split(","))
+            servers = document["data"] if isinstance(document["data"], list) else [document["data"]]
+            for server in servers:
+                server["attributes"] = {k: v for k, v in server["attributes"].items() if k in wanted}
+                if "game" not in wanted:
+                    server.pop("relationships", None)
+        body = json.dumps(document).encode()
+        etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            self.stats["not_modified"] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        self.stats["bytes_sent"] += len(body)
+        return web.Response(body=body, content_type="application/json", headers={"ETag": etag})
+
+    async def list_servers(self, request):
+        limited = await self._begin()
+        if limited is not None:
+            return limited
+        query = request.query
+        size = min(100, int(query.get("page[size]", 10)))
+        offset = int(query.get("page[offset]", 0))
+        if "filter[ids][whitelist]" in query:
+            ids = [int(sid) for sid in query["filter[ids][whitelist]"].split(",") if sid.isdigit()]
+        else:
+            ids = range(1, self.fleet_size + 1)
+        page = ids[offset:offset + size]
+        links = {}
+        if offset + size < len(ids):
+            links["next"] = str(request.url.update_query({"page[offset]": str(offset + size)}))
+        self.stats["servers_returned"] += len(page)
+        tick = self.stats["requests"] // self.drift_every
+        return self._respond(request, {"data": [self.server(sid, tick) for sid in page], "links": links})
+
+    async def get_server(self, request):
+        limited = await self._begin()
+        if limited is not None:
+            return limited
+        server_id = request.match_info["server_id"]
+        if not server_id.isdigit():
+            return web.json_response({"errors": [{"status": "404"}]}, status=404)
+        self.stats["servers_returned"] += 1
+        return self._respond(request, {"data": self.server(int(server_id), self.stats["requests"] // self.drift_every)})
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_get("/servers", self.list_servers)
+        app.router.add_get("/servers/{server_id}", self.get_server)
+        return app
+
+    async def start(self, port: int = 0):
+        """
+        Starts serving on localhost and returns the base URL to use as BATTLEMETRICS_API_BASE.
+        """
+        port = port or free_port()
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", port).start()
+        self.base_url = f"http://127.0.0.1:{port}/servers/"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake BattleMetrics API on localhost.")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--fleet-size", type=int, default=1000)
+    args = parser.parse_args()
+    fake = FakeBattleMetrics(args.latency, args.rate_429, args.retry_after, args.fleet_size)
+    print(f"Serving fake BattleMetrics on http://127.0.0.1:{args.port}/servers/")
+    web.run_app(fake.make_app(), host="127.0.0.1", port=args.port, print=None)
+
+if __name__ == "__main__":
+    main()
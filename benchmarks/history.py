@@ -0,0 +1,22 @@
+# benchmarks/history.py
+"""
+Synthetic population history shared by the benchmarks.
+"""
+import random
+
+def server_ids(servers: int):
+    return [str(1000000 + i) for i in range(servers)]
+
+def synthetic_history(servers: int, days: float, interval: int, end: int, seed: int = 1):
+    """
+    Yields one sweep of (server_id, timestamp, population) rows per 'interval' seconds,
+    covering the 'days' before 'end'. Populations follow a daily curve with noise, like a real official server.
+    """
+    rng = random.Random(seed)
+    ids = server_ids(servers)
+    peaks = [rng.randint(10, 70) for _ in range(servers)]
+    start = int(end - days * 24 * 3600)
+    for timestamp in range(start - start % interval, end, interval):
+        hour = (timestamp // 3600) % 24
+        curve = 0.35 + 0.65 * abs(12 - hour) / 12
+        yield [(ids[i], timestamp, max(0, int(peaks[i] * curve) + rng.randint(-3, 3))) for i in range(servers)]
@@ -0,0 +1,344 @@
+# benchmarks/run.py
+"""
+Runs the benchmark suite against a local fake BattleMetrics and a scratch database,
+and prints the results as JSON so runs from different commits can be compared.
+
+    python benchmarks/run.py --output before.json
+    python benchmarks/run.py --only sweep render --sweep-sizes 100 1000
+    python benchmarks/run.py --compare before.json --output after.json
+
+Benchmarks: server_info, sweep, insert, week_query, render.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Make config.py and src/ importable when run from anywhere
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.fake_battlemetrics import FakeBattleMetrics, free_port
+from benchmarks.history import server_ids as make_server_ids, synthetic_history
+
+# config.py reads these at import, so point the bot at the fake before importing it.
+# An empty token keeps a real one from .env out of the benchmark.
+FAKE_PORT = free_port()
+os.environ["BATTLEMETRICS_API_BASE"] = f"http://127.0.0.1:{FAKE_PORT}/servers/"
+os.environ["BATTLEMETRICS_API_TOKEN"] = ""
+
+import config
+
+WORKDIR = tempfile.mkdtemp(prefix="asa-pop-bench-")
+config.DATABASE_FILE = os.path.join(WORKDIR, "pop_data.db")
+config.POP_COLUMNAR_DIR = os.path.join(WORKDIR, "population")
+config.GRAPH_CACHE_DIR = None
+
+from src.notifications.status_notifier import StatusNotifier
+from src.services import battlemetrics_api, http_client
+from src.services.rate_limiter import battlemetrics_limiter
+from src.utils import database, graph
+
+BENCHMARKS = ("server_info", "sweep", "insert", "week_query", "render")
+
+class StubBot:
+    """
+    Just enough of a discord.py Bot for StatusNotifier to run outside Discord.
+    """
+    def __init__(self):
+        self._ready = asyncio.Event() # Never set, so the cog's own loop never starts
+
+    async def wait_until_ready(self):
+        await self._ready.wait()
+
+    def get_user(self, user_id):
+        return None
+
+    async def fetch_user(self, user_id):
+        return None
+
+def p95(sorted_samples):
+    """
+    Nearest-rank 95th percentile of already sorted samples, so it is never below the median.
+    """
+    return sorted_samples[max(0, math.ceil(0.95 * len(sorted_samples)) - 1)]
+
+def timed_ms(func, repeat: int):
+    """
+    Runs 'func' 'repeat' times and returns the median and 95th percentile in milliseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {"median_ms": statistics.median(samples), "p95_ms": p95(samples)}
+
+def set_rate_limit(per_minute: float):
+    """
+    Replaces the shared BattleMetrics limiter settings; 0 means unthrottled.
+    """
+    per_minute = per_minute or 1e9
+    battlemetrics_limiter.set_rate(per_minute, int(min(per_minute, 1e6) / 4))
+
+async def bench_server_info(args, fake):
+    """
+    Uncached get_server_info() calls, 'concurrency' at a time, then cached lookups.
+    """
+    ids = [str(1000 + i) for i in range(args.requests)]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def one(server_id, use_cache):
+        async with semaphore:
+            started = time.perf_counter()
+            info = await battlemetrics_api.get_server_info(server_id, use_cache=use_cache)
+            latencies.append((time.perf_counter() - started) * 1000)
+            return info
+
+    before = fake.stats["requests"]
+    started = time.perf_counter()
+    infos = await asyncio.gather(*(one(server_id, False) for server_id in ids))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    results = {
+        "requests_per_s": len(ids) / elapsed,
+        "median_ms": statistics.median(latencies),
+        "p95_ms": p95(latencies),
+        "errors": sum(1 for info in infos if "error" in info),
+        "http_requests": fake.stats["requests"] - before,
+    }
+
+    await battlemetrics_api.get_server_info(ids[0])
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        await battlemetrics_api.get_server_info(ids[0])
+    results["cached_lookups_per_s"] = args.requests / (time.perf_counter() - started)
+    return results
+
+async def bench_sweep(args, fake, size: int):
+    """
+    One check_server_status_task pass over 'size' monitored servers: a cold pass
+    (first sighting of every server) and a warm pass with statuses already known.
+    """
+    with database.transaction() as cursor:
+        cursor.execute('DELETE FROM server_subscriptions')
+        cursor.execute('DELETE FROM monitored_servers')
+        cursor.executemany('INSERT INTO monitored_servers (server_id) VALUES (?)',
+                           [(str(i),) for i in range(1, size + 1)])
+        cursor.executemany('INSERT INTO server_subscriptions (server_id, user_id, created_at) VALUES (?, ?, 0)',
+                           [(str(i), i) for i in range(1, size + 1)])
+    # Every monitored server is due on the first tick and the budget covers all of them
+    config.STATUS_POLL_REQUESTS_PER_MINUTE = 1e9
+    fake.official = False # So the notifier records population itself
+    battlemetrics_api.server_info_cache.clear()
+
+    cog = StatusNotifier(StubBot())
+    try:
+        results = {}
+        for phase in ("cold", "warm"):
+            before = fake.stats["requests"]
+            bytes_before = fake.stats["bytes_sent"]
+            poller = cog.poller
+            poller.scheduler = type(poller.scheduler)(config.STATUS_POLL_MIN_INTERVAL, config.STATUS_POLL_MAX_INTERVAL,
+                                                      config.STATUS_POLL_VOLATILITY_WINDOW)
+            started = time.perf_counter()
+            await cog.check_server_status_task()
+            elapsed = time.perf_counter() - started
+            results[f"{phase}_s"] = elapsed
+            results[f"{phase}_servers_per_s"] = size / elapsed
+            results[f"{phase}_http_requests"] = fake.stats["requests"] - before
+            results[f"{phase}_http_bytes"] = fake.stats["bytes_sent"] - bytes_before
+        return results
+    finally:
+        await cog.cog_unload()
+        fake.official = True
+
+def bench_insert(args):
+    """
+    Queued insert_pop_data() calls flushed in one transaction, and collector-style bulk sweeps.
+    """
+    ids = make_server_ids(args.servers)
+    started = time.perf_counter()
+    for i in range(args.inserts):
+        database.insert_pop_data(ids[i % len(ids)], i % 70)
+    queued = time.perf_counter() - started
+    database.flush_writes()
+    total = time.perf_counter() - started
+
+    sweeps = list(synthetic_history(args.servers, 0.5, 600, int(time.time()) - 30 * 24 * 3600))
+    rows = sum(len(sweep) for sweep in sweeps)
+    bulk_started = time.perf_counter()
+    for sweep in sweeps:
+        database.insert_pop_data_bulk(sweep)
+    bulk = time.perf_counter() - bulk_started
+    return {
+        "queued_rows_per_s": args.inserts / queued,
+        "flushed_rows_per_s": args.inserts / total,
+        "bulk_rows_per_s": rows / bulk,
+        "bulk_sweep_ms": bulk / len(sweeps) * 1000,
+    }
+
+_history_loaded = False
+
+def ensure_history(args):
+    """
+    Loads 7 days of synthetic samples (raw + rollups) for 'history_servers' servers, once.
+    """
+    global _history_loaded
+    if _history_loaded:
+        return
+    rows = []
+    for sweep in synthetic_history(args.history_servers, 7, args.history_interval, int(time.time())):
+        rows.extend(sweep)
+        if len(rows) >= 50000:
+            database.insert_pop_data_bulk(rows)
+            rows = []
+    database.insert_pop_data_bulk(rows)
+    _history_loaded = True
+
+def bench_week_query(args):
+    ensure_history(args)
+    server_id = make_server_ids(args.history_servers)[0]
+    return {
+        "samples": len(database.get_pop_data_for_week(server_id)),
+        "get_pop_data_for_week": timed_ms(lambda: database.get_pop_data_for_week(server_id), args.reads),
+        "get_pop_arrays_for_hours_168": timed_ms(lambda: database.get_pop_arrays_for_hours(server_id, 7 * 24), args.reads),
+        "get_hourly_pop_arrays": timed_ms(lambda: database.get_hourly_pop_arrays(server_id), args.reads),
+    }
+
+def bench_render(args):
+    """
+    Renders from the same data the graph commands pass to the render pool.
+    The first call includes building the figure template.
+    """
+    ensure_history(args)
+    server_id = make_server_ids(args.history_servers)[0]
+    day = database.get_pop_arrays_for_hours(server_id, 24)
+    week = database.get_hourly_pop_arrays(server_id)
+    results = {}
+    for name, func, data in (("generate_day_graph", graph.generate_day_graph, day),
+                             ("generate_week_graph", graph.generate_week_graph, week)):
+        started = time.perf_counter()
+        first = func(server_id, data)
+        results[name] = {"first_ms": (time.perf_counter() - started) * 1000,
+                         "png_bytes": first[0].getbuffer().nbytes,
+                         **timed_ms(lambda: func(server_id, data), args.renders)}
+    return results
+
+async def run(args):
+    fake = FakeBattleMetrics(latency=args.latency, rate_429=args.rate_429, retry_after=args.retry_after)
+    await fake.start(FAKE_PORT)
+    set_rate_limit(args.rate_limit)
+    database.init_db()
+    results = {}
+    try:
+        for name in args.only:
+            print(f"Running {name}...", file=sys.stderr)
+            if name == "server_info":
+                results[name] = await bench_server_info(args, fake)
+            elif name == "sweep":
+                for size in args.sweep_sizes:
+                    results[f"sweep_{size}"] = await bench_sweep(args, fake, size)
+            elif name == "insert":
+                results[name] = bench_insert(args)
+            elif name == "week_query":
+                results[name] = bench_week_query(args)
+            elif name == "render":
+                results[name] = bench_render(args)
+    finally:
+        await http_client.close()
+        await fake.stop()
+        database.close_db()
+    results["fake_battlemetrics"] = dict(fake.stats)
+    return results
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+    except OSError:
+        return None, None
+    return commit or None, dirty
+
+def flatten(results, prefix=""):
+    """
+    {"a": {"b": 1}} -> {"a.b": 1}, numeric values only.
+    """
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+def print_comparison(old_report, new_report):
+    old, new = flatten(old_report["results"]), flatten(new_report["results"])
+    print(f"{'metric':<60} {'before':>12} {'after':>12} {'change':>8}", file=sys.stderr)
+    for metric, value in new.items():
+        if metric not in old:
+            continue
+        change = f"{(value - old[metric]) / old[metric] * 100:+.1f}%" if old[metric] else ""
+        print(f"{metric:<60} {old[metric]:>12.3f} {value:>12.3f} {change:>8}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and print JSON results.")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--sweep-sizes", nargs="+", type=int, default=[100, 1000, 10000])
+    parser.add_argument("--requests", type=int, default=500, help="get_server_info calls")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent get_server_info calls")
+    parser.add_argument("--inserts", type=int, default=50000, help="insert_pop_data calls")
+    parser.add_argument("--servers", type=int, default=1000, help="Servers written to by the insert benchmark")
+    parser.add_argument("--history-servers", type=int, default=20)
+    parser.add_argument("--history-interval", type=int, default=60, help="Seconds between synthetic samples")
+    parser.add_argument("--reads", type=int, default=50)
+    parser.add_argument("--renders", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake BattleMetrics response latency (s)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of fake requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=0.1)
+    parser.add_argument("--rate-limit", type=float, default=0, help="BattleMetrics requests/minute; 0 = unthrottled")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--compare", help="Earlier JSON report to compare against (printed to stderr)")
+    args = parser.parse_args()
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+    commit, dirty = git_revision()
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "started_at": started_at,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print_comparison(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,121 @@
+import time
+# Taken before the imports below (discord.py alone costs a few hundred ms) so startup timings include them
+PROCESS_STARTED = time.perf_counter()
+
 import discord
 from discord.ext import commands
 import config
 import logging
 import asyncio
 
-from src.commands.population import PopulationCommands
+# Cogs are not imported here: they are loaded from config.EXTENSIONS once the bot has logged in,
+# and the graph cog defers NumPy/matplotlib until after on_ready
+from src.services import http_client
+from src.utils import database
+from src.utils import executor
+from src.utils import metrics
+from src.utils.watchdog import watchdog
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def log_phase(name: str, started: float):
+    logger.info("Startup: %s took %.0f ms", name, (time.perf_counter() - started) * 1000)
+
+class PopBot(commands.Bot):
+    """
+    Loads the cogs listed in config.EXTENSIONS from setup_hook(), which discord.py runs between
+    login and connecting to the gateway. The database is initialized while the login request is
+    in flight, and the cogs wait for it since several read it as they load.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.db_ready = None # Set by main(): the init_database() task
+        self.connect_started = None
+        self.gateway_connected = False
+        self.ready_logged = False
+
+    async def setup_hook(self):
+        await self.db_ready
+        started = time.perf_counter()
+        for extension in config.EXTENSIONS:
+            extension_started = time.perf_counter()
+            await self.load_extension(extension)
+            log_phase(f"loading {extension}", extension_started)
+        log_phase("loading extensions", started)
+        self.connect_started = time.perf_counter()
+
 # Set up intents
 intents = discord.Intents.default()
 intents.message_content = True
 
 # Create bot instance
-bot = commands.Bot(command_prefix='/', intents=intents)
+bot = PopBot(command_prefix='/', intents=intents)
 
 # Events
+@bot.event
+async def on_connect():
+    if not bot.gateway_connected:
+        bot.gateway_connected = True
+        log_phase("gateway connect", bot.connect_started)
+        logger.info("Connected to the Discord gateway %.0f ms after process start",
+                    (time.perf_counter() - PROCESS_STARTED) * 1000)
+
 @bot.event
 async def on_ready():
     logger.info(f'Logged in as {bot.user}!')
+    if not bot.ready_logged:
+        bot.ready_logged = True
+        logger.info("Ready %.0f ms after process start", (time.perf_counter() - PROCESS_STARTED) * 1000)
 
 @bot.event
 async def on_command_error(ctx, error):
     await ctx.send(f"Error: {error}")
 
+async def init_database():
+    started = time.perf_counter()
+    # In a thread, so it overlaps the login request instead of holding up the event loop
+    await asyncio.to_thread(database.init_db)
+    log_phase("database initialization", started)
+
 # Main async entry point
 async def main():
-    logger.info("Adding cogs and starting bot...")
-    await bot.add_cog(PopulationCommands(bot))
+    log_phase("imports", PROCESS_STARTED)
+    if config.WATCHDOG_ENABLED:
+        # Started first so slow startup work is caught too
+        watchdog.start(asyncio.get_running_loop())
 
     token = config.DISCORD_BOT_TOKEN
     if not token:
         raise ValueError("DISCORD_BOT_TOKEN is not set in config.py or .env")
 
-    await bot.start(token)
+    logger.info("Initializing database and logging in...")
+    bot.db_ready = asyncio.create_task(init_database())
+    # Open the shared HTTP session before any cog can issue BattleMetrics requests
+    await http_client.start()
+    # Periodically writes any queued samples/status updates not flushed by the status loop
+    flusher = asyncio.create_task(database.write_flusher(config.DB_FLUSH_INTERVAL))
+    loop_lag_monitor = None
+    if config.METRICS_ENABLED:
+        await metrics.start_server()
+        loop_lag_monitor = asyncio.create_task(metrics.monitor_loop_lag(config.LOOP_LAG_INTERVAL))
+    try:
+        login_started = time.perf_counter()
+        await bot.login(token)
+        log_phase("login and setup", login_started)
+        await bot.connect()
+    finally:
+        flusher.cancel()
+        watchdog.stop()
+        if loop_lag_monitor is not None:
+            loop_lag_monitor.cancel()
+        await metrics.stop_server()
+        await http_client.close()
+        # Let an initialization still running in its thread finish before the connection is closed
+        await asyncio.gather(bot.db_ready, return_exceptions=True)
+        database.close_db()
+        executor.shutdown()
 
 # Standard Python entry point
 if __name__ == '__main__':
@@ -43,4 +123,4 @@ if __name__ == '__main__':
         logger.info("Starting Discord bot...")
         asyncio.run(main())
     except Exception as e:
-        logger.error(f"Error starting bot: {e}")
\ No newline at end of file
+        logger.error(f"Error starting bot: {e}")
@@ -0,0 +1,47 @@
+# src/cogs/population_collector.py
+import sqlite3
+import time
+from discord.ext import commands, tasks
+
+import config
+
+from ..services import population_collector
+from ..utils import metrics
+
+class PopulationCollector(commands.Cog):
+    """
+    Records population history for every ASA official server, independent of who is
+    subscribed to notifications, so graphs work for any official server from day one.
+    """
+    def __init__(self, bot):
+        self.bot = bot
+        self.collect_task.change_interval(minutes=config.COLLECTOR_INTERVAL_MINUTES)
+        self.collect_task.start()
+
+    async def cog_unload(self):
+        self.collect_task.cancel()
+
+    @tasks.loop(minutes=10)
+    async def collect_task(self):
+        started = time.monotonic()
+        try:
+            written, complete = await population_collector.collect_official_populations()
+        except sqlite3.Error as e:
+            # Not one of tasks.loop's reconnect exceptions, so it would end the loop for good.
+            # The sweep's samples stay queued and are written by the next flush.
+            print(f"Population sweep could not be saved: {e}")
+            return
+        elapsed = time.monotonic() - started
+        metrics.SWEEP_SECONDS.observe(elapsed, task="collector")
+        metrics.SWEEP_SERVERS.inc(written, task="collector")
+        print(f"Population sweep {'finished' if complete else 'partially finished'}: "
+              f"{written} servers recorded in {elapsed:.1f}s")
+        if elapsed > config.COLLECTOR_INTERVAL_MINUTES * 60:
+            print("Warning: population sweep took longer than COLLECTOR_INTERVAL_MINUTES; sweeps are falling behind.")
+
+    @collect_task.before_loop
+    async def before_collect_task(self):
+        await self.bot.wait_until_ready()
+
+async def setup(bot):
+    await bot.add_cog(PopulationCollector(bot))
@@ -0,0 +1,40 @@
+# src/cogs/server_index.py
+from discord.ext import commands, tasks
+
+import config
+
+from ..services import server_index
+from ..services.battlemetrics_api import BattleMetricsAPIError
+from ..utils import database
+from ..utils import executor
+
+class ServerIndexUpdater(commands.Cog):
+    """
+    Keeps the local ASA official server index up to date in the background.
+    """
+    def __init__(self, bot):
+        self.bot = bot
+        self.refresh_index_task.change_interval(hours=config.SERVER_INDEX_REFRESH_HOURS)
+        self.refresh_index_task.start()
+
+    async def cog_unload(self):
+        self.refresh_index_task.cancel()
+
+    @tasks.loop(hours=6)
+    async def refresh_index_task(self):
+        indexed_count = await executor.run_db(database.count_server_index, enforce_limit=False)
+        print(f"Refreshing ASA official server index ({indexed_count} servers indexed)...")
+        try:
+            indexed, pruned = await server_index.refresh_server_index()
+        except BattleMetricsAPIError as e:
+            # Keep the existing index; the rows already upserted this sweep are still valid
+            print(f"Server index refresh stopped early: {e}")
+            return
+        print(f"Server index refreshed: {indexed} servers indexed, {pruned} stale entries removed.")
+
+    @refresh_index_task.before_loop
+    async def before_refresh_index_task(self):
+        await self.bot.wait_until_ready()
+
+async def setup(bot):
+    await bot.add_cog(ServerIndexUpdater(bot))
@@ -0,0 +1,140 @@
+# src/commands/admin.py
+import asyncio
+import io
+import math
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+import discord
+from discord.ext import commands
+
+import config
+
+from ..utils import history_io
+from ..utils import watchdog
+
+class AdminCommands(commands.Cog):
+    """
+    Owner-only diagnostics for event-loop stalls, and population history export/import.
+    """
+    def __init__(self, bot):
+        self.bot = bot
+        self._profile_lock = asyncio.Lock()
+        # One export or import at a time; each can run for minutes on a large history
+        self._history_lock = asyncio.Lock()
+
+    @commands.command(name="profile", usage="[seconds]",
+                      help="Sample what the event loop is doing for a few seconds (bot owner only).")
+    @commands.is_owner()
+    async def profile(self, ctx, seconds: float = 10.0):
+        if self._profile_lock.locked():
+            await ctx.send("A profile is already running.")
+            return
+        seconds = max(1.0, min(seconds, config.PROFILE_MAX_SECONDS))
+        async with self._profile_lock:
+            await ctx.send(f"Profiling the event loop for {seconds:.0f}s...")
+            # The sampler runs on a worker thread and reads this (the loop's) thread's stack
+            loop_thread_id = threading.get_ident()
+            samples, folded = await asyncio.get_running_loop().run_in_executor(
+                None, watchdog.sample_profile, loop_thread_id, seconds, config.PROFILE_SAMPLE_INTERVAL
+            )
+        report = watchdog.format_profile(samples, folded)
+        file = discord.File(io.BytesIO(report.encode("utf-8")), filename="loop_profile.txt")
+        await ctx.send(f"Collected {samples} samples over {seconds:.0f}s.", file=file)
+
+    @commands.command(name="stalls", help="Show recent event-loop stalls and what caused them (bot owner only).")
+    @commands.is_owner()
+    async def stalls(self, ctx):
+        reports = list(watchdog.watchdog.reports)
+        if not reports:
+            await ctx.send(f"No event-loop stalls over {config.WATCHDOG_THRESHOLD:.2f}s recorded.")
+            return
+        msg = f"**Last {len(reports)} event-loop stalls:**\n"
+        for report in reports[-10:]:
+            at = datetime.fromtimestamp(report['at']).strftime('%Y-%m-%d %H:%M:%S')
+            msg += f"`{at}` blocked {report['blocked_for']:.2f}s by {report['task']}\n"
+        full = "\n\n".join(
+            f"{datetime.fromtimestamp(report['at'])} blocked {report['blocked_for']:.2f}s by {report['task']}\n{report['stack']}"
+            for report in reports
+        )
+        file = discord.File(io.BytesIO(full.encode("utf-8")), filename="loop_stalls.txt")
+        await ctx.send(msg[:1900], file=file)
+
+    @commands.command(name="exportpop", usage="[days] [csv|parquet]",
+                      help="Export population history (raw samples and rollups) as gzipped CSV or Parquet (bot owner only).")
+    @commands.is_owner()
+    async def exportpop(self, ctx, days: Optional[float] = 0, fmt: str = "csv"):
+        # Optional lets the days be left out: "/exportpop parquet" exports everything as Parquet
+        days = days or 0
+        fmt = fmt.lower()
+        if fmt not in history_io.FORMATS:
+            await ctx.send(f"Format must be one of: {', '.join(history_io.FORMATS)}.")
+            return
+        if not math.isfinite(days) or days < 0:
+            await ctx.send("Days must be 0 (all history) or a positive number.")
+            return
+        if self._history_lock.locked():
+            await ctx.send("An export or import is already running.")
+            return
+        since = max(0, int(time.time() - days * 24 * 3600)) if days > 0 else 0
+        filename = f"population_{datetime.now():%Y%m%d_%H%M%S}.{'csv.gz' if fmt == 'csv' else 'parquet'}"
+        path = os.path.join(config.EXPORT_DIR, filename)
+        async with self._history_lock:
+            await ctx.send(f"Exporting population history{f' for the last {days:g} days' if since else ''}...")
+            started = time.perf_counter()
+            # A plain thread rather than the DB pool: the export reads through its own connection
+            # and can take minutes, which would tie up one of the few DB threads commands rely on
+            exported = False
+            try:
+                counts = await asyncio.to_thread(history_io.export_population, path, fmt, since)
+                exported = True
+            except Exception as e: # pyarrow missing, disk full, DB error...
+                await ctx.send(f"Export failed: {e}")
+                return
+            finally:
+                if not exported and os.path.exists(path):
+                    os.remove(path) # Don't leave a partial export behind
+        msg = f"Exported {history_io.describe_counts(counts)} in {time.perf_counter() - started:.1f}s."
+        size_limit = ctx.guild.filesize_limit if ctx.guild else discord.utils.DEFAULT_FILE_SIZE_LIMIT_BYTES
+        if os.path.getsize(path) > size_limit:
+            await ctx.send(f"{msg} The file is too large to upload; it was saved on the bot host as `{path}`.")
+            return
+        await ctx.send(msg, file=discord.File(path, filename=filename))
+        os.remove(path) # Uploaded, so there is no need to keep it
+
+    @commands.command(name="importpop",
+                      help="Bulk-import population history from an attached .csv.gz or .parquet export (bot owner only).")
+    @commands.is_owner()
+    async def importpop(self, ctx):
+        if not ctx.message.attachments:
+            await ctx.send("Attach a .csv.gz or .parquet file made by /exportpop.")
+            return
+        attachment = ctx.message.attachments[0]
+        if not attachment.filename.endswith((".csv.gz", ".parquet")):
+            await ctx.send("Only .csv.gz and .parquet files can be imported.")
+            return
+        if self._history_lock.locked():
+            await ctx.send("An export or import is already running.")
+            return
+        async with self._history_lock:
+            os.makedirs(config.EXPORT_DIR, exist_ok=True)
+            path = os.path.join(config.EXPORT_DIR, f"import_{int(time.time())}_{os.path.basename(attachment.filename)}")
+            await attachment.save(path)
+            await ctx.send(f"Importing `{attachment.filename}`...")
+            started = time.perf_counter()
+            try:
+                # Its own connection, so only other writers wait; see database.import_history
+                counts = await asyncio.to_thread(history_io.import_population, path)
+            except (RuntimeError, ValueError, sqlite3.Error) as e: # pyarrow missing, not an export file, DB locked
+                await ctx.send(f"Import failed: {e}")
+                return
+            finally:
+                os.remove(path)
+        await ctx.send(f"Imported {history_io.describe_counts(counts)} in {time.perf_counter() - started:.1f}s.")
+
+async def setup(bot):
+    await bot.add_cog(AdminCommands(bot))
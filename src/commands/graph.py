@@ -1,33 +1,95 @@
 # src/commands/graph.py
+import asyncio
+import importlib
+import io
+import time
 import discord
 from discord.ext import commands
 
+import config
+
 # Relative imports from the src directory structure
 # Example: src/commands/graph.py -> src/ -> utils/database.py
 from ..utils import database
-from ..utils import graph # This imports the graph plotting functions
+from ..utils import executor
+from ..utils import metrics
+from ..utils.graph_cache import graph_cache, make_key
+
+BUSY_MESSAGE = "⏳ The bot is busy generating other graphs right now. Please try again in a moment."
+
+_graph = None
+
+async def load_graph():
+    """
+    Returns src/utils/graph.py, importing it in a worker thread the first time.
+    It pulls in NumPy and matplotlib, so it is kept out of startup and off the event loop.
+    """
+    global _graph
+    if _graph is None:
+        _graph = await asyncio.to_thread(importlib.import_module, "..utils.graph", __package__)
+    return _graph
+
+async def render_graph(kind: str, func, *args):
+    """
+    Runs a graph render on the render pool and records its time and PNG size.
+    The time is measured here, since renders happen in another process.
+    """
+    started = time.perf_counter()
+    result = await executor.run_render(func, *args)
+    metrics.GRAPH_RENDER_SECONDS.observe(time.perf_counter() - started, kind=kind)
+    if result[0] is not None:
+        metrics.GRAPH_PNG_BYTES.observe(result[0].getbuffer().nbytes, kind=kind)
+    return result
 
 class GraphCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self._prewarmed = False
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # on_ready fires again after reconnects; the render processes only need warming once
+        if self._prewarmed:
+            return
+        self._prewarmed = True
+        started = time.perf_counter()
+        try:
+            graph = await load_graph()
+            # One job per render process (the pool starts a new process while none are idle)
+            await asyncio.gather(*(executor.run_render(graph.prewarm, enforce_limit=False)
+                                   for _ in range(max(1, config.RENDER_PROCESS_POOL_SIZE))))
+            print(f"Graph rendering pre-warmed in {(time.perf_counter() - started) * 1000:.0f} ms")
+        except Exception as e:
+            print(f"Error pre-warming graph rendering: {e}")
 
     @commands.command(name='graphday', usage='<battlemetrics_server_id>')
     async def graph_day(self, ctx, server_id: str):
         """Shows a 24-hour population graph for the specified server."""
         await ctx.send(f"Generating daily graph for server `{server_id}`. This might take a moment...")
 
-        data = database.get_pop_data_for_hours(server_id, hours=24)
-
-        if len(data) < 2: # Need at least 2 points to draw a line
-            await ctx.send("Not enough data to generate a 24-hour graph yet. Please try again after some time or use `/pop` to record more data.")
-            return
-
         try:
-            graph_buffer, min_info_msg, max_info_msg = graph.generate_day_graph(server_id, data)
-            if graph_buffer is None:
-                await ctx.send("Failed to generate the daily graph image.")
+            graph = await load_graph()
+            # Both the query and the render run off the event loop
+            # Columnar NumPy arrays: cheap to build, and cheap to pickle to the render process
+            data = await executor.run_db(database.get_pop_arrays_for_hours, server_id, hours=24)
+
+            if graph.data_length(data) < 2: # Need at least 2 points to draw a line
+                await ctx.send("Not enough data to generate a 24-hour graph yet. Please try again after some time or use `/pop` to record more data.")
                 return
-            file = discord.File(graph_buffer, filename="day_pop_graph.png")
+
+            # Same server + same latest sample = same chart, so reuse the PNG when we can
+            cache_key = make_key(server_id, "day", data['timestamp'][-1])
+            cached = graph_cache.get(cache_key)
+            if cached:
+                png, (min_info_msg, max_info_msg) = cached
+            else:
+                graph_buffer, min_info_msg, max_info_msg = await render_graph("day", graph.generate_day_graph, server_id, data)
+                if graph_buffer is None:
+                    await ctx.send("Failed to generate the daily graph image.")
+                    return
+                png = graph_buffer.getvalue()
+                graph_cache.put(cache_key, png, (min_info_msg, max_info_msg))
+            file = discord.File(io.BytesIO(png), filename="day_pop_graph.png")
             
             await ctx.send(
                 f"**Daily Population Graph for {server_id}**\n"
@@ -35,6 +97,8 @@ class GraphCommands(commands.Cog):
                 f"**Lowest Pop:** {min_info_msg}",
                 file=file
             )
+        except executor.ExecutorBusy:
+            await ctx.send(BUSY_MESSAGE)
         except Exception as e:
             print(f"Error generating daily graph for {server_id}: {e}")
             await ctx.send(f"An error occurred while generating the graph: `{e}`")
@@ -45,29 +109,78 @@ class GraphCommands(commands.Cog):
         """Shows a 7-day population graph and weekly trends for the specified server."""
         await ctx.send(f"Generating weekly graph for server `{server_id}`. This might take a moment...")
 
-        data = database.get_pop_data_for_week(server_id)
-
-        # A more reasonable check for weekly data, e.g., at least 1 day's worth of points (24 entries)
-        if len(data) < 24:
-            await ctx.send("Not enough data to generate a 7-day graph yet. Please try again after more data has been collected.")
-            return
-
         try:
-            graph_buffer, summary_message = graph.generate_week_graph(server_id, data)
-            if graph_buffer is None:
-                await ctx.send("Failed to generate the weekly graph image.")
+            graph = await load_graph()
+            # One pre-aggregated row per hour, however often the server was polled
+            data = await executor.run_db(database.get_hourly_pop_arrays, server_id, hours=7 * 24)
+
+            # A more reasonable check for weekly data, e.g., at least 1 day's worth of hourly buckets (24 entries)
+            if graph.data_length(data) < 24:
+                await ctx.send("Not enough data to generate a 7-day graph yet. Please try again after more data has been collected.")
                 return
-            file = discord.File(graph_buffer, filename="week_pop_graph.png")
+
+            cache_key = make_key(server_id, "week", data['last_timestamp'][-1])
+            cached = graph_cache.get(cache_key)
+            if cached:
+                png, (summary_message,) = cached
+            else:
+                graph_buffer, summary_message = await render_graph("week", graph.generate_week_graph, server_id, data)
+                if graph_buffer is None:
+                    await ctx.send("Failed to generate the weekly graph image.")
+                    return
+                png = graph_buffer.getvalue()
+                graph_cache.put(cache_key, png, (summary_message,))
+            file = discord.File(io.BytesIO(png), filename="week_pop_graph.png")
             
             await ctx.send(
                 f"**Weekly Population Graph for {server_id}**\n"
                 f"{summary_message}",
                 file=file
             )
+        except executor.ExecutorBusy:
+            await ctx.send(BUSY_MESSAGE)
         except Exception as e:
             print(f"Error generating weekly graph for {server_id}: {e}")
             await ctx.send(f"An error occurred while generating the graph: `{e}`")
 
+    @commands.command(name='graphmulti', usage='<battlemetrics_server_id> [battlemetrics_server_id ...]')
+    async def graph_multi(self, ctx, *server_ids: str):
+        """Shows the last 24 hours of several servers on one graph."""
+        server_ids = list(dict.fromkeys(server_ids))
+        if len(server_ids) < 2:
+            await ctx.send("Please give at least two server IDs, e.g. `/graphmulti 1234567 7654321`.")
+            return
+        if len(server_ids) > config.GRAPH_MULTI_MAX_SERVERS:
+            await ctx.send(f"You can compare up to {config.GRAPH_MULTI_MAX_SERVERS} servers at once.")
+            return
+
+        await ctx.send(f"Generating comparison graph for {len(server_ids)} servers. This might take a moment...")
+
+        try:
+            graph = await load_graph()
+            # One query for every server's history instead of one per server
+            series = await executor.run_db(database.get_pop_arrays_for_servers, server_ids, hours=24)
+            names = await executor.run_db(database.get_server_names, server_ids)
+            series = {sid: data for sid, data in series.items() if graph.data_length(data) >= 2}
+            if not series:
+                await ctx.send("Not enough data to generate a comparison graph yet. Please try again after some time.")
+                return
+
+            graph_buffer, summary_message = await render_graph("multi", graph.generate_multi_graph, series, names)
+            if graph_buffer is None:
+                await ctx.send("Failed to generate the comparison graph image.")
+                return
+            missing = [sid for sid in server_ids if sid not in series]
+            if missing:
+                summary_message += "\nNot enough data yet for: " + ", ".join(f"`{sid}`" for sid in missing)
+            file = discord.File(graph_buffer, filename="multi_pop_graph.png")
+            await ctx.send(f"**Population Comparison**\n{summary_message}", file=file)
+        except executor.ExecutorBusy:
+            await ctx.send(BUSY_MESSAGE)
+        except Exception as e:
+            print(f"Error generating comparison graph for {server_ids}: {e}")
+            await ctx.send(f"An error occurred while generating the graph: `{e}`")
+
 # Standard Discord.py cog setup function
 async def setup(bot):
     await bot.add_cog(GraphCommands(bot))
\ No newline at end of file
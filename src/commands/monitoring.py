@@ -5,6 +5,7 @@ from discord.ext import commands
 # Relative imports from the src directory structure
 # Example: src/commands/monitoring.py -> src/ -> utils/database.py
 from ..utils import database
+from ..utils import executor
 from ..services import battlemetrics_api
 from src.services.battlemetrics_api import find_ark_server_by_number
 
@@ -21,7 +22,10 @@ class MonitoringCommands(commands.Cog):
             await ctx.send(f"Could not add server: {server_info['error']}")
             return
 
-        database.add_monitored_server(server_id, ctx.author.id)
+        added = await executor.run_db(database.add_monitored_server, server_id, ctx.author.id, enforce_limit=False)
+        if not added:
+            await ctx.send(f"You are already subscribed to online notifications for `{server_id}` ({server_info['name']}).")
+            return
         # Note: The in-memory cache in StatusNotifier will be updated on its next loop.
         # For immediate consistency, you could add an explicit update call to StatusNotifier if needed,
         # but the next background check will sync it.
@@ -30,10 +34,28 @@ class MonitoringCommands(commands.Cog):
 
     @commands.command(name='removeserverup', usage='<battlemetrics_server_id>')
     async def remove_server_up(self, ctx, server_id: str):
-        """Removes a server from online notification monitoring."""
-        database.remove_monitored_server(server_id)
+        """Removes your online notification subscription for a server."""
+        # Only the caller's subscription is removed; other users watching the server keep theirs
+        removed = await executor.run_db(database.remove_subscription, server_id, ctx.author.id, enforce_limit=False)
         # Note: Similar to add, the in-memory cache in StatusNotifier will sync on its next loop.
-        await ctx.send(f"Server `{server_id}` removed from online notifications.")
+        if not removed:
+            await ctx.send(f"You are not subscribed to online notifications for `{server_id}`.")
+            return
+        await ctx.send(f"Server `{server_id}` removed from your online notifications.")
+
+    @commands.command(name='myservers')
+    async def my_servers(self, ctx):
+        """Lists the servers you get online notifications for."""
+        server_ids = await executor.run_db(database.get_user_subscriptions, ctx.author.id, enforce_limit=False)
+        if not server_ids:
+            await ctx.send("You are not subscribed to any servers. Use `/addserverup <server_id>` to add one.")
+            return
+        names = await executor.run_db(database.get_server_names, server_ids, enforce_limit=False)
+        msg = "**Your online notifications:**\n"
+        for server_id in server_ids:
+            name = names.get(server_id)
+            msg += f"- `{server_id}`" + (f" ({name})" if name else "") + "\n"
+        await ctx.send(msg[:2000])
 
     @commands.command(name="monitorserver", help="Monitor an ARK server by its number.")
     async def monitorserver(self, ctx, server_number: str):
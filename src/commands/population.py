@@ -4,9 +4,13 @@ import discord
 from discord.ext import commands
 from src.services.battlemetrics_api import (
     find_ark_server_by_number,
+    get_cache_stats,
     get_server_info,
     search_asa_official_servers
 )
+from src.services import server_index
+from src.utils import database
+from src.utils import executor
 
 class PopulationCommands(commands.Cog):
     def __init__(self, bot):
@@ -19,20 +23,31 @@ class PopulationCommands(commands.Cog):
         """
         await ctx.send(f"Fetching population for `{server_id_or_number}`...")
 
-        # Try as BattleMetrics server ID first
-        server_info = await get_server_info(server_id_or_number)
-        if server_info.get("error"):
-            # If not found, try as Ark server number
-            server = await find_ark_server_by_number(server_id_or_number)
-            if not server:
+        if server_index.is_server_number(server_id_or_number):
+            # Ark server number: resolve locally, then a single lookup by BattleMetrics ID
+            server_id = await server_index.resolve_server_number(server_id_or_number)
+            if not server_id:
                 await ctx.send("❌ That server was not found or is not available.")
                 return
-            # Now get full info by BattleMetrics ID
-            server_id = server["id"]
             server_info = await get_server_info(server_id)
             if server_info.get("error"):
                 await ctx.send("❌ That server was not found or is not available.")
                 return
+        else:
+            # Try as BattleMetrics server ID first
+            server_info = await get_server_info(server_id_or_number)
+            if server_info.get("error"):
+                # If not found, try as Ark server number
+                server = await find_ark_server_by_number(server_id_or_number)
+                if not server:
+                    await ctx.send("❌ That server was not found or is not available.")
+                    return
+                # Now get full info by BattleMetrics ID
+                server_id = server["id"]
+                server_info = await get_server_info(server_id)
+                if server_info.get("error"):
+                    await ctx.send("❌ That server was not found or is not available.")
+                    return
 
         # --- Validation for Ark Survival Ascended Official servers only ---
         if str(server_info.get("gameId")) != "48815":
@@ -66,6 +81,9 @@ class PopulationCommands(commands.Cog):
         embed.add_field(name="Status", value=status.capitalize(), inline=True)
         embed.add_field(name="Players", value=f"{players}/{max_players}", inline=True)
         embed.add_field(name="Connect", value=f"`{ip}:{port}`", inline=False)
+        history = await self.history_summary(server_id)
+        if history:
+            embed.add_field(name="Last 30 Days", value=history, inline=False)
         embed.add_field(
             name="BattleMetrics Link",
             value=f"[View Server]({link})",
@@ -73,8 +91,34 @@ class PopulationCommands(commands.Cog):
         )
         await ctx.send(embed=embed)
 
+    async def history_summary(self, server_id: str, days: int = 30):
+        """
+        Average and peak population over the last 'days' from the daily rollups, or None without data
+        (or when the database is too busy to answer right away).
+        """
+        try:
+            rows = await executor.run_db(database.get_daily_pop_data, str(server_id), days)
+        except executor.ExecutorBusy:
+            return None
+        samples = sum(row['sample_count'] for row in rows)
+        if not samples:
+            return None
+        average = sum(row['population'] * row['sample_count'] for row in rows) / samples
+        peak = max(row['max_population'] for row in rows)
+        return f"Avg {average:.0f} players, peak {peak} ({len(rows)} days of data)"
+
     @commands.command(name='findasa', usage='<search_term>')
     async def findasa(self, ctx, *, search_term: str):
+        # Answered from the local server index; populations are as of the last index refresh
+        indexed = await server_index.search(search_term)
+        if indexed:
+            msg = "**Matching Ark Official Servers:**\n"
+            for entry in indexed:
+                msg += f"**{entry['name']}** (ID: `{entry['server_id']}`) - {entry['players']}/{entry['max_players']} players\n"
+            await ctx.send(msg)
+            return
+
+        # Index not built yet or no local match: ask BattleMetrics
         servers = await search_asa_official_servers(search_term)
         if not servers:
             await ctx.send("No Ark Official servers found for that search.")
@@ -90,14 +134,26 @@ class PopulationCommands(commands.Cog):
 
     @commands.command(name="findserver", help="Find an ARK server by its number.")
     async def findserver(self, ctx, server_number: str):
-        server = await find_ark_server_by_number(server_number)
-        if server:
-            name = server["attributes"]["name"]
-            players = server["attributes"]["players"]
-            max_players = server["attributes"]["maxPlayers"]
+        server_id = await server_index.resolve_server_number(server_number)
+        server_info = await get_server_info(server_id) if server_id else {"error": "Not found"}
+        if not server_info.get("error"):
+            name = server_info["name"]
+            players = server_info["players"]
+            max_players = server_info["maxPlayers"]
             await ctx.send(f"Found server: **{name}**\nPopulation: {players}/{max_players}")
         else:
             await ctx.send("Server not found.")
 
+    @commands.command(name="cachestats", help="Show BattleMetrics cache hit/miss counters (bot owner only).")
+    @commands.is_owner()
+    async def cachestats(self, ctx):
+        msg = "**BattleMetrics Cache Stats:**\n"
+        for cache_name, stats in get_cache_stats().items():
+            msg += (f"**{cache_name}**: {stats['size']}/{stats['max_size']} entries, "
+                    f"{stats['hits']} hits, {stats['misses']} misses, {stats['coalesced']} coalesced, "
+                    f"{stats['stale_hits']} stale, {stats['evictions']} evicted "
+                    f"({stats['hit_rate']:.0%} hit rate)\n")
+        await ctx.send(msg)
+
 async def setup(bot):
     await bot.add_cog(PopulationCommands(bot))
\ No newline at end of file
@@ -0,0 +1,69 @@
+# src/notifications/dm_sender.py
+import asyncio
+import time
+
+import discord
+
+import config
+
+from ..services.rate_limiter import TokenBucket
+from ..utils import metrics
+
+class DMSender:
+    """
+    Sends the same direct message to many users concurrently.
+    - A token bucket keeps the bot under Discord's global request rate (DM_RATE_PER_SECOND).
+    - discord.py's HTTP client already tracks each route's bucket (one per DM channel)
+      and waits on 429s, so per-route limits are respected without extra bookkeeping here.
+    - DM_CONCURRENCY caps how many sends are in flight at once.
+    """
+    def __init__(self, bot):
+        self.bot = bot
+        self.limiter = TokenBucket(config.DM_RATE_PER_SECOND * 60, config.DM_RATE_BURST)
+        self.semaphore = asyncio.Semaphore(config.DM_CONCURRENCY)
+
+    async def _resolve_user(self, user_id: int):
+        user = self.bot.get_user(user_id) # get_user is synchronous for cached users
+        if user is not None:
+            return user
+        await self.limiter.acquire()
+        try:
+            return await self.bot.fetch_user(user_id)
+        except discord.NotFound:
+            return None
+
+    async def send(self, user_id: int, content: str):
+        """
+        Sends one DM. Returns 'sent', 'forbidden' (DMs closed / bot blocked), 'missing' (unknown user) or 'failed'.
+        """
+        started = time.perf_counter()
+        result = await self._send(user_id, content)
+        metrics.DISCORD_SEND_SECONDS.observe(time.perf_counter() - started, result=result)
+        return result
+
+    async def _send(self, user_id: int, content: str):
+        async with self.semaphore:
+            try:
+                user = await self._resolve_user(user_id)
+                if user is None:
+                    return 'missing'
+                if user.dm_channel is None:
+                    # Opening the DM channel is its own request
+                    await self.limiter.acquire()
+                await self.limiter.acquire()
+                await user.send(content)
+                return 'sent'
+            except discord.Forbidden:
+                return 'forbidden'
+            except discord.HTTPException as e:
+                print(f"Failed to send DM to user {user_id}: {e}")
+                return 'failed'
+
+    async def send_many(self, user_ids, content: str):
+        """
+        Sends 'content' to every user in 'user_ids' concurrently.
+        Returns {user_id: result} with the results described in send().
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        results = await asyncio.gather(*(self.send(user_id, content) for user_id in user_ids))
+        return dict(zip(user_ids, results))
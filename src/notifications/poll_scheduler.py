@@ -0,0 +1,153 @@
+# src/notifications/poll_scheduler.py
+import heapq
+import math
+import time
+
+from ..utils import metrics
+
+class PollScheduler:
+    """
+    Decides when each monitored server is polled next.
+    - Servers live in a min-heap keyed by their next poll time; stale heap entries are skipped lazily.
+    - Each server's interval is derived from its current status, how recently it changed,
+      how often it has changed lately (volatility) and how many users are subscribed to it.
+    - pop_due() hands out at most 'budget' servers per call, most overdue first, so a burst of
+      due servers is spread over several ticks instead of exceeding the global request budget.
+    """
+    def __init__(self, min_interval: float, max_interval: float, volatility_window: float):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.volatility_window = volatility_window
+        self._heap = [] # (due, seq, server_id)
+        self._seq = 0
+        # {server_id: {'due', 'status', 'changed_at', 'changes', 'subscribers', 'interval'}}
+        self._servers = {}
+
+    def __len__(self):
+        return len(self._servers)
+
+    def _push(self, server_id: str, due: float):
+        self._servers[server_id]['due'] = due
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, server_id))
+
+    def sync(self, monitored_servers, now: float = None):
+        """
+        Brings the scheduled set in line with the monitored servers from the database.
+        New servers are due immediately; removed servers are dropped.
+        """
+        now = time.monotonic() if now is None else now
+        seen = set()
+        for server in monitored_servers:
+            server_id = server['server_id']
+            seen.add(server_id)
+            subscribers = len(server.get('subscriber_ids') or ())
+            state = self._servers.get(server_id)
+            if state is None:
+                self._servers[server_id] = {
+                    'status': None,
+                    'changed_at': None,
+                    'changes': [],
+                    'subscribers': subscribers,
+                    'interval': self.min_interval,
+                }
+                self._push(server_id, now)
+            else:
+                state['subscribers'] = subscribers
+        for server_id in [sid for sid in self._servers if sid not in seen]:
+            del self._servers[server_id]
+        # Rebuild once the heap is mostly stale entries
+        if len(self._heap) > 4 * len(self._servers) + 64:
+            self._heap = [entry for entry in self._heap
+                          if entry[2] in self._servers and self._servers[entry[2]]['due'] == entry[0]]
+            heapq.heapify(self._heap)
+
+    def pop_due(self, budget: int, now: float = None):
+        """
+        Returns up to 'budget' server IDs whose poll time has passed, most overdue first.
+        Returned servers stay unscheduled until record() or retry() is called for them.
+        """
+        now = time.monotonic() if now is None else now
+        due = []
+        while self._heap and len(due) < budget and self._heap[0][0] <= now:
+            entry_due, _, server_id = heapq.heappop(self._heap)
+            state = self._servers.get(server_id)
+            if state is None or state['due'] != entry_due:
+                continue # Removed or rescheduled since this entry was pushed
+            state['due'] = None
+            due.append(server_id)
+            metrics.POLL_LAG_SECONDS.observe(now - entry_due)
+        return due
+
+    def next_due_in(self, now: float = None):
+        """
+        Seconds until the next server is due (0 if one is overdue), or None if nothing is scheduled.
+        """
+        now = time.monotonic() if now is None else now
+        while self._heap:
+            entry_due, _, server_id = self._heap[0]
+            state = self._servers.get(server_id)
+            if state is not None and state['due'] == entry_due:
+                return max(0.0, entry_due - now)
+            heapq.heappop(self._heap)
+        return None
+
+    def compute_interval(self, state, now: float):
+        """
+        Picks the poll interval for a server from its recent history.
+        """
+        status = state['status']
+        since_change = math.inf if state['changed_at'] is None else now - state['changed_at']
+
+        if status == 'online':
+            # A server that just came back can crash again; stable ones only need the slow poll
+            interval = self.max_interval if since_change >= self.volatility_window else self.max_interval / 4
+        elif status == 'offline':
+            # Subscribers are waiting for this one to come back, so poll fast
+            # right after it went down and back off gradually if it stays down
+            interval = self.min_interval * (1 + since_change / self.volatility_window)
+        else:
+            # 'dead', 'unknown' or anything else BattleMetrics reports
+            interval = self.max_interval
+
+        # Each recent status flip halves the interval
+        interval /= 2 ** min(len(state['changes']), 4)
+        # Heavily watched servers are polled a bit more eagerly
+        interval /= 1 + math.log10(max(1, state['subscribers']))
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def record(self, server_id: str, status: str, now: float = None):
+        """
+        Records the status seen for a polled server and schedules its next poll.
+        Returns True if the status differs from the previously recorded one.
+        """
+        now = time.monotonic() if now is None else now
+        state = self._servers.get(server_id)
+        if state is None:
+            return False
+        changed = state['status'] is not None and status != state['status']
+        if changed:
+            state['changed_at'] = now
+            state['changes'].append(now)
+        state['changes'] = [t for t in state['changes'] if now - t < self.volatility_window]
+        state['status'] = status
+        state['interval'] = self.compute_interval(state, now)
+        self._push(server_id, now + state['interval'])
+        return changed
+
+    def retry(self, server_id: str, now: float = None):
+        """
+        Reschedules a server whose poll failed, keeping its current interval.
+        """
+        now = time.monotonic() if now is None else now
+        state = self._servers.get(server_id)
+        if state is not None:
+            self._push(server_id, now + state['interval'])
+
+    def stats(self):
+        intervals = sorted(state['interval'] for state in self._servers.values())
+        return {
+            "servers": len(intervals),
+            "median_interval": intervals[len(intervals) // 2] if intervals else None,
+            "min_interval": intervals[0] if intervals else None,
+        }
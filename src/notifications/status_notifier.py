@@ -1,114 +1,127 @@
 # src/cogs/status_notifier.py
-import discord
 from discord.ext import commands, tasks
 import asyncio
-from datetime import datetime
+
+import config
 
 # Relative imports for utils and services from src/
 # Example: src/cogs/status_notifier.py -> src/ -> utils/database.py
 from ..utils import database
-from ..services import battlemetrics_api
+from ..utils import executor
+from ..services.rate_limiter import battlemetrics_limiter
+from ..sharding import event_bus
+from ..sharding.worker import run_worker
+from .dm_sender import DMSender
+from .status_poller import StatusPoller
 
 class StatusNotifier(commands.Cog):
+    """
+    Sends "server up" DMs to every subscriber of a monitored server.
+    - With SHARD_COUNT = 0 the polling happens here, on a StatusPoller driven by the task loop.
+    - Otherwise polling workers (worker.py, or tasks in this process with the "memory" transport)
+      own a slice of the servers each, and this cog only consumes their status change events.
+    """
     def __init__(self, bot):
         self.bot = bot
-        # This dictionary stores the in-memory state of monitored servers
-        # {server_id: {'status': 'online/offline', 'name': 'Server Name'}}
-        self.last_known_server_statuses = {}
-        # The background task will be started once the bot is ready
-        self.check_server_status_task.start()
-        print("StatusNotifier Cog initialized. Background task scheduled.")
+        # Fans "server up" DMs out to every subscriber of a server
+        self.dm_sender = DMSender(bot)
+        self.poller = None
+        self.event_bus = None
+        self.worker_tasks = []
+        # At-least-once delivery means a worker may send an event again; repeats are dropped by id
+        self.seen_events = event_bus.RecentEventIds()
+        if config.SHARD_COUNT:
+            if config.SHARD_EVENT_TRANSPORT == "memory":
+                self.event_bus = event_bus.InMemoryEventBus()
+            else:
+                self.event_bus = event_bus.UnixSocketEventServer(config.SHARD_EVENT_SOCKET)
+            self.consume_events_task.start()
+            print(f"StatusNotifier Cog initialized. Polling is sharded across {config.SHARD_COUNT} workers.")
+        else:
+            self.poller = StatusPoller(self.handle_status_change)
+            self.check_server_status_task.change_interval(seconds=config.STATUS_POLL_TICK_SECONDS)
+            # The background task will be started once the bot is ready
+            self.check_server_status_task.start()
+            print("StatusNotifier Cog initialized. Background task scheduled.")
 
     # Special method called when the cog is loaded (after bot is ready)
     async def cog_load(self):
-        print("StatusNotifier Cog loaded. Loading initial server statuses from DB.")
-        # Load initial server statuses from DB into in-memory cache
-        monitored_servers_data = database.get_monitored_servers()
-        for server in monitored_servers_data:
-            self.last_known_server_statuses[server['server_id']] = {
-                'status': server['last_known_status'],
-                'name': f"Server {server['server_id']}" # Placeholder, will be updated by check_server_status_task
-            }
-        print(f"Loaded {len(self.last_known_server_statuses)} monitored servers into cache.")
+        if self.poller is not None:
+            print("StatusNotifier Cog loaded. Loading initial server statuses from DB.")
+            # Load initial server statuses from DB into in-memory cache
+            loaded = await self.poller.load_statuses()
+            print(f"Loaded {loaded} monitored servers into cache.")
+            return
+        await self.event_bus.start()
+        if config.SHARD_EVENT_TRANSPORT == "memory":
+            self.worker_tasks = [asyncio.create_task(run_worker(shard, config.SHARD_COUNT, self.event_bus))
+                                 for shard in range(config.SHARD_COUNT)]
+        else:
+            # The workers in other processes spend the rest of the BattleMetrics budget
+            battlemetrics_limiter.set_rate(config.BATTLEMETRICS_RATE_LIMIT_PER_MINUTE * (1 - config.SHARD_WORKER_RATE_SHARE),
+                                           config.BATTLEMETRICS_RATE_LIMIT_BURST)
 
     # Special method called when the cog is unloaded
     async def cog_unload(self):
         self.check_server_status_task.cancel()
+        self.consume_events_task.cancel()
+        for task in self.worker_tasks:
+            task.cancel()
+        if self.event_bus is not None:
+            await self.event_bus.close()
         print("StatusNotifier Cog unloaded. Background task cancelled.")
 
-    @tasks.loop(minutes=10) # Check every 10 minutes
+    @tasks.loop(seconds=10) # Short tick; the scheduler decides which servers are actually due
     async def check_server_status_task(self):
-        print(f"Running background server status check at {datetime.now()}")
-        monitored_servers = database.get_monitored_servers()
-        
-        for server_data in monitored_servers:
-            server_id = server_data['server_id']
-            notify_user_id = server_data['notify_user_id']
-            
-            # Get server info from BattleMetrics
-            server_info = await battlemetrics_api.get_server_info(server_id)
-
-            if server_info.get("error"):
-                print(f"Error checking server {server_id}: {server_info['error']}")
-                # Do not update status if there's an error, assume previous status holds
-                continue
-
-            current_status = server_info['status']
-            server_name = server_info['name']
-            current_players = server_info['players']
-            try:
-                current_players_int = int(current_players)
-            except (ValueError, TypeError):
-                print(f"Warning: Could not convert current_players '{current_players}' to int for server {server_id}. Skipping population data insert.")
-                current_players_int = 0
-
-            # Store current population data regardless of status change (for graphing)
-            database.insert_pop_data(server_id, current_players_int)
-
-            # Retrieve last known status from in-memory cache
-            last_status_info = self.last_known_server_statuses.get(server_id)
-
-            # Initialize or update cache if server was just added or bot restarted
-            if not last_status_info:
-                self.last_known_server_statuses[server_id] = {
-                    'status': current_status,
-                    'name': server_name
-                }
-                database.update_monitored_server_status(server_id, current_status)
-                continue # Skip notification on first check or after restart
-
-            prev_status = last_status_info['status']
-
-            # Check for status change: offline -> online
-            if prev_status == 'offline' and current_status == 'online':
-                user = self.bot.get_user(notify_user_id) # get_user is synchronous for cached users
-                if user:
-                    try:
-                        await user.send(f"🎉 **Server Up Notification!** 🎉\n"
-                                        f"Your monitored server **{server_name}** (`{server_id}`) is now **online**!\n"
-                                        f"Current population: {current_players}/{server_info['maxPlayers']}")
-                        print(f"Sent server up notification for {server_id} to user {user.name}")
-                    except discord.Forbidden:
-                        print(f"Could not send DM to {user.name}. User has DMs disabled or blocked bot.")
-                        # Optionally: remove monitoring for this user if DMs consistently fail,
-                        # but be careful not to spam if it's a temporary block.
-                else:
-                    print(f"User {notify_user_id} not found for server {server_id}. Removing from monitoring.")
-                    database.remove_monitored_server(server_id) # Clean up if user is gone
-
-            # Update last known status in memory and DB
-            self.last_known_server_statuses[server_id]['status'] = current_status
-            self.last_known_server_statuses[server_id]['name'] = server_name # Update name just in case
-            database.update_monitored_server_status(server_id, current_status)
-
-        # Add a small delay to respect API rate limits (even if BattleMetrics allows more)
-        await asyncio.sleep(5) 
+        await self.poller.tick()
+
+    @tasks.loop(seconds=0)
+    async def consume_events_task(self):
+        # One event at a time: DMs share one global rate limit, so overlapping fan-outs wouldn't finish sooner
+        event = await self.event_bus.get()
+        if self.seen_events.seen(event):
+            print(f"Dropping repeated shard event {event.get('id')} for server {event.get('server_id')}")
+            return
+        try:
+            await self.handle_status_change(event)
+        except Exception as e:
+            print(f"Error handling shard event {event}: {e}")
+
+    async def handle_status_change(self, event):
+        """
+        Sends the "server up" notification when a server went from offline to online.
+        'event' is a status change from StatusPoller, polled here or received from a worker.
+        """
+        if event.get('type') != 'status_change' or not (event['previous'] == 'offline' and event['status'] == 'online'):
+            return
+        server_id = event['server_id']
+        # The server was fetched once by the poller; the same message goes to every subscriber
+        results = await self.dm_sender.send_many(
+            event['subscriber_ids'],
+            f"🎉 **Server Up Notification!** 🎉\n"
+            f"Your monitored server **{event['name']}** (`{server_id}`) is now **online**!\n"
+            f"Current population: {event['players']}/{event['max_players']}"
+        )
+        sent = sum(1 for result in results.values() if result == 'sent')
+        forbidden = sum(1 for result in results.values() if result == 'forbidden')
+        missing = [user_id for user_id, result in results.items() if result == 'missing']
+        print(f"Sent server up notification for {server_id} to {sent}/{len(results)} subscribers"
+              f" ({forbidden} with DMs disabled, {len(missing)} not found).")
+        # Users with DMs disabled keep their subscription, since the block may be temporary
+        if missing:
+            print(f"Removing subscriptions for {len(missing)} users that no longer exist.")
+            await executor.run_db(database.remove_user_subscriptions, missing, enforce_limit=False) # Clean up if users are gone
 
     @check_server_status_task.before_loop
     async def before_check_server_status_task(self):
         # Wait until the bot is connected and ready before starting the task
         await self.bot.wait_until_ready()
 
+    @consume_events_task.before_loop
+    async def before_consume_events_task(self):
+        # DMs need the gateway; events wait in the channel until then
+        await self.bot.wait_until_ready()
+
 # Standard Discord.py cog setup function
 async def setup(bot):
-    await bot.add_cog(StatusNotifier(bot))
\ No newline at end of file
+    await bot.add_cog(StatusNotifier(bot))
@@ -0,0 +1,183 @@
+# src/notifications/status_poller.py
+import asyncio
+import time
+import uuid
+from datetime import datetime
+
+import config
+
+from ..utils import database
+from ..utils import executor
+from ..utils import metrics
+from ..services import battlemetrics_api
+from .poll_scheduler import PollScheduler
+
+class StatusPoller:
+    """
+    Polls monitored servers on the PollScheduler's timetable, records their population and
+    status, and reports every status change to 'on_status_change' as an event dict:
+    {'type': 'status_change', 'id', 'server_id', 'name', 'previous', 'status', 'players',
+     'max_players', 'subscriber_ids', 'at'}
+    'id' is unique per change, so consumers can drop events a worker sends twice.
+    The StatusNotifier cog runs one in the Discord process. With sharding, each polling worker
+    runs one restricted to its slice of the servers ('owns') and publishes the events instead.
+    """
+    def __init__(self, on_status_change, owns=None, budget_share: float = 1.0):
+        self.on_status_change = on_status_change
+        self.owns = owns # server_id -> bool; None polls every monitored server
+        self.budget_share = budget_share # Fraction of STATUS_POLL_REQUESTS_PER_MINUTE this poller may spend
+        # This dictionary stores the in-memory state of monitored servers
+        # {server_id: {'status': 'online/offline', 'name': 'Server Name'}}
+        self.last_known_server_statuses = {}
+        # Caps how many server checks (BattleMetrics requests, DB writes, notifications) run at once
+        self.check_semaphore = asyncio.Semaphore(config.STATUS_CHECK_CONCURRENCY)
+        # Gives every monitored server its own next-poll time instead of one fixed interval
+        self.scheduler = PollScheduler(config.STATUS_POLL_MIN_INTERVAL, config.STATUS_POLL_MAX_INTERVAL,
+                                       config.STATUS_POLL_VOLATILITY_WINDOW)
+
+    async def _monitored_servers(self):
+        monitored_servers = await executor.run_db(database.get_monitored_servers, enforce_limit=False)
+        if self.owns is None:
+            return monitored_servers
+        return [server for server in monitored_servers if self.owns(server['server_id'])]
+
+    async def load_statuses(self):
+        """
+        Loads the last known statuses from the database into the in-memory cache.
+        Returns the number of servers loaded.
+        """
+        for server in await self._monitored_servers():
+            self.last_known_server_statuses[server['server_id']] = {
+                'status': server['last_known_status'],
+                'name': f"Server {server['server_id']}" # Placeholder, will be updated by the next poll
+            }
+        return len(self.last_known_server_statuses)
+
+    def poll_budget(self):
+        """
+        Max servers polled per tick, so polling stays within its share of STATUS_POLL_REQUESTS_PER_MINUTE
+        (each bulk request covers up to MAX_PAGE_SIZE servers).
+        """
+        requests_per_tick = config.STATUS_POLL_REQUESTS_PER_MINUTE * self.budget_share * config.STATUS_POLL_TICK_SECONDS / 60
+        return max(1, int(requests_per_tick)) * battlemetrics_api.MAX_PAGE_SIZE
+
+    async def tick(self):
+        """
+        Polls the servers that are due, then flushes their samples and status updates to disk.
+        If the tick fails part way, servers it didn't get to are retried after their interval.
+        """
+        monitored_servers = await self._monitored_servers()
+        self.scheduler.sync(monitored_servers)
+        due_ids = self.scheduler.pop_due(self.poll_budget())
+        if not due_ids:
+            return
+        print(f"Running background server status check for {len(due_ids)} servers at {datetime.now()}")
+        started = time.perf_counter()
+        servers_by_id = {server_data['server_id']: server_data for server_data in monitored_servers}
+        monitored_servers = [servers_by_id[server_id] for server_id in due_ids]
+        rescheduled = set()
+        try:
+            # One bulk request per page of servers instead of one request per server, asking only for
+            # the fields polling reads. Pacing is handled by the shared BattleMetrics rate limiter
+            server_infos = await battlemetrics_api.get_server_records_bulk(
+                due_ids, concurrency=config.STATUS_CHECK_CONCURRENCY, fields=battlemetrics_api.STATUS_FIELDS
+            )
+            # Official servers are already recorded by the fleet-wide collector when it's enabled.
+            # The sparse response has no 'details.official', but the official server index knows.
+            collected_ids = (await executor.run_db(database.get_indexed_server_ids, due_ids, enforce_limit=False)
+                             if config.COLLECTOR_ENABLED else set())
+
+            async def check(server_data):
+                server_info = server_infos.get(server_data['server_id'], {"error": "No data returned"})
+                async with self.check_semaphore:
+                    await self.process_server_status(server_data, server_info,
+                                                     collected=server_data['server_id'] in collected_ids)
+                if server_info.get("error"):
+                    self.scheduler.retry(server_data['server_id'])
+                else:
+                    self.scheduler.record(server_data['server_id'], server_info.status)
+                rescheduled.add(server_data['server_id'])
+
+            await asyncio.gather(*(check(server_data) for server_data in monitored_servers))
+        finally:
+            # pop_due() unscheduled these servers; any this tick didn't get to (the bulk fetch
+            # or a check raised) would otherwise never be polled again
+            for server_id in due_ids:
+                if server_id not in rescheduled:
+                    self.scheduler.retry(server_id)
+
+        # Every sample and status update from this tick goes to disk in one transaction
+        await executor.run_db(database.flush_writes, enforce_limit=False)
+        metrics.SWEEP_SECONDS.observe(time.perf_counter() - started, task="status")
+        metrics.SWEEP_SERVERS.inc(len(due_ids), task="status")
+
+    async def process_server_status(self, server_data, server_info, collected: bool = False):
+        """
+        Records population and status for one monitored server, given the ServerInfo record (or
+        error dict) fetched for it during this tick, and reports the change if its status changed.
+        A server whose status hasn't changed is sampled at most every STATUS_SAMPLE_INTERVAL, and
+        polls in between are skipped entirely (no writes, no event). Every sample goes to the
+        rollups; the database keeps only population changes and heartbeats as raw rows.
+        'collected' servers are sampled by the fleet-wide collector, so only their status is kept here.
+        """
+        server_id = server_data['server_id']
+
+        if server_info.get("error"):
+            print(f"Error checking server {server_id}: {server_info['error']}")
+            # Do not update status if there's an error, assume previous status holds
+            return
+
+        current_status = server_info.status
+        server_name = server_info.name
+        current_players = server_info.players
+        try:
+            current_players_int = int(current_players)
+        except (ValueError, TypeError):
+            print(f"Warning: Could not convert current_players '{current_players}' to int for server {server_id}. Skipping population data insert.")
+            current_players_int = 0
+
+        # Retrieve last known status from in-memory cache
+        last_status_info = self.last_known_server_statuses.get(server_id)
+        now = time.time()
+
+        # Population is sampled at most every STATUS_SAMPLE_INTERVAL even though volatile servers
+        # are polled much more often. Unchanged samples are still recorded: evenly spaced samples
+        # keep the hourly/daily averages time-weighted, and the database drops them from raw storage
+        if (last_status_info and last_status_info['status'] == current_status
+                and now - last_status_info.get('sampled_at', 0) < config.STATUS_SAMPLE_INTERVAL):
+            return
+
+        # Store current population data (for graphing)
+        if not collected:
+            database.insert_pop_data(server_id, current_players_int)
+
+        # Initialize or update cache if server was just added or bot restarted
+        if not last_status_info:
+            self.last_known_server_statuses[server_id] = {
+                'status': current_status,
+                'name': server_name,
+                'sampled_at': now
+            }
+            database.update_monitored_server_status(server_id, current_status)
+            return # Skip notification on first check or after restart
+
+        prev_status = last_status_info['status']
+        if prev_status != current_status:
+            await self.on_status_change({
+                'type': 'status_change',
+                'id': uuid.uuid4().hex,
+                'server_id': server_id,
+                'name': server_name,
+                'previous': prev_status,
+                'status': current_status,
+                'players': current_players,
+                'max_players': server_info.max_players,
+                'subscriber_ids': list(server_data['subscriber_ids']),
+                'at': int(time.time()),
+            })
+
+        # Update last known status in memory and DB
+        last_status_info['status'] = current_status
+        last_status_info['name'] = server_name # Update name just in case
+        last_status_info['sampled_at'] = now
+        database.update_monitored_server_status(server_id, current_status)
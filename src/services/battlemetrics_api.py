@@ -1,84 +1,263 @@
-import aiohttp
+import asyncio
+import collections
 import re
+import time
+from urllib.parse import urlencode
 import config
 
-async def find_ark_server_by_number(server_number: str):
+from . import http_client
+from . import json_codec
+from .cache import AsyncTTLCache
+from .rate_limiter import battlemetrics_limiter, parse_retry_after
+from .server_info import ServerInfo
+from ..utils import metrics
+
+# Collection endpoint, e.g. https://api.battlemetrics.com/servers
+SERVERS_URL = config.BATTLEMETRICS_API_BASE.rstrip("/")
+
+class BattleMetricsAPIError(Exception):
+    """
+    Raised by paging helpers when BattleMetrics returns a non-200 response mid-sweep.
+    """
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+# Caches shared by /pop, /findserver, /addserverup and the background notifier
+server_info_cache = AsyncTTLCache(config.SERVER_INFO_CACHE_TTL, config.API_CACHE_MAX_ENTRIES, config.API_CACHE_STALE_TTL)
+server_lookup_cache = AsyncTTLCache(config.SERVER_LOOKUP_CACHE_TTL, config.API_CACHE_MAX_ENTRIES, config.API_CACHE_STALE_TTL)
+
+# Last 200 response per request, for conditional requests: {url with query: (etag, parsed_json)}
+_etag_cache = collections.OrderedDict()
+
+def _request_key(url: str, params):
+    return f"{url}?{urlencode(sorted(params.items()))}" if params else url
+
+async def _get_json(url: str, params=None):
+    """
+    Performs a rate-limited GET against BattleMetrics.
+    Every request takes a token from the shared limiter; a 429 pauses the limiter for the
+    Retry-After period and the request is retried up to BATTLEMETRICS_MAX_RETRIES times.
+    Responses that carry an ETag are remembered, and repeating the request sends If-None-Match;
+    a 304 returns the remembered response without downloading or parsing it again.
+    Returns (status, parsed_json), with parsed_json None for non-200 responses (a 304 counts as 200).
+    """
+    session = await http_client.get_session()
+    # '/servers/{id}' for single-server lookups, '/servers' for the collection (including next-page links)
+    endpoint = "/servers/{id}" if url.startswith(SERVERS_URL + "/") else "/servers"
+    key = _request_key(url, params) if config.BATTLEMETRICS_CONDITIONAL_REQUESTS else None
+    for attempt in range(config.BATTLEMETRICS_MAX_RETRIES + 1):
+        cached = _etag_cache.get(key) if key else None
+        headers = {"If-None-Match": cached[0]} if cached else None
+        await battlemetrics_limiter.acquire()
+        started = time.perf_counter()
+        async with session.get(url, params=params, headers=headers) as resp:
+            # Decoded from the raw bytes with the fastest installed JSON library
+            data = json_codec.loads(await resp.read()) if resp.status == 200 else None
+            etag = resp.headers.get("ETag")
+        metrics.BATTLEMETRICS_REQUESTS.inc(endpoint=endpoint, status=resp.status)
+        metrics.BATTLEMETRICS_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint, status=resp.status)
+        if resp.status == 429 and attempt < config.BATTLEMETRICS_MAX_RETRIES:
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+            print(f"BattleMetrics rate limit hit, backing off for {retry_after:.0f}s")
+            battlemetrics_limiter.pause(retry_after)
+            continue
+        if resp.status == 304 and cached:
+            _etag_cache.move_to_end(key)
+            return 200, cached[1]
+        if resp.status == 200 and key and etag:
+            _etag_cache[key] = (etag, data)
+            _etag_cache.move_to_end(key)
+            while len(_etag_cache) > config.BATTLEMETRICS_ETAG_MAX_ENTRIES:
+                _etag_cache.popitem(last=False)
+        return resp.status, data
+
+async def find_ark_server_by_number(server_number: str, use_cache: bool = True):
     """
     Find an Ark: Survival Ascended official server by its Ark server number.
     Returns the full server object or None.
     """
-    url = "https://api.battlemetrics.com/servers"
+    if not use_cache:
+        return await _fetch_ark_server_by_number(server_number)
+    return await server_lookup_cache.get_or_load(
+        server_number, lambda: _fetch_ark_server_by_number(server_number)
+    )
+
+async def _fetch_ark_server_by_number(server_number: str):
+    url = SERVERS_URL
     params = {
         "filter[game]": "ark-survival-ascended",
         "filter[official]": "true",
         "filter[search]": f"Official {server_number}",
         "page[size]": 10
     }
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, params=params) as resp:
-            if resp.status != 200:
-                return None
-            data = await resp.json()
-            servers = data.get("data", [])
-            # Match pattern: REGION-MODE-Official-MAP{server_number}
-            pattern = re.compile(rf"^[A-Z]{{2}}-(PVE|PVP)-Official-.*{re.escape(server_number)}\b", re.IGNORECASE)
-            for server in servers:
-                name = server["attributes"]["name"]
-                if pattern.search(name):
-                    return server
-            # Fallback: any server with the number in the name
-            for server in servers:
-                if server_number in server["attributes"]["name"]:
-                    return server
-            return None
+    status, data = await _get_json(url, params)
+    if status != 200:
+        return None
+    # Match pattern: REGION-MODE-Official-MAP{server_number}
+    pattern = re.compile(rf"^[A-Z]{{2}}-(PVE|PVP)-Official-.*{re.escape(server_number)}\b", re.IGNORECASE)
+    # One pass: the first pattern match wins, else the first server with the number anywhere in its name
+    fallback = None
+    for server in data.get("data", []):
+        name = server["attributes"]["name"]
+        if pattern.search(name):
+            return server
+        if fallback is None and server_number in name:
+            fallback = server
+    return fallback
 
 async def search_asa_official_servers(search_term):
     """
     Search for Ark: Survival Ascended official servers matching the search term.
     Returns a list of server objects.
     """
-    url = "https://api.battlemetrics.com/servers"
+    url = SERVERS_URL
     params = {
         "filter[game]": "ark-survival-ascended",
         "filter[official]": "true",
         "filter[search]": search_term,
         "page[size]": 5
     }
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, params=params) as resp:
-            if resp.status != 200:
-                return []
-            data = await resp.json()
-            return data.get("data", [])
+    status, data = await _get_json(url, params)
+    if status != 200:
+        return []
+    return data.get("data", [])
+
+ASA_GAME_ID = "48815"
+# Largest page BattleMetrics allows on the /servers collection endpoint
+MAX_PAGE_SIZE = 100
+# Sparse fieldset for status polling: skips the large 'details' blob and the relationships
+STATUS_FIELDS = ("name", "status", "players", "maxPlayers")
+
+def _parse_server(server: dict, check_game: bool = True):
+    """
+    Converts a raw BattleMetrics server object into a ServerInfo record.
+    Returns {"error": "..."} if the server isn't an Ark: Survival Ascended server.
+    'check_game' is False for sparse fieldset responses, which leave out the game relationship
+    (the request filters on the game instead).
+    """
+    game_id = ASA_GAME_ID
+    if check_game:
+        game = (server.get("relationships") or {}).get("game") or {}
+        game_id = (game.get("data") or {}).get("id")
+        # Check if this is an Ark: Survival Ascended server
+        if game_id != ASA_GAME_ID:
+            return {"error": "Not an Ark: Survival Ascended server"}
+    return ServerInfo.from_raw(server, game_id)
 
-async def get_server_info(server_id: str):
+def _as_dict(info):
+    return info.to_dict() if isinstance(info, ServerInfo) else info
+
+async def get_server_record(server_id: str, use_cache: bool = True):
     """
     Fetch server info from BattleMetrics by server ID.
-    Returns a dict with server info or {"error": "..."} on failure.
-    """
-    url = f"https://api.battlemetrics.com/servers/{server_id}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as resp:
-            if resp.status != 200:
-                return {"error": f"HTTP {resp.status}"}
-            data = await resp.json()
-            attributes = data.get("data", {}).get("attributes", {})
-            relationships = data.get("data", {}).get("relationships", {})
-            # Extract gameId from relationships
-            game_id = None
-            if 'game' in relationships and 'data' in relationships['game']:
-                game_id = relationships['game']['data'].get('id')
-            # Check if this is an Ark: Survival Ascended server
-            if game_id != "48815":
-                return {"error": "Not an Ark: Survival Ascended server"}
-            return {
-                "status": attributes.get("status"),
-                "name": attributes.get("name"),
-                "players": attributes.get("players"),
-                "maxPlayers": attributes.get("maxPlayers"),
-                "details": attributes.get("details", {}),
-                "gameId": game_id,
-                "id": data.get("data", {}).get("id"),
-                "ip": attributes.get("ip"),
-                "port": attributes.get("port"),
-            }
\ No newline at end of file
+    Returns a ServerInfo record or {"error": "..."} on failure.
+    Results are cached for SERVER_INFO_CACHE_TTL seconds; if BattleMetrics errors,
+    the last good result is returned while it is younger than API_CACHE_STALE_TTL.
+    """
+    if not use_cache:
+        return await _fetch_server_info(server_id)
+    return await server_info_cache.get_or_load(
+        str(server_id), lambda: _fetch_server_info(server_id), is_error=lambda info: "error" in info
+    )
+
+async def get_server_info(server_id: str, use_cache: bool = True):
+    """
+    get_server_record() as a plain dict (status, name, players, maxPlayers, details, gameId, id, ip, port),
+    or {"error": "..."} on failure.
+    """
+    return _as_dict(await get_server_record(server_id, use_cache))
+
+async def _fetch_server_info(server_id: str):
+    url = f"{SERVERS_URL}/{server_id}"
+    status, data = await _get_json(url)
+    if status != 200:
+        return {"error": f"HTTP {status}"}
+    return _parse_server(data.get("data", {}))
+
+async def get_server_records_bulk(server_ids, page_size: int = MAX_PAGE_SIZE, concurrency: int = 1, fields=None):
+    """
+    Fetch info for many servers through the /servers collection endpoint.
+    Ids are sent in chunks of 'page_size' using the ids whitelist filter, so N servers
+    cost ceil(N / page_size) requests instead of N. Up to 'concurrency' chunks are in flight
+    at once; the shared rate limiter still paces the actual requests. Pagination cursors are
+    followed in case BattleMetrics splits a chunk across pages.
+    With 'fields' (e.g. STATUS_FIELDS) only those attributes are requested, and the other keys of
+    each record are None; such partial results are not cached for get_server_record().
+    Returns {server_id: ServerInfo}. Servers that BattleMetrics didn't return map to {"error": "..."}.
+    """
+    server_ids = list(dict.fromkeys(str(sid) for sid in server_ids)) # De-duplicate, keep order
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    results = {}
+
+    async def fetch_chunk(chunk):
+        url = SERVERS_URL
+        params = {
+            "filter[ids][whitelist]": ",".join(chunk),
+            "page[size]": page_size
+        }
+        if fields:
+            params["fields[server]"] = ",".join(fields)
+            params["filter[game]"] = "ark-survival-ascended"
+        error = None
+        async with semaphore:
+            while url:
+                status, data = await _get_json(url, params)
+                if status != 200:
+                    error = f"HTTP {status}"
+                    break
+                for server in data.get("data", []):
+                    info = _parse_server(server, check_game=not fields)
+                    results[str(server.get("id"))] = info
+                    # Fresh data for every polled server keeps /pop answers warm
+                    if "error" not in info and not fields:
+                        server_info_cache.set(str(server.get("id")), info)
+                # The "next" link already carries every query parameter
+                url = data.get("links", {}).get("next")
+                params = None
+
+        for sid in chunk:
+            if sid not in results:
+                results[sid] = {"error": error or "Server not returned by BattleMetrics"}
+
+    chunks = [server_ids[i:i + page_size] for i in range(0, len(server_ids), page_size)]
+    await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks))
+    return results
+
+async def get_servers_info_bulk(server_ids, page_size: int = MAX_PAGE_SIZE, concurrency: int = 1, fields=None):
+    """
+    get_server_records_bulk() with every record as a plain dict, like get_server_info().
+    """
+    records = await get_server_records_bulk(server_ids, page_size, concurrency, fields)
+    return {server_id: _as_dict(info) for server_id, info in records.items()}
+
+async def iter_asa_official_servers(page_size: int = MAX_PAGE_SIZE):
+    """
+    Pages through every Ark: Survival Ascended official server on BattleMetrics.
+    Yields one list of raw server objects per page, following links.next cursors.
+    Raises BattleMetricsAPIError if a page fails, so callers can tell a partial sweep from a full one.
+    """
+    url = SERVERS_URL
+    params = {
+        "filter[game]": "ark-survival-ascended",
+        "filter[official]": "true",
+        "page[size]": max(1, min(page_size, MAX_PAGE_SIZE))
+    }
+    while url:
+        status, data = await _get_json(url, params)
+        if status != 200:
+            raise BattleMetricsAPIError(status)
+        yield data.get("data", [])
+        # The "next" link already carries every query parameter
+        url = data.get("links", {}).get("next")
+        params = None
+
+def get_cache_stats():
+    """
+    Returns hit/miss counters for the BattleMetrics lookup caches.
+    """
+    return {
+        "server_info": server_info_cache.stats(),
+        "server_lookup": server_lookup_cache.stats(),
+    }
@@ -0,0 +1,121 @@
+# src/services/cache.py
+import asyncio
+import time
+from collections import OrderedDict
+
+class AsyncTTLCache:
+    """
+    In-process cache for async lookups.
+    - Entries are fresh for 'ttl' seconds; the least recently used entry is evicted past 'max_size'.
+    - Concurrent misses for the same key share one in-flight load (single-flight).
+    - If a load fails, the last good value is served for up to 'stale_ttl' seconds.
+    """
+    def __init__(self, ttl: float, max_size: int, stale_ttl: float = 0):
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        self.stale_ttl = max(ttl, stale_ttl)
+        # {key: (value, stored_at)}, ordered from least to most recently used
+        self._entries = OrderedDict()
+        # {key: Future} for loads currently in flight
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale_hits = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Returns the fresh value for 'key', or None if it's missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[1] >= self.ttl:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def set(self, key, value):
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def _stale_value(self, key):
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[1] >= self.stale_ttl:
+            return None
+        return entry
+
+    async def get_or_load(self, key, loader, is_error=lambda value: value is None):
+        """
+        Returns the cached value for 'key', calling 'loader()' on a miss.
+        A result for which 'is_error(result)' is true is never cached; the last good
+        value is returned instead if it is still within the stale window.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        # Avoid "exception was never retrieved" warnings when nobody else was waiting
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            try:
+                value = await loader()
+                failed = is_error(value)
+            except Exception:
+                stale = self._stale_value(key)
+                if stale is None:
+                    raise
+                value, failed = stale[0], False
+                self.stale_hits += 1
+            else:
+                if failed:
+                    stale = self._stale_value(key)
+                    if stale is not None:
+                        value = stale[0]
+                        self.stale_hits += 1
+                else:
+                    self.set(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            if not future.done():
+                if isinstance(e, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self):
+        """
+        Returns the hit/miss counters and current size, for tuning TTLs and size caps.
+        """
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "stale_hits": self.stale_hits,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
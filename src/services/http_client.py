@@ -0,0 +1,69 @@
+# src/services/http_client.py
+import asyncio
+import aiohttp
+
+import config
+
+class HTTPClient:
+    """
+    Long-lived aiohttp session shared by the whole bot.
+    Keeps TCP/TLS connections alive between calls, caps the number of open
+    connections and caches DNS lookups so repeated BattleMetrics requests
+    don't pay a fresh handshake every time.
+    """
+    def __init__(self):
+        self._session = None
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        """
+        Creates the underlying session. Safe to call more than once.
+        """
+        async with self._lock:
+            if self._session is not None and not self._session.closed:
+                return self._session
+
+            connector = aiohttp.TCPConnector(
+                limit=config.HTTP_MAX_CONNECTIONS,
+                limit_per_host=config.HTTP_MAX_CONNECTIONS_PER_HOST,
+                ttl_dns_cache=config.HTTP_DNS_CACHE_TTL,
+                keepalive_timeout=config.HTTP_KEEPALIVE_TIMEOUT,
+            )
+            timeout = aiohttp.ClientTimeout(total=config.HTTP_REQUEST_TIMEOUT)
+            headers = {"Accept": "application/json"}
+            # Authenticated requests get BattleMetrics' higher rate limit
+            if config.BATTLEMETRICS_API_TOKEN:
+                headers["Authorization"] = f"Bearer {config.BATTLEMETRICS_API_TOKEN}"
+
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers)
+            return self._session
+
+    async def close(self):
+        """
+        Closes the session and every pooled connection.
+        """
+        async with self._lock:
+            if self._session is not None and not self._session.closed:
+                await self._session.close()
+            self._session = None
+
+    async def get_session(self):
+        """
+        Returns the shared session, starting it lazily if the bot hasn't done so yet
+        (e.g. when the API helpers are used from a standalone script).
+        """
+        if self._session is None or self._session.closed:
+            return await self.start()
+        return self._session
+
+# Single client instance owned by the bot process
+client = HTTPClient()
+
+async def start():
+    await client.start()
+
+async def close():
+    await client.close()
+
+async def get_session():
+    return await client.get_session()
@@ -0,0 +1,32 @@
+# src/services/json_codec.py
+import json
+
+import config
+
+# Faster decoders (orjson is in requirements.txt, msgspec is optional); the standard library is the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+def _select_backend(name: str = None):
+    """
+    Returns (name, loads) for JSON_BACKEND, or the fastest installed decoder when it's None.
+    """
+    available = {"json": json.loads}
+    if msgspec is not None:
+        available["msgspec"] = msgspec.json.Decoder().decode
+    if orjson is not None:
+        available["orjson"] = orjson.loads
+    if name is None:
+        name = next(candidate for candidate in ("orjson", "msgspec", "json") if candidate in available)
+    if name not in available:
+        raise ValueError(f"JSON_BACKEND '{name}' is not installed (available: {', '.join(sorted(available))})")
+    return name, available[name]
+
+# loads() takes the raw response bytes, which skips decoding them to str first
+BACKEND, loads = _select_backend(config.JSON_BACKEND)
@@ -0,0 +1,43 @@
+# src/services/population_collector.py
+import sqlite3
+import time
+
+from ..utils import database
+from ..utils import executor
+from . import battlemetrics_api
+from . import server_index
+
+async def collect_official_populations():
+    """
+    Sweeps the whole ASA official server list (one request per page) and records every
+    server's population, all stamped with the sweep start time, in a single bulk transaction.
+    The server index is refreshed from the same pages, so it stays current for free.
+    Returns (samples_written, complete); if a page fails, the samples gathered so far are still
+    written and 'complete' is False. If the database is locked the samples stay queued for the
+    next flush (see database.insert_pop_data_bulk) and sqlite3.Error is raised.
+    """
+    sweep_started = int(time.time())
+    pop_rows = []
+    complete = True
+    try:
+        async for page in battlemetrics_api.iter_asa_official_servers():
+            for server in page:
+                players = server.get("attributes", {}).get("players")
+                try:
+                    pop_rows.append((str(server["id"]), sweep_started, int(players)))
+                except (KeyError, ValueError, TypeError):
+                    continue
+            try:
+                await executor.run_db(server_index.index_servers, page, enforce_limit=False)
+            except sqlite3.Error as e:
+                # The index catches up on the next sweep; keep collecting samples
+                print(f"Could not index a page of official servers: {e}")
+    except battlemetrics_api.BattleMetricsAPIError as e:
+        print(f"Population sweep stopped early after {len(pop_rows)} servers: {e}")
+        complete = False
+
+    written = await executor.run_db(database.insert_pop_data_bulk, pop_rows, enforce_limit=False)
+    if complete:
+        # Servers missing from a full sweep are gone from the official list
+        await executor.run_db(database.prune_server_index, sweep_started, enforce_limit=False)
+    return written, complete
@@ -0,0 +1,72 @@
+# src/services/rate_limiter.py
+import asyncio
+import time
+
+import config
+
+class TokenBucket:
+    """
+    Async token-bucket limiter.
+    Tokens refill continuously at 'rate_per_minute' up to 'burst'; every request takes one.
+    A 429 response can pause the bucket for the server-provided Retry-After period.
+    """
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60.0 # Tokens per second
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        # Waiters queue up on the lock so tokens are handed out in FIFO order
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    async def acquire(self):
+        """
+        Waits until a token is available (and any Retry-After pause has passed), then takes it.
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def set_rate(self, rate_per_minute: float, burst: int):
+        """
+        Changes the refill rate and burst size, e.g. when several processes share one BattleMetrics budget.
+        """
+        self._refill(time.monotonic())
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = min(self.tokens, float(self.capacity))
+
+    def pause(self, seconds: float):
+        """
+        Blocks the bucket for 'seconds' and drains it, e.g. after a 429 Retry-After.
+        """
+        now = time.monotonic()
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = 0.0
+        self.updated_at = self.blocked_until
+
+def parse_retry_after(value, default: float = 60.0):
+    """
+    Reads a Retry-After header value in seconds. Falls back to 'default' if it's missing or not numeric.
+    """
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return default
+
+# BattleMetrics allows 60 requests/minute anonymously and 300/minute with an API token
+battlemetrics_limiter = TokenBucket(config.BATTLEMETRICS_RATE_LIMIT_PER_MINUTE, config.BATTLEMETRICS_RATE_LIMIT_BURST)
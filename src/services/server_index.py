@@ -0,0 +1,99 @@
+# src/services/server_index.py
+import re
+import time
+
+from ..utils import database
+from ..utils import executor
+from . import battlemetrics_api
+
+# Official names look like "NA-PVP-Official-TheIsland2154" or "EU-PVE-SmallTribes-Ragnarok6012"
+OFFICIAL_NAME_PATTERN = re.compile(
+    r"^(?P<region>[A-Z]+)-(?P<mode>PVE|PVP)-(?:[A-Za-z]+-)*?(?P<map>[A-Za-z]+?)(?P<number>\d{3,5})\b",
+    re.IGNORECASE
+)
+
+def parse_official_name(name: str):
+    """
+    Splits an official server name into region, mode, map and server number.
+    Returns a dict, or None if the name doesn't follow the official naming scheme.
+    """
+    match = OFFICIAL_NAME_PATTERN.match(name or "")
+    if not match:
+        return None
+    return {
+        "region": match.group("region").upper(),
+        "mode": match.group("mode").upper(),
+        "map": match.group("map"),
+        "server_number": int(match.group("number")),
+    }
+
+def index_entry_from_server(server: dict):
+    """
+    Builds an index row from a raw BattleMetrics server object. Returns None for unparseable names.
+    """
+    attributes = server.get("attributes", {})
+    parsed = parse_official_name(attributes.get("name"))
+    if not parsed:
+        return None
+    return {
+        "server_id": str(server.get("id")),
+        "name": attributes.get("name"),
+        "players": attributes.get("players") or 0,
+        "max_players": attributes.get("maxPlayers") or 0,
+        **parsed,
+    }
+
+def index_servers(servers: list):
+    """
+    Upserts a page of raw BattleMetrics server objects into the index. Returns how many were indexed.
+    """
+    entries = [entry for entry in map(index_entry_from_server, servers) if entry]
+    database.upsert_server_index(entries)
+    return len(entries)
+
+async def refresh_server_index():
+    """
+    Pages through the full ASA official server list and upserts it into the local index,
+    one page at a time. Entries not seen during a complete sweep are pruned.
+    Returns (indexed, pruned).
+    """
+    sweep_started = int(time.time())
+    indexed = 0
+    async for page in battlemetrics_api.iter_asa_official_servers():
+        indexed += await executor.run_db(index_servers, page, enforce_limit=False)
+    # Only reached when every page was fetched, so pruning can't drop live servers
+    pruned = await executor.run_db(database.prune_server_index, sweep_started, enforce_limit=False)
+    return indexed, pruned
+
+async def resolve_server_number(server_number: str):
+    """
+    Maps an official server number to its BattleMetrics ID.
+    Answered from the local index when possible; otherwise falls back to a BattleMetrics
+    search and adds the result to the index. Returns the ID as a string, or None.
+    """
+    try:
+        number = int(server_number)
+    except (TypeError, ValueError):
+        return None
+
+    entry = await executor.run_db(database.get_indexed_server_by_number, number, enforce_limit=False)
+    if entry:
+        return entry['server_id']
+
+    server = await battlemetrics_api.find_ark_server_by_number(str(number))
+    if not server:
+        return None
+    await executor.run_db(index_servers, [server], enforce_limit=False)
+    return str(server["id"])
+
+async def search(search_term: str, limit: int = 5):
+    """
+    Searches the local index by name. Returns index rows (with last indexed population).
+    """
+    return await executor.run_db(database.search_server_index, search_term, limit, enforce_limit=False)
+
+def is_server_number(value: str):
+    """
+    Official server numbers are short (e.g. 2154); BattleMetrics IDs are 7+ digits.
+    """
+    return value.isdigit() and len(value) <= 5
@@ -0,0 +1,68 @@
+# src/services/server_info.py
+
+class ServerInfo:
+    """
+    One BattleMetrics server, parsed once from the raw JSON:API object.
+    - __slots__ keeps records small (no per-instance dict), which adds up over 100-server pages.
+    - Read-only dict access (info["maxPlayers"], info.get("error"), "error" in info) and to_dict()
+      keep code written against the old info dicts working. Failures are still {"error": "..."}
+      dicts, so info.get("error") works on either.
+    """
+    __slots__ = ("id", "name", "status", "players", "max_players", "ip", "port", "details", "game_id")
+
+    # Keys of the old info dicts -> attribute names
+    KEYS = {
+        "status": "status",
+        "name": "name",
+        "players": "players",
+        "maxPlayers": "max_players",
+        "details": "details",
+        "gameId": "game_id",
+        "id": "id",
+        "ip": "ip",
+        "port": "port",
+    }
+
+    def __init__(self, id, name, status, players, max_players, ip=None, port=None, details=None, game_id=None):
+        self.id = id
+        self.name = name
+        self.status = status
+        self.players = players
+        self.max_players = max_players
+        self.ip = ip
+        self.port = port
+        self.details = details if details is not None else {}
+        self.game_id = game_id
+
+    @classmethod
+    def from_raw(cls, server: dict, game_id: str = None):
+        """
+        Builds a record from a raw server object with a single attributes lookup.
+        'game_id' is the already-extracted game relationship.
+        """
+        attributes = server.get("attributes") or {}
+        return cls(server.get("id"), attributes.get("name"), attributes.get("status"), attributes.get("players"),
+                   attributes.get("maxPlayers"), attributes.get("ip"), attributes.get("port"),
+                   attributes.get("details"), game_id)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, self.KEYS[key])
+        except KeyError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        attribute = self.KEYS.get(key)
+        return default if attribute is None else getattr(self, attribute)
+
+    def __contains__(self, key):
+        return key in self.KEYS
+
+    def to_dict(self):
+        """
+        The info dict get_server_info() has always returned.
+        """
+        return {key: getattr(self, attribute) for key, attribute in self.KEYS.items()}
+
+    def __repr__(self):
+        return f"ServerInfo(id={self.id!r}, name={self.name!r}, status={self.status!r}, players={self.players!r})"
@@ -0,0 +1,148 @@
+# src/sharding/event_bus.py
+import asyncio
+import collections
+import json
+import os
+
+import config
+
+class InMemoryEventBus:
+    """
+    Both ends of the event channel in one process: polling workers run as tasks inside bot.py
+    (SHARD_EVENT_TRANSPORT = "memory"). Useful for development and tests; no CPU is offloaded.
+    """
+    def __init__(self, max_pending: int = config.SHARD_EVENT_MAX_PENDING):
+        self._queue = asyncio.Queue(max_pending)
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def publish(self, event: dict):
+        await self._queue.put(event)
+
+    async def flush(self):
+        return True
+
+    async def get(self):
+        return await self._queue.get()
+
+class UnixSocketEventServer:
+    """
+    Discord-process end of the Unix socket channel. Workers connect and write one JSON event
+    per line; get() hands the events out in arrival order.
+    """
+    def __init__(self, path: str, max_pending: int = config.SHARD_EVENT_MAX_PENDING):
+        self.path = path
+        self._queue = asyncio.Queue(max_pending)
+        self._server = None
+        self._connections = set() # Writers of the connected workers, closed with the server
+
+    async def start(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path) # Left behind by a previous run
+        self._server = await asyncio.start_unix_server(self._handle_worker, path=self.path)
+        print(f"Listening for shard events on {self.path}")
+
+    async def _handle_worker(self, reader, writer):
+        self._connections.add(writer)
+        try:
+            async for line in reader:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    print(f"Ignoring malformed shard event: {line[:200]!r}")
+                    continue
+                await self._queue.put(event)
+        except ConnectionError:
+            pass # The worker went away; it reconnects on its next publish
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    async def get(self):
+        return await self._queue.get()
+
+class RecentEventIds:
+    """
+    Remembers the ids of the last 'max_size' events, so a consumer can drop repeats of an
+    event a worker sent again after a failed write.
+    """
+    def __init__(self, max_size: int = config.SHARD_EVENT_MAX_PENDING):
+        self.max_size = max_size
+        self._ids = collections.OrderedDict()
+
+    def seen(self, event: dict):
+        """
+        Returns True if an event with this id was already seen, and records it otherwise.
+        Events without an id are never treated as repeats.
+        """
+        event_id = event.get('id')
+        if event_id is None:
+            return False
+        if event_id in self._ids:
+            return True
+        self._ids[event_id] = None
+        if len(self._ids) > self.max_size:
+            self._ids.popitem(last=False)
+        return False
+
+class UnixSocketEventPublisher:
+    """
+    Worker end of the Unix socket channel. Connects lazily and reconnects after the Discord
+    process restarts. Events published while it is unreachable are kept (the oldest are dropped
+    past 'max_pending') and sent on the next successful publish, so delivery is at least once:
+    an event whose write failed midway is sent again, and the consumer drops it by its 'id'
+    (see RecentEventIds).
+    """
+    def __init__(self, path: str, max_pending: int = config.SHARD_EVENT_MAX_PENDING):
+        self.path = path
+        self._pending = collections.deque(maxlen=max_pending)
+        self._writer = None
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        pass
+
+    async def publish(self, event: dict):
+        self._pending.append(event)
+        await self.flush()
+
+    async def flush(self):
+        """
+        Sends any pending events. Returns False if the Discord process couldn't be reached.
+        """
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    _, self._writer = await asyncio.open_unix_connection(self.path)
+                while self._pending:
+                    self._writer.write(json.dumps(self._pending[0]).encode() + b"\n")
+                    await self._writer.drain()
+                    self._pending.popleft()
+                return True
+            except OSError as e:
+                if self._writer is not None:
+                    self._writer.close()
+                    self._writer = None
+                print(f"Shard event channel unavailable ({e}); {len(self._pending)} events pending")
+                return False
+
+    async def close(self):
+        await self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
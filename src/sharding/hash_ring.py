@@ -0,0 +1,36 @@
+# src/sharding/hash_ring.py
+import bisect
+import hashlib
+
+def _hash(key: str):
+    # Python's hash() is salted per process, so workers need a stable hash to agree on ownership
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+class HashRing:
+    """
+    Consistent hash ring that assigns server ids to shards.
+    - Each shard is placed at 'replicas' points on a 64-bit ring; a server belongs to the
+      first shard point at or after its own hash, wrapping around at the end.
+    - Adding or removing a shard only moves the servers next to its points (about 1/N of
+      them), so resizing the worker pool doesn't reshuffle every poll schedule.
+    """
+    def __init__(self, shards, replicas: int = 128):
+        self.shards = list(shards)
+        if not self.shards:
+            raise ValueError("A hash ring needs at least one shard")
+        points = sorted((_hash(f"{shard}#{replica}"), shard) for shard in self.shards for replica in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._owners = [shard for _, shard in points]
+
+    def shard_for(self, server_id):
+        """
+        Returns the shard that owns 'server_id'.
+        """
+        index = bisect.bisect_left(self._hashes, _hash(str(server_id)))
+        return self._owners[index % len(self._owners)]
+
+    def owned_by(self, shard, server_ids):
+        """
+        The subset of 'server_ids' that 'shard' owns.
+        """
+        return [server_id for server_id in server_ids if self.shard_for(server_id) == shard]
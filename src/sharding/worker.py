@@ -0,0 +1,65 @@
+# src/sharding/worker.py
+import asyncio
+import time
+
+import config
+
+from ..notifications.status_poller import StatusPoller
+from ..services import population_collector
+from ..services import server_index
+from ..services.battlemetrics_api import BattleMetricsAPIError
+from ..utils import metrics
+from .hash_ring import HashRing
+
+async def _collect_forever():
+    """
+    The fleet-wide collector (or, with it disabled, the server index refresh) from the cogs the
+    Discord process skips while sharding. The official list is paged by cursor, so it can't be
+    split by server id and runs on shard 0 only.
+    """
+    while True:
+        started = time.monotonic()
+        try:
+            if config.COLLECTOR_ENABLED:
+                written, complete = await population_collector.collect_official_populations()
+                metrics.SWEEP_SECONDS.observe(time.monotonic() - started, task="collector")
+                metrics.SWEEP_SERVERS.inc(written, task="collector")
+                print(f"Population sweep {'finished' if complete else 'partially finished'}: "
+                      f"{written} servers recorded in {time.monotonic() - started:.1f}s")
+            else:
+                indexed, pruned = await server_index.refresh_server_index()
+                print(f"Server index refreshed: {indexed} servers indexed, {pruned} stale entries removed.")
+        except BattleMetricsAPIError as e:
+            print(f"Shard 0 background sweep stopped early: {e}")
+        except Exception as e:
+            # Anything else (a locked database, a bad page) is logged and the next sweep runs as
+            # scheduled; cancellation isn't an Exception, so shutdown still stops the loop
+            print(f"Error in shard 0 background sweep: {e}")
+        interval = config.COLLECTOR_INTERVAL_MINUTES * 60 if config.COLLECTOR_ENABLED else config.SERVER_INDEX_REFRESH_HOURS * 3600
+        await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+async def run_worker(shard: int, shards: int, bus):
+    """
+    Polls the monitored servers that hash to 'shard' out of 'shards' and publishes their status
+    changes to 'bus'. Runs until cancelled.
+    """
+    ring = HashRing(range(shards), config.SHARD_RING_REPLICAS)
+    poller = StatusPoller(bus.publish, owns=lambda server_id: ring.shard_for(server_id) == shard,
+                          budget_share=1 / shards)
+    loaded = await poller.load_statuses()
+    print(f"Shard {shard}/{shards} started with {loaded} monitored servers.")
+    collector = asyncio.create_task(_collect_forever()) if shard == 0 else None
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                await poller.tick()
+            except Exception as e:
+                # One bad tick shouldn't stop the shard; tick() reschedules the servers it didn't get to
+                print(f"Error in shard {shard} status check: {e}")
+            # Retries events the Discord process missed while it was unreachable
+            await bus.flush()
+            await asyncio.sleep(max(0.0, config.STATUS_POLL_TICK_SECONDS - (time.monotonic() - started)))
+    finally:
+        if collector is not None:
+            collector.cancel()
@@ -1,7 +1,11 @@
 # src/utils/database.py
 import sqlite3
 import os
+import pathlib
 import time
+import asyncio
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
 # This import statement is crucial.
@@ -9,129 +13,914 @@ from datetime import datetime, timedelta
 # then find the 'config' module (config.py).
 import config
 
+from . import executor
+from . import metrics
+from .graph_cache import graph_cache
+
+# One long-lived connection shared by the whole process.
+# check_same_thread=False lets executor threads use it; _db_lock serializes access.
+_connection = None
+_db_lock = threading.RLock()
+
+# Writes queued by the status loop, flushed together as one transaction per tick.
+# Rows are (server_id, timestamp, population) and (new_status, timestamp, server_id).
+_pending_pop_rows = []
+_pending_status_rows = []
+_pending_lock = threading.Lock()
+
+# Where raw samples live (see timeseries.make_store); created on first use
+_raw_store = None
+
+# Last raw sample committed per server this process, {server_id: (timestamp, population)},
+# so unchanged populations are only written as heartbeats. Guarded by _db_lock.
+_last_raw_samples = {}
+
+# Aggregate tables kept up to date as samples are flushed (hourly and local-day buckets)
+ROLLUP_TABLES = ("population_hourly", "population_daily")
+
+# Folds one sample (or a pre-aggregated group) into a rollup bucket
+_ROLLUP_UPSERT = '''
+    INSERT INTO {table} (server_id, bucket, min_population, max_population, sum_population,
+                         sample_count, last_timestamp, last_population)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (server_id, bucket) DO UPDATE SET
+        min_population = MIN(min_population, excluded.min_population),
+        max_population = MAX(max_population, excluded.max_population),
+        sum_population = sum_population + excluded.sum_population,
+        sample_count = sample_count + excluded.sample_count,
+        last_population = CASE WHEN excluded.last_timestamp >= last_timestamp
+                               THEN excluded.last_population ELSE last_population END,
+        last_timestamp = MAX(last_timestamp, excluded.last_timestamp)
+'''
+
 def get_db_connection():
     """
-    Establishes a connection to the SQLite database.
-    Ensures the 'data' directory exists for the database file.
+    Returns the shared connection to the SQLite database, opening it on first use.
+    Ensures the 'data' directory exists for the database file and switches the database
+    to WAL mode with synchronous=NORMAL, so commits don't each wait for a full fsync.
     """
-    # Create the directory if it doesn't exist
-    os.makedirs(os.path.dirname(config.DATABASE_FILE), exist_ok=True)
-    conn = sqlite3.connect(config.DATABASE_FILE)
-    # Allows accessing columns by name (e.g., row['column_name'] instead of row[0])
-    conn.row_factory = sqlite3.Row 
-    return conn
+    global _connection
+    with _db_lock:
+        if _connection is None:
+            # Create the directory if it doesn't exist
+            os.makedirs(os.path.dirname(config.DATABASE_FILE), exist_ok=True)
+            conn = sqlite3.connect(config.DATABASE_FILE, check_same_thread=False)
+            # Allows accessing columns by name (e.g., row['column_name'] instead of row[0])
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={int(config.DB_BUSY_TIMEOUT_MS)}')
+            _connection = conn
+        return _connection
+
+def get_raw_store():
+    """
+    Returns the raw sample store selected by POP_STORAGE_BACKEND. Rollups, monitoring and the
+    server index always live in SQLite; only raw population samples move between backends.
+    """
+    global _raw_store
+    if _raw_store is None:
+        # Imported here so NumPy is only loaded once samples are actually read or written
+        from . import timeseries
+        _raw_store = timeseries.make_store()
+    return _raw_store
+
+@contextmanager
+def _transaction():
+    """
+    Yields a cursor on the shared connection and commits when the block ends
+    (or rolls back if it raises). Holds the connection lock for the whole block.
+    """
+    with _db_lock:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+@contextmanager
+def transaction():
+    """
+    Public form of _transaction() for tools and benchmarks that run several raw store
+    operations (see timeseries) in one transaction on the shared connection.
+    """
+    with _transaction() as cursor:
+        yield cursor
+
+def close_db():
+    """
+    Flushes queued writes and closes the shared connection. Called on shutdown.
+    """
+    global _connection
+    flush_writes()
+    with _db_lock:
+        if _connection is not None:
+            _connection.close()
+            _connection = None
 
 def init_db():
     """
-    Initializes the database by creating necessary tables if they don't exist.
+    Initializes the database by creating necessary tables if they don't exist,
+    then brings the schema up to date with MIGRATIONS.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with _transaction() as cursor:
+        # Table to store historical population data for graphing.
+        # This is the original layout; migration 1 rewrites it around the servers table.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS population_data (
+                server_id TEXT NOT NULL,
+                timestamp INTEGER NOT NULL, -- Unix timestamp
+                population INTEGER NOT NULL,
+                PRIMARY KEY (server_id, timestamp) -- Ensures unique entries per server at a given time
+            );
+        ''')
+
+        # Table to store servers being monitored for online/offline notifications (one row per server)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS monitored_servers (
+                server_id TEXT PRIMARY KEY, -- Unique ID for the server being monitored
+                last_known_status TEXT DEFAULT 'unknown', -- 'online', 'offline', 'dead'
+                last_status_check INTEGER DEFAULT 0 -- Unix timestamp of last check
+            );
+        ''')
+
+        # Which Discord users want a notification for which server (many-to-many)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS server_subscriptions (
+                server_id TEXT NOT NULL,
+                user_id INTEGER NOT NULL, -- Discord User ID to notify
+                created_at INTEGER NOT NULL, -- Unix timestamp of subscription
+                PRIMARY KEY (server_id, user_id) -- Also serves lookups by server
+            );
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_server_subscriptions_user ON server_subscriptions (user_id)')
+
+        # Local index of ASA official servers so number/name lookups don't need the API
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS asa_server_index (
+                server_id TEXT PRIMARY KEY, -- BattleMetrics server ID
+                server_number INTEGER, -- Official server number, e.g. 2154
+                name TEXT NOT NULL,
+                map TEXT,
+                region TEXT, -- 'NA', 'EU', 'AS', ...
+                mode TEXT, -- 'PVE' or 'PVP'
+                players INTEGER DEFAULT 0, -- Population when the index was last refreshed
+                max_players INTEGER DEFAULT 0,
+                updated_at INTEGER NOT NULL -- Unix timestamp of last refresh
+            );
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_asa_server_index_number ON asa_server_index (server_number)')
+
+        # Hourly and daily (local midnight) aggregates of population_data, so long-range
+        # graphs read one row per bucket no matter how often servers are polled
+        for table in ROLLUP_TABLES:
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    server_id TEXT NOT NULL,
+                    bucket INTEGER NOT NULL, -- Unix timestamp of the bucket start
+                    min_population INTEGER NOT NULL,
+                    max_population INTEGER NOT NULL,
+                    sum_population INTEGER NOT NULL,
+                    sample_count INTEGER NOT NULL,
+                    last_timestamp INTEGER NOT NULL, -- Newest sample folded into this bucket
+                    last_population INTEGER NOT NULL,
+                    PRIMARY KEY (server_id, bucket)
+                );
+            ''')
 
-    # Table to store historical population data for graphing
+    if _run_migrations():
+        # Rewritten tables leave free pages behind; hand them back to the filesystem
+        with _db_lock:
+            get_db_connection().execute('VACUUM')
+
+    with _transaction() as cursor:
+        # In case an import was killed before it rebuilt the indexes it dropped
+        for _, create_sql in _BULK_LOAD_INDEXES:
+            cursor.execute(create_sql)
+        _backfill_rollups(cursor)
+
+def _migration_intern_server_ids(cursor):
+    """
+    Moves population_data from a TEXT server_id in every row to an integer key into a new
+    servers table, and makes it a WITHOUT ROWID table clustered on (server_key, timestamp),
+    so a server's range scan reads one contiguous run of the primary key B-tree.
+    """
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS population_data (
-            server_id TEXT NOT NULL,
+        CREATE TABLE IF NOT EXISTS servers (
+            id INTEGER PRIMARY KEY, -- Surrogate key stored in population_data
+            server_id TEXT NOT NULL UNIQUE -- BattleMetrics server ID
+        );
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO servers (server_id) SELECT DISTINCT server_id FROM population_data')
+    cursor.execute('''
+        CREATE TABLE population_data_new (
+            server_key INTEGER NOT NULL REFERENCES servers (id),
             timestamp INTEGER NOT NULL, -- Unix timestamp
             population INTEGER NOT NULL,
-            PRIMARY KEY (server_id, timestamp) -- Ensures unique entries per server at a given time
-        );
+            PRIMARY KEY (server_key, timestamp) -- Ensures unique entries per server at a given time
+        ) WITHOUT ROWID;
     ''')
+    cursor.execute('''
+        INSERT INTO population_data_new (server_key, timestamp, population)
+        SELECT s.id, p.timestamp, p.population FROM population_data p JOIN servers s ON s.server_id = p.server_id
+        ORDER BY s.id, p.timestamp
+    ''')
+    cursor.execute('DROP TABLE population_data')
+    cursor.execute('ALTER TABLE population_data_new RENAME TO population_data')
+
+def _migration_add_range_indexes(cursor):
+    """
+    Per-server range scans are served by the primary keys; these cover the time-only
+    scans done by retention pruning across all servers.
+    """
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_population_data_timestamp ON population_data (timestamp)')
+    for table in ROLLUP_TABLES:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_bucket ON {table} (bucket)')
 
-    # Table to store servers being monitored for online/offline notifications
+def _migration_split_subscriptions(cursor):
+    """
+    Older databases stored one notify_user_id per monitored server. Moves those users into
+    server_subscriptions and rebuilds monitored_servers without the column. Databases created
+    (or already converted) without the column are left alone.
+    """
+    cursor.execute('PRAGMA table_info(monitored_servers)')
+    if 'notify_user_id' not in [row['name'] for row in cursor.fetchall()]:
+        return
+    cursor.execute('''
+        INSERT OR IGNORE INTO server_subscriptions (server_id, user_id, created_at)
+        SELECT server_id, notify_user_id, ? FROM monitored_servers
+    ''', (int(time.time()),))
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS monitored_servers (
-            server_id TEXT PRIMARY KEY, -- Unique ID for the server being monitored
-            notify_user_id INTEGER NOT NULL, -- Discord User ID to notify
-            last_known_status TEXT DEFAULT 'unknown', -- 'online', 'offline', 'dead'
-            last_status_check INTEGER DEFAULT 0 -- Unix timestamp of last check
+        CREATE TABLE monitored_servers_new (
+            server_id TEXT PRIMARY KEY,
+            last_known_status TEXT DEFAULT 'unknown',
+            last_status_check INTEGER DEFAULT 0
         );
     ''')
-    conn.commit()
-    conn.close()
+    cursor.execute('''
+        INSERT INTO monitored_servers_new (server_id, last_known_status, last_status_check)
+        SELECT server_id, last_known_status, last_status_check FROM monitored_servers
+    ''')
+    cursor.execute('DROP TABLE monitored_servers')
+    cursor.execute('ALTER TABLE monitored_servers_new RENAME TO monitored_servers')
+
+# Schema changes, applied in order. PRAGMA user_version records how many have been applied,
+# so each runs once per database. Only ever append to this list.
+MIGRATIONS = (
+    _migration_intern_server_ids,
+    _migration_add_range_indexes,
+    _migration_split_subscriptions,
+)
+
+def _run_migrations():
+    """
+    Applies pending MIGRATIONS, each in its own transaction together with its version bump.
+    Returns the number of migrations applied.
+    """
+    with _transaction() as cursor:
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        with _transaction() as cursor:
+            # Explicit BEGIN, since sqlite3 would otherwise run the leading DDL outside a transaction
+            cursor.execute('BEGIN')
+            migration(cursor)
+            cursor.execute(f'PRAGMA user_version = {number}')
+        print(f"Applied database migration {number}: {migration.__name__}")
+    return max(0, len(MIGRATIONS) - version)
+
+def _backfill_rollups(cursor):
+    """
+    Builds the rollup tables from existing raw samples the first time they are created.
+    """
+    cursor.execute('SELECT EXISTS (SELECT 1 FROM population_hourly)')
+    if cursor.fetchone()[0]:
+        return
+    bucket_expressions = {
+        "population_hourly": "timestamp - (timestamp % 3600)",
+        # Local midnight, matching _local_day_start()
+        "population_daily": "CAST(strftime('%s', date(timestamp, 'unixepoch', 'localtime'), 'utc') AS INTEGER)",
+    }
+    for table, bucket in bucket_expressions.items():
+        cursor.execute(f'''
+            INSERT INTO {table} (server_id, bucket, min_population, max_population, sum_population,
+                                 sample_count, last_timestamp, last_population)
+            SELECT s.server_id, g.bucket, g.min_pop, g.max_pop, g.sum_pop, g.cnt, g.last_ts,
+                   (SELECT p.population FROM population_data p
+                    WHERE p.server_key = g.server_key AND p.timestamp = g.last_ts)
+            FROM (
+                SELECT server_key, {bucket} AS bucket, MIN(population) AS min_pop, MAX(population) AS max_pop,
+                       SUM(population) AS sum_pop, COUNT(*) AS cnt, MAX(timestamp) AS last_ts
+                FROM population_data
+                GROUP BY server_key, bucket
+            ) AS g
+            JOIN servers s ON s.id = g.server_key
+        ''')
+
+def _local_day_start(timestamp: int):
+    """
+    Unix timestamp of local midnight on the day containing 'timestamp'.
+    """
+    t = time.localtime(timestamp)
+    return int(time.mktime((t.tm_year, t.tm_mon, t.tm_mday, 0, 0, 0, 0, 0, -1)))
+
+def _rollup_rows(pop_rows, bucket_of):
+    """
+    Turns (server_id, timestamp, population) samples into rollup upsert parameters.
+    """
+    return [(server_id, bucket_of(timestamp), population, population, population, 1, timestamp, population)
+            for server_id, timestamp, population in pop_rows]
 
 def insert_pop_data(server_id: str, population: int):
     """
-    Inserts or updates population data for a given server and timestamp.
+    Queues population data for a given server at the current time.
+    The row is written by the next flush_writes() call.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
     timestamp = int(time.time()) # Current Unix timestamp
-    cursor.execute('INSERT OR REPLACE INTO population_data (server_id, timestamp, population) VALUES (?, ?, ?)',
-                   (server_id, timestamp, population))
-    conn.commit()
-    conn.close()
+    with _pending_lock:
+        _pending_pop_rows.append((server_id, timestamp, population))
+
+def update_monitored_server_status(server_id: str, new_status: str):
+    """
+    Queues an update of the last known status and check time for a monitored server.
+    The update is written by the next flush_writes() call.
+    """
+    timestamp = int(time.time())
+    with _pending_lock:
+        _pending_status_rows.append((new_status, timestamp, server_id))
+
+@metrics.timed(metrics.DB_STATEMENT_SECONDS, query="flush_writes")
+def flush_writes():
+    """
+    Writes every queued population sample and status update in a single transaction.
+    If the transaction fails the rows go back to the front of the queue for the next flush
+    (keeping at most DB_MAX_PENDING_ROWS of each, newest first) and the error is re-raised.
+    Returns the number of rows written.
+    """
+    global _pending_pop_rows, _pending_status_rows
+    with _pending_lock:
+        pop_rows, _pending_pop_rows = _pending_pop_rows, []
+        status_rows, _pending_status_rows = _pending_status_rows, []
+    if not pop_rows and not status_rows:
+        return 0
+
+    try:
+        with _db_lock:
+            with _transaction() as cursor:
+                raw_samples = _write_pop_rows(cursor, pop_rows) if pop_rows else {}
+                if status_rows:
+                    cursor.executemany('UPDATE monitored_servers SET last_known_status = ?, last_status_check = ? WHERE server_id = ?',
+                                       status_rows)
+            # Only once committed, so rolled-back change points are written again on retry
+            _last_raw_samples.update(raw_samples)
+    except sqlite3.Error:
+        _requeue(pop_rows, status_rows)
+        raise
+    # Cached graphs for these servers no longer show the latest sample
+    graph_cache.invalidate_servers({row[0] for row in pop_rows})
+    return len(pop_rows) + len(status_rows)
+
+def _requeue(pop_rows, status_rows):
+    """
+    Puts rows from a failed flush back in front of anything queued since, dropping the oldest
+    past DB_MAX_PENDING_ROWS so a database that stays locked can't grow the queue forever.
+    """
+    global _pending_pop_rows, _pending_status_rows
+    limit = config.DB_MAX_PENDING_ROWS
+    with _pending_lock:
+        queued_pop = pop_rows + _pending_pop_rows
+        queued_status = status_rows + _pending_status_rows
+        _pending_pop_rows = queued_pop[-limit:]
+        _pending_status_rows = queued_status[-limit:]
+    dropped = max(0, len(queued_pop) - limit) + max(0, len(queued_status) - limit)
+    if dropped:
+        print(f"Write queue full after a failed flush; dropped the {dropped} oldest queued rows.")
+
+def _change_points(pop_rows):
+    """
+    The samples worth keeping as raw data: those whose population differs from the server's
+    previous raw sample, plus a heartbeat every POP_HEARTBEAT_INTERVAL seconds while it doesn't.
+    Readers rebuild the flat stretches in between (see timeseries.step_series).
+    Returns (kept rows, {server_id: (timestamp, population)} of the last kept sample per server);
+    the caller applies the latter to _last_raw_samples once the rows are committed.
+    """
+    kept = []
+    latest = {}
+    for server_id, timestamp, population in sorted(pop_rows, key=lambda row: row[1]):
+        last = latest.get(server_id) or _last_raw_samples.get(server_id)
+        if last is not None and last[1] == population and timestamp - last[0] < config.POP_HEARTBEAT_INTERVAL:
+            continue
+        latest[server_id] = (timestamp, population)
+        kept.append((server_id, timestamp, population))
+    return kept, latest
+
+def _write_pop_rows(cursor, pop_rows):
+    """
+    Inserts the change points among (server_id, timestamp, population) samples and folds every
+    sample into the rollups, so hourly and daily averages still weigh each observation.
+    With the columnar backend the raw samples are appended to their files immediately,
+    outside the SQLite transaction that carries the rollups.
+    Returns the _last_raw_samples updates to apply after the transaction commits.
+    """
+    raw_rows, raw_samples = _change_points(pop_rows)
+    if raw_rows:
+        get_raw_store().append(cursor, raw_rows)
+    # Keep the aggregates in step with the raw samples, in the same transaction
+    cursor.executemany(_ROLLUP_UPSERT.format(table="population_hourly"),
+                       _rollup_rows(pop_rows, lambda ts: ts - ts % 3600))
+    cursor.executemany(_ROLLUP_UPSERT.format(table="population_daily"),
+                       _rollup_rows(pop_rows, _local_day_start))
+    return raw_samples
+
+@metrics.timed(metrics.DB_STATEMENT_SECONDS, query="insert_pop_data_bulk")
+def insert_pop_data_bulk(pop_rows: list):
+    """
+    Writes a whole sweep of (server_id, timestamp, population) samples in one transaction,
+    bypassing the write queue. If the transaction fails the samples are queued for the next
+    flush_writes() instead of being lost, and the error is re-raised.
+    Returns the number of samples written.
+    """
+    if not pop_rows:
+        return 0
+    try:
+        with _db_lock:
+            with _transaction() as cursor:
+                raw_samples = _write_pop_rows(cursor, pop_rows)
+            _last_raw_samples.update(raw_samples)
+    except sqlite3.Error:
+        _requeue(list(pop_rows), [])
+        raise
+    graph_cache.invalidate_servers({row[0] for row in pop_rows})
+    return len(pop_rows)
+
+async def write_flusher(interval: float):
+    """
+    Background task that flushes queued writes every 'interval' seconds,
+    so samples recorded outside the status loop (and a final partial tick) still land on disk.
+    """
+    last_prune = 0
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await executor.run_db(flush_writes, enforce_limit=False)
+            # Apply retention every RETENTION_PRUNE_INTERVAL seconds
+            if time.monotonic() - last_prune >= config.RETENTION_PRUNE_INTERVAL:
+                await executor.run_db(prune_population_history, enforce_limit=False)
+                last_prune = time.monotonic()
+        except sqlite3.Error as e:
+            print(f"Error flushing queued database writes: {e}")
+
+@metrics.timed(metrics.DB_STATEMENT_SECONDS, query="prune_population_history")
+def prune_population_history():
+    """
+    Deletes raw samples and rollup buckets older than their configured retention.
+    A retention of None keeps that data forever. Returns the number of rows deleted.
+    """
+    now = int(time.time())
+    retention = {
+        "population_hourly": ("bucket", config.HOURLY_RETENTION_DAYS),
+        "population_daily": ("bucket", config.DAILY_RETENTION_DAYS),
+    }
+    deleted = 0
+    with _transaction() as cursor:
+        if config.RAW_RETENTION_DAYS is not None:
+            deleted += get_raw_store().prune(cursor, now - config.RAW_RETENTION_DAYS * 24 * 3600)
+        for table, (column, days) in retention.items():
+            if days is None:
+                continue
+            cursor.execute(f'DELETE FROM {table} WHERE {column} < ?', (now - days * 24 * 3600,))
+            deleted += cursor.rowcount
+    return deleted
+
+# Rollup columns in _ROLLUP_UPSERT parameter order, after server_id
+ROLLUP_COLUMNS = ("bucket", "min_population", "max_population", "sum_population", "sample_count",
+                  "last_timestamp", "last_population")
+
+def _read_only_connection():
+    """
+    A separate read-only connection for long scans, so the shared connection (and _db_lock)
+    isn't held while the caller consumes the rows. WAL lets it read alongside the bot's writes.
+    """
+    return sqlite3.connect(pathlib.Path(config.DATABASE_FILE).resolve().as_uri() + "?mode=ro", uri=True)
+
+def _iter_query(sql: str, params: tuple, batch_size: int):
+    """
+    Runs 'sql' on a read-only connection and yields its rows in fetchmany() batches of 'batch_size'.
+    """
+    conn = _read_only_connection()
+    try:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+def iter_pop_rows(since: int = 0, batch_size: int = None):
+    """
+    Yields every raw sample at or after 'since' as lists of (server_id, timestamp, population)
+    tuples, up to 'batch_size' (default EXPORT_BATCH_ROWS) at a time, ordered by server then time.
+    SQLite is streamed with fetchmany() from its own read-only connection, so memory stays flat
+    however large the table is. The columnar backend is read one file at a time.
+    """
+    batch_size = batch_size or config.EXPORT_BATCH_ROWS
+    flush_writes() # Include samples still in the write queue
+    store = get_raw_store()
+    if store.name != "sqlite":
+        for server_id in store.server_ids():
+            series = store.read(None, [server_id], since).get(server_id)
+            if series is None:
+                continue
+            timestamps, populations = series['timestamp'].tolist(), series['population'].tolist()
+            for start in range(0, len(timestamps), batch_size):
+                end = start + batch_size
+                yield [(server_id, timestamp, population)
+                       for timestamp, population in zip(timestamps[start:end], populations[start:end])]
+        return
+
+    # Walking the primary key streams rows in order without a sort; the unary + stops the
+    # planner from picking the timestamp index, which would need a temp B-tree for the ORDER BY
+    yield from _iter_query('''
+        SELECT s.server_id, p.timestamp, p.population
+        FROM population_data p JOIN servers s ON s.id = p.server_key
+        WHERE +p.timestamp >= ?
+        ORDER BY p.server_key, p.timestamp
+    ''', (since,), batch_size)
+
+def iter_rollup_rows(table: str, since: int = 0, batch_size: int = None):
+    """
+    Yields the rows of a rollup table (one of ROLLUP_TABLES) with data at or after 'since' as lists
+    of (server_id, *ROLLUP_COLUMNS) tuples, in fetchmany() batches like iter_pop_rows().
+    """
+    if table not in ROLLUP_TABLES:
+        raise ValueError(f"Unknown rollup table '{table}'")
+    flush_writes()
+    yield from _iter_query(f'''
+        SELECT server_id, {", ".join(ROLLUP_COLUMNS)} FROM {table}
+        WHERE +last_timestamp >= ? ORDER BY server_id, bucket
+    ''', (since,), batch_size or config.EXPORT_BATCH_ROWS)
+
+# Secondary indexes a bulk import drops while loading and builds once at the end
+_BULK_LOAD_INDEXES = (
+    ('idx_population_data_timestamp', 'CREATE INDEX IF NOT EXISTS idx_population_data_timestamp ON population_data (timestamp)'),
+    ('idx_population_hourly_bucket', 'CREATE INDEX IF NOT EXISTS idx_population_hourly_bucket ON population_hourly (bucket)'),
+    ('idx_population_daily_bucket', 'CREATE INDEX IF NOT EXISTS idx_population_daily_bucket ON population_daily (bucket)'),
+)
+
+@metrics.timed(metrics.DB_STATEMENT_SECONDS, query="import_history")
+def import_history(batches):
+    """
+    Bulk-loads exported history. 'batches' yields (kind, rows) pairs:
+    - "raw": (server_id, timestamp, population) samples, stored as they are
+    - a ROLLUP_TABLES name: (server_id, *ROLLUP_COLUMNS) rows, merged into existing buckets
+    Raw rows are not folded into the rollups, since those are imported from the source as is.
+    Each batch is one executemany() committed on its own, with the secondary time indexes dropped
+    for the load and rebuilt at the end. It runs on its own connection and only holds the write
+    lock while a batch is written, so the bot's own writes (which wait up to DB_BUSY_TIMEOUT_MS)
+    get in between batches. If an import fails part way, the batches before the failure stay
+    imported. Importing the same file twice replaces its raw samples but counts its rollup
+    buckets twice. Returns {kind: rows imported}.
+    """
+    flush_writes()
+    store = get_raw_store()
+    counts = {}
+    server_ids = set()
+    conn = sqlite3.connect(config.DATABASE_FILE)
+    conn.execute(f'PRAGMA busy_timeout={int(config.DB_BUSY_TIMEOUT_MS)}')
+    try:
+        cursor = conn.cursor()
+        for name, _ in _BULK_LOAD_INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS {name}')
+        conn.commit()
+        try:
+            # The next batch is read and parsed outside the transaction, while other writers get a turn
+            for kind, rows in batches:
+                if not rows:
+                    continue
+                if kind != "raw" and kind not in ROLLUP_TABLES:
+                    raise ValueError(f"Unknown history kind '{kind}'")
+                cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    if kind == "raw":
+                        store.append(cursor, rows)
+                    else:
+                        cursor.executemany(_ROLLUP_UPSERT.format(table=kind), rows)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                counts[kind] = counts.get(kind, 0) + len(rows)
+                server_ids.update(row[0] for row in rows)
+        finally:
+            for _, create_sql in _BULK_LOAD_INDEXES:
+                cursor.execute(create_sql)
+            conn.commit()
+    finally:
+        conn.close()
+        graph_cache.invalidate_servers(server_ids)
+    return counts
+
+def _has_pending_writes():
+    with _pending_lock:
+        return bool(_pending_pop_rows or _pending_status_rows)
 
 def get_pop_data_for_hours(server_id: str, hours: int = 24):
     """
     Retrieves population data for a specific server for the last 'hours'.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cutoff_time = int(time.time()) - (hours * 3600) # Calculate timestamp 'hours' ago
-    cursor.execute('SELECT timestamp, population FROM population_data WHERE server_id = ? AND timestamp >= ? ORDER BY timestamp ASC',
-                   (server_id, cutoff_time))
-    data = cursor.fetchall()
-    conn.close()
-    return [{'timestamp': row['timestamp'], 'population': row['population']} for row in data]
+    data = get_pop_arrays_for_hours(server_id, hours)
+    return [{'timestamp': timestamp, 'population': population}
+            for timestamp, population in zip(data['timestamp'].tolist(), data['population'].tolist())]
 
 def get_pop_data_for_week(server_id: str):
     """
     Retrieves population data for a specific server for the last 7 days.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cutoff_time = int(time.time()) - (7 * 24 * 3600) # 7 days in seconds
-    cursor.execute('SELECT timestamp, population FROM population_data WHERE server_id = ? AND timestamp >= ? ORDER BY timestamp ASC',
-                   (server_id, cutoff_time))
-    data = cursor.fetchall()
-    conn.close()
-    return [{'timestamp': row['timestamp'], 'population': row['population']} for row in data]
+    return get_pop_data_for_hours(server_id, hours=7 * 24)
+
+@metrics.timed(metrics.DB_STATEMENT_SECONDS, query="get_rollups")
+def _get_rollups(table: str, server_id: str, since: int):
+    if _has_pending_writes():
+        flush_writes()
+    with _transaction() as cursor:
+        cursor.execute(f'''
+            SELECT bucket, min_population, max_population, sum_population, sample_count,
+                   last_timestamp, last_population
+            FROM {table} WHERE server_id = ? AND bucket >= ? ORDER BY bucket ASC
+        ''', (server_id, since))
+        rows = cursor.fetchall()
+    # 'timestamp'/'population' mirror the raw sample dicts so graph code can use either
+    return [{'timestamp': row['bucket'], 'population': row['sum_population'] / row['sample_count'],
+             'min_population': row['min_population'], 'max_population': row['max_population'],
+             'sample_count': row['sample_count'], 'last_timestamp': row['last_timestamp'],
+             'last_population': row['last_population']} for row in rows]
+
+def get_daily_pop_data(server_id: str, days: int = 30):
+    """
+    Retrieves daily aggregates (avg/min/max/count) for a server for the last 'days', for long-range views.
+    """
+    return _get_rollups("population_daily", server_id, _local_day_start(int(time.time())) - (days - 1) * 24 * 3600)
+
+def _fetch_columns(sql: str, params: tuple, dtype):
+    """
+    Runs a query and loads the result straight into a structured NumPy array with np.fromiter,
+    skipping per-row dict/Row objects. Returns {column_name: ndarray}.
+    """
+    # NumPy is only needed by the graph queries, so it isn't imported at module load
+    import numpy as np
+    if _has_pending_writes():
+        flush_writes()
+    with _db_lock:
+        cursor = get_db_connection().cursor()
+        cursor.row_factory = None # Plain tuples are what np.fromiter consumes fastest
+        try:
+            cursor.execute(sql, params)
+            rows = np.fromiter(cursor, dtype=dtype)
+        finally:
+            cursor.close()
+    return {name: rows[name] for name in rows.dtype.names}
+
+def get_pop_arrays_for_hours(server_id: str, hours: int = 24):
+    """
+    Columnar version of get_pop_data_for_hours(): {'timestamp': int64 array, 'population': int32 array}.
+    """
+    series = get_pop_arrays_for_servers([server_id], hours).get(str(server_id))
+    if series is None:
+        from .timeseries import empty_series
+        return empty_series()
+    return series
+
+@metrics.timed(metrics.DB_STATEMENT_SECONDS, query="get_pop_arrays_for_servers")
+def get_pop_arrays_for_servers(server_ids: list, hours: int = 24):
+    """
+    Retrieves the last 'hours' of population data for several servers in one read of the raw store.
+    Only change points and heartbeats are stored, so each series is rebuilt as a step series with a
+    point at least every POP_STEP_RESOLUTION seconds.
+    Returns {server_id: {'timestamp': int64 array, 'population': int32 array}}; servers without
+    data are left out.
+    """
+    server_ids = list(dict.fromkeys(str(sid) for sid in server_ids))
+    if not server_ids:
+        return {}
+    from .timeseries import step_series
+    now = int(time.time())
+    cutoff_time = now - (hours * 3600)
+    # A value is carried forward at most this long; past it a heartbeat would have been written
+    max_gap = config.POP_HEARTBEAT_INTERVAL + config.POP_STEP_RESOLUTION
+    store = get_raw_store()
+    if _has_pending_writes():
+        flush_writes() # Make queued samples visible to the query
+    with _db_lock:
+        cursor = get_db_connection().cursor()
+        try:
+            # Reaching back one gap finds the value in effect at the cutoff
+            change_points = store.read(cursor, server_ids, cutoff_time - max_gap)
+        finally:
+            cursor.close()
+    results = {}
+    for server_id, series in change_points.items():
+        series = step_series(series, cutoff_time, now, config.POP_STEP_RESOLUTION, max_gap)
+        if series['timestamp'].size:
+            results[server_id] = series
+    return results
+
+@metrics.timed(metrics.DB_STATEMENT_SECONDS, query="get_server_names")
+def get_server_names(server_ids: list):
+    """
+    Returns {server_id: name} for servers found in the official server index.
+    """
+    server_ids = [str(sid) for sid in server_ids]
+    if not server_ids:
+        return {}
+    placeholders = ", ".join("?" for _ in server_ids)
+    with _transaction() as cursor:
+        cursor.execute(f'SELECT server_id, name FROM asa_server_index WHERE server_id IN ({placeholders})', server_ids)
+        return {row['server_id']: row['name'] for row in cursor.fetchall()}
+
+@metrics.timed(metrics.DB_STATEMENT_SECONDS, query="get_hourly_pop_arrays")
+def get_hourly_pop_arrays(server_id: str, hours: int = 7 * 24):
+    """
+    Hourly aggregates for a server for the last 'hours', at most one row per hour however often it is
+    polled: bucket start as 'timestamp', hourly average as 'population', plus 'min_population',
+    'max_population', 'last_timestamp' and 'last_population' arrays.
+    """
+    now = int(time.time())
+    since = now - now % 3600 - (hours - 1) * 3600
+    return _fetch_columns(
+        '''
+        SELECT bucket, CAST(sum_population AS REAL) / sample_count, min_population, max_population,
+               last_timestamp, last_population
+        FROM population_hourly WHERE server_id = ? AND bucket >= ? ORDER BY bucket ASC
+        ''',
+        (server_id, since),
+        [('timestamp', 'i8'), ('population', 'f8'), ('min_population', 'i4'), ('max_population', 'i4'),
+         ('last_timestamp', 'i8'), ('last_population', 'i4')],
+    )
 
+@metrics.timed(metrics.DB_STATEMENT_SECONDS, query="add_monitored_server")
 def add_monitored_server(server_id: str, user_id: int):
     """
-    Adds or updates a server to be monitored for online notifications by a specific user.
+    Subscribes a user to online notifications for a server. Any number of users can watch
+    the same server; the server itself is polled once regardless of subscriber count.
+    Returns True if this is a new subscription for the user.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    # INSERT OR REPLACE handles both adding new and updating existing (if primary key matches)
-    cursor.execute('INSERT OR REPLACE INTO monitored_servers (server_id, notify_user_id) VALUES (?, ?)',
-                   (server_id, user_id))
-    conn.commit()
-    conn.close()
+    with _transaction() as cursor:
+        cursor.execute('INSERT OR IGNORE INTO monitored_servers (server_id) VALUES (?)', (server_id,))
+        cursor.execute('INSERT OR IGNORE INTO server_subscriptions (server_id, user_id, created_at) VALUES (?, ?, ?)',
+                       (server_id, user_id, int(time.time())))
+        return cursor.rowcount > 0
 
+@metrics.timed(metrics.DB_STATEMENT_SECONDS, query="get_monitored_servers")
 def get_monitored_servers():
     """
-    Retrieves a list of all servers currently being monitored.
+    Retrieves a list of all servers currently being monitored, one entry per server,
+    each with the Discord user IDs subscribed to it in 'subscriber_ids'.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT server_id, notify_user_id, last_known_status, last_status_check FROM monitored_servers')
-    servers = cursor.fetchall()
-    conn.close()
+    if _has_pending_writes():
+        flush_writes()
+    with _transaction() as cursor:
+        cursor.execute('''
+            SELECT m.server_id, m.last_known_status, m.last_status_check, s.user_id
+            FROM monitored_servers m
+            LEFT JOIN server_subscriptions s ON s.server_id = m.server_id
+            ORDER BY m.server_id
+        ''')
+        rows = cursor.fetchall()
     # Return as a list of dictionaries for easier access
-    return [{'server_id': row['server_id'], 'notify_user_id': row['notify_user_id'],
-             'last_known_status': row['last_known_status'], 'last_status_check': row['last_status_check']}
-            for row in servers]
+    servers = {}
+    for row in rows:
+        server = servers.setdefault(row['server_id'], {
+            'server_id': row['server_id'],
+            'last_known_status': row['last_known_status'],
+            'last_status_check': row['last_status_check'],
+            'subscriber_ids': [],
+        })
+        if row['user_id'] is not None:
+            server['subscriber_ids'].append(row['user_id'])
+    return list(servers.values())
 
-def update_monitored_server_status(server_id: str, new_status: str):
+@metrics.timed(metrics.DB_STATEMENT_SECONDS, query="get_user_subscriptions")
+def get_user_subscriptions(user_id: int):
     """
-    Updates the last known status and check time for a monitored server.
+    Returns the server IDs a user is subscribed to.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    timestamp = int(time.time())
-    cursor.execute('UPDATE monitored_servers SET last_known_status = ?, last_status_check = ? WHERE server_id = ?',
-                   (new_status, timestamp, server_id))
-    conn.commit()
-    conn.close()
+    with _transaction() as cursor:
+        cursor.execute('SELECT server_id FROM server_subscriptions WHERE user_id = ? ORDER BY created_at', (user_id,))
+        return [row['server_id'] for row in cursor.fetchall()]
+
+@metrics.timed(metrics.DB_STATEMENT_SECONDS, query="remove_subscription")
+def remove_subscription(server_id: str, user_id: int):
+    """
+    Unsubscribes one user from a server. The server stops being monitored once nobody is subscribed.
+    Returns True if the user was subscribed.
+    """
+    with _transaction() as cursor:
+        cursor.execute('DELETE FROM server_subscriptions WHERE server_id = ? AND user_id = ?', (server_id, user_id))
+        removed = cursor.rowcount > 0
+        cursor.execute('''
+            DELETE FROM monitored_servers WHERE server_id = ?
+            AND NOT EXISTS (SELECT 1 FROM server_subscriptions WHERE server_id = ?)
+        ''', (server_id, server_id))
+    return removed
+
+@metrics.timed(metrics.DB_STATEMENT_SECONDS, query="remove_user_subscriptions")
+def remove_user_subscriptions(user_ids):
+    """
+    Removes every subscription held by the given users (e.g. users the bot can no longer see),
+    and stops monitoring servers left without subscribers.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    with _transaction() as cursor:
+        cursor.executemany('DELETE FROM server_subscriptions WHERE user_id = ?', [(uid,) for uid in user_ids])
+        cursor.execute('''
+            DELETE FROM monitored_servers
+            WHERE server_id NOT IN (SELECT DISTINCT server_id FROM server_subscriptions)
+        ''')
 
 def remove_monitored_server(server_id: str):
     """
-    Removes a server from the monitoring list.
+    Removes a server and all of its subscriptions from the monitoring list.
+    """
+    with _transaction() as cursor:
+        cursor.execute('DELETE FROM server_subscriptions WHERE server_id = ?', (server_id,))
+        cursor.execute('DELETE FROM monitored_servers WHERE server_id = ?', (server_id,))
+
+@metrics.timed(metrics.DB_STATEMENT_SECONDS, query="upsert_server_index")
+def upsert_server_index(entries: list):
+    """
+    Inserts or refreshes entries in the ASA official server index.
+    Each entry is a dict with server_id, server_number, name, map, region, mode, players and max_players.
+    """
+    if not entries:
+        return
+    timestamp = int(time.time())
+    with _transaction() as cursor:
+        cursor.executemany('''
+            INSERT OR REPLACE INTO asa_server_index
+                (server_id, server_number, name, map, region, mode, players, max_players, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(e['server_id'], e['server_number'], e['name'], e['map'], e['region'], e['mode'],
+               e['players'], e['max_players'], timestamp) for e in entries])
+
+@metrics.timed(metrics.DB_STATEMENT_SECONDS, query="get_indexed_server_by_number")
+def get_indexed_server_by_number(server_number: int):
+    """
+    Looks up an official server by its number in the local index. Returns a dict or None.
+    """
+    with _transaction() as cursor:
+        cursor.execute('SELECT * FROM asa_server_index WHERE server_number = ? ORDER BY updated_at DESC LIMIT 1',
+                       (server_number,))
+        row = cursor.fetchone()
+    return dict(row) if row else None
+
+@metrics.timed(metrics.DB_STATEMENT_SECONDS, query="search_server_index")
+def search_server_index(search_term: str, limit: int = 5):
+    """
+    Finds indexed official servers whose name contains the search term (case-insensitive).
+    % and _ in the term match themselves, not any characters.
+    """
+    escaped = search_term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    with _transaction() as cursor:
+        cursor.execute("SELECT * FROM asa_server_index WHERE name LIKE ? ESCAPE '\\' ORDER BY server_number LIMIT ?",
+                       (f"%{escaped}%", limit))
+        rows = cursor.fetchall()
+    return [dict(row) for row in rows]
+
+def count_server_index():
+    """
+    Returns how many servers are in the local index.
+    """
+    with _transaction() as cursor:
+        cursor.execute('SELECT COUNT(*) FROM asa_server_index')
+        return cursor.fetchone()[0]
+
+@metrics.timed(metrics.DB_STATEMENT_SECONDS, query="get_indexed_server_ids")
+def get_indexed_server_ids(server_ids: list):
+    """
+    Returns the subset of 'server_ids' that are in the official server index.
+    """
+    server_ids = [str(sid) for sid in server_ids]
+    if not server_ids:
+        return set()
+    placeholders = ", ".join("?" for _ in server_ids)
+    with _transaction() as cursor:
+        cursor.execute(f'SELECT server_id FROM asa_server_index WHERE server_id IN ({placeholders})', server_ids)
+        return {row['server_id'] for row in cursor.fetchall()}
+
+@metrics.timed(metrics.DB_STATEMENT_SECONDS, query="prune_server_index")
+def prune_server_index(older_than: int):
+    """
+    Removes index entries not refreshed since 'older_than' (Unix timestamp), i.e. servers
+    that disappeared from the official list.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM monitored_servers WHERE server_id = ?', (server_id,))
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    with _transaction() as cursor:
+        cursor.execute('DELETE FROM asa_server_index WHERE updated_at < ?', (older_than,))
+        return cursor.rowcount
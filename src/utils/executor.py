@@ -0,0 +1,84 @@
+# src/utils/executor.py
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import config
+
+class ExecutorBusy(Exception):
+    """
+    Raised when too many jobs are already queued on an executor.
+    Commands catch this and ask the user to try again instead of piling up work.
+    """
+
+class _BoundedExecutor:
+    """
+    Wraps a concurrent.futures executor with a cap on queued + running jobs.
+    The executor itself is created lazily on first use.
+    """
+    def __init__(self, name: str, factory, max_queue: int):
+        self.name = name
+        self._factory = factory
+        self._executor = None
+        self.max_queue = max_queue
+        self.pending = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = self._factory()
+        return self._executor
+
+    async def run(self, func, *args, enforce_limit: bool = True, **kwargs):
+        if enforce_limit and self.pending >= self.max_queue:
+            raise ExecutorBusy(f"{self.name} executor has {self.pending} jobs queued")
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), functools.partial(func, *args, **kwargs))
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+def _make_render_executor():
+    if config.RENDER_PROCESS_POOL_SIZE <= 0:
+        # Rendering in threads still keeps the event loop free, just without process isolation
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+    # 'spawn' avoids forking a process that already has the gateway and DB threads running
+    return ProcessPoolExecutor(max_workers=config.RENDER_PROCESS_POOL_SIZE,
+                               mp_context=multiprocessing.get_context("spawn"))
+
+# SQLite work runs in a small thread pool (the connection itself is shared and locked)
+db_executor = _BoundedExecutor(
+    "database",
+    lambda: ThreadPoolExecutor(max_workers=config.DB_THREAD_POOL_SIZE, thread_name_prefix="sqlite"),
+    config.DB_MAX_QUEUE,
+)
+# Matplotlib rendering is CPU-bound, so it gets separate processes
+render_executor = _BoundedExecutor("render", _make_render_executor, config.RENDER_MAX_QUEUE)
+
+async def run_db(func, *args, enforce_limit: bool = True, **kwargs):
+    """
+    Runs a blocking database call on the SQLite thread pool and returns its result.
+    Raises ExecutorBusy if DB_MAX_QUEUE jobs are already queued (unless enforce_limit is False,
+    which background tasks use so they are never dropped).
+    """
+    return await db_executor.run(func, *args, enforce_limit=enforce_limit, **kwargs)
+
+async def run_render(func, *args, enforce_limit: bool = True, **kwargs):
+    """
+    Runs a graph render on the render process pool and returns its (picklable) result.
+    Raises ExecutorBusy if RENDER_MAX_QUEUE renders are already queued.
+    """
+    return await render_executor.run(func, *args, enforce_limit=enforce_limit, **kwargs)
+
+def shutdown():
+    """
+    Stops both pools. Called from bot.py on shutdown.
+    """
+    db_executor.shutdown()
+    render_executor.shutdown()
@@ -1,14 +1,15 @@
 # src/utils/graph.py
-import matplotlib.pyplot as plt
 import io
+import threading
+import time
 from datetime import datetime, timedelta
 import numpy as np
+from matplotlib import colormaps
+from matplotlib import image as mpl_image
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
-# config.py is two levels up from src/utils/
-# Example: src/utils/graph.py -> src/ -> discord_pop_bot/ -> config.py
-import sys
-import os
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+# config.py lives at the repo root, which is on sys.path for the bot and (inherited) for its render processes
 import config
 
 # Discord Dark Theme Colors
@@ -39,26 +40,116 @@ def setup_plot_style(ax):
     # Grid (optional, but can help readability)
     ax.grid(False) # Keep it clean like the example
 
-def generate_day_graph(server_id: str, data: list):
-    if not data:
-        return None, "No data available for the last 24 hours.", ""
-
+def to_columns(data, *fields):
+    """
+    Returns the requested fields of 'data' as NumPy arrays, sorted by timestamp.
+    'data' is either columnar ({field: ndarray}, as returned by database.get_*_arrays)
+    or the older list of row dicts.
+    """
+    if isinstance(data, dict):
+        columns = {field: np.asarray(data[field]) for field in ('timestamp',) + fields if field in data}
+    else:
+        columns = {field: np.fromiter((row[field] for row in data), dtype=float if field == 'population' else np.int64,
+                                      count=len(data))
+                   for field in ('timestamp',) + fields if data and field in data[0]}
+    timestamps = columns.get('timestamp', np.empty(0, dtype=np.int64))
     # Sort data by timestamp (BattleMetrics sometimes returns out of order)
-    data.sort(key=lambda x: x['timestamp'])
-
-    # Convert timestamps to datetime objects
-    timestamps = [datetime.fromtimestamp(d['timestamp']) for d in data]
-    populations = [d['population'] for d in data]
-
-    # Calculate "hours ago" for x-axis labels
-    now = datetime.now()
-    hours_ago_raw = [(now - ts).total_seconds() / 3600 for ts in timestamps]
+    if timestamps.size > 1 and np.any(timestamps[1:] < timestamps[:-1]):
+        order = np.argsort(timestamps, kind='stable')
+        columns = {field: values[order] for field, values in columns.items()}
+    return columns
+
+def data_length(data):
+    """
+    Number of samples in columnar or row-dict data.
+    """
+    if isinstance(data, dict):
+        return len(data['timestamp'])
+    return len(data)
+
+def local_weekday_hour(timestamps):
+    """
+    Vectorized (weekday, hour) in local time for an array of Unix timestamps. Monday is 0.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if timestamps.size == 0:
+        return timestamps, timestamps
+    first_offset = time.localtime(int(timestamps[0])).tm_gmtoff
+    last_offset = time.localtime(int(timestamps[-1])).tm_gmtoff
+    if first_offset == last_offset:
+        offsets = first_offset
+    else:
+        # The window crosses a DST change, so work the offset out per timestamp
+        offsets = np.array([time.localtime(int(ts)).tm_gmtoff for ts in timestamps], dtype=np.int64)
+    local = timestamps + offsets
+    # 1970-01-01 was a Thursday (weekday 3)
+    weekdays = (local // 86400 + 3) % 7
+    hours = (local % 86400) // 3600
+    return weekdays, hours
+
+class FigureTemplate:
+    """
+    A pre-styled figure on the Agg canvas, built once and reused for every graph of one kind.
+    Everything static (background, axes, ticks, labels, title) is drawn once and kept as a
+    pixel buffer. Each render restores that buffer, redraws only the "dynamic" artists
+    (lines, markers, changing text) on top, and encodes the canvas as a PNG.
+    """
+    def __init__(self, figsize):
+        self.fig = Figure(figsize=figsize)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot()
+        setup_plot_style(self.ax)
+        self.artists = {}
+        self.background = None
+        # Renders may run on threads (RENDER_PROCESS_POOL_SIZE = 0), and a template is single-use at a time
+        self.lock = threading.Lock()
+
+    def add_dynamic(self, name: str, artist):
+        """
+        Registers an artist that changes per render. Animated artists are skipped by the full draw.
+        """
+        artist.set_animated(True)
+        self.artists[name] = artist
+        return artist
+
+    def finalize(self):
+        """
+        Lays the figure out once and snapshots the static parts.
+        """
+        self.fig.tight_layout(rect=(0, 0, 1, 0.9)) # Adjust layout to make space for title text
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+
+    def render_png(self):
+        """
+        Blits the dynamic artists over the static background and returns the PNG in a BytesIO.
+        """
+        self.canvas.restore_region(self.background)
+        for artist in self.artists.values():
+            if artist.get_visible():
+                self.fig.draw_artist(artist)
+        buf = io.BytesIO()
+        # Drop the alpha channel: the background is opaque and RGB PNGs are smaller.
+        # zlib dominates the remaining render time, so the compression level is configurable.
+        mpl_image.imsave(buf, np.asarray(self.canvas.buffer_rgba())[..., :3], format='png',
+                         pil_kwargs={'compress_level': config.GRAPH_PNG_COMPRESS_LEVEL})
+        buf.seek(0)
+        return buf
+
+def _add_title_bar(template: FigureTemplate):
+    fig = template.fig
+    fig.text(0.05, 0.95, "👁️‍🗨️  Pop Tracker APP", fontsize=14, color=DISCORD_PRIMARY_TEXT,
+             ha='left', va='top', transform=fig.transFigure)
+    template.add_dynamic("time_text", fig.text(0.95, 0.95, "", fontsize=10, color=DISCORD_SECONDARY_TEXT,
+                                               ha='right', va='top', transform=fig.transFigure))
 
-    # Create the plot
-    fig, ax = plt.subplots(figsize=(10, 6))
-    setup_plot_style(ax)
+def _build_day_template():
+    template = FigureTemplate(figsize=(10, 6))
+    ax = template.ax
 
-    ax.plot(hours_ago_raw, populations, color=DISCORD_LINE_COLOR, marker='o', linestyle='-')
+    template.add_dynamic("line", ax.plot([], [], color=DISCORD_LINE_COLOR, marker='o', linestyle='-')[0])
+    template.add_dynamic("min_marker", ax.plot([], [], 'o', color=DISCORD_ERROR_COLOR, markersize=8)[0])
+    template.add_dynamic("max_marker", ax.plot([], [], 'o', color=DISCORD_ACCENT_COLOR, markersize=8)[0])
 
     # Invert x-axis to show 0 hours ago on the right (current)
     ax.set_xlim(24, 0) # 0-24 hours ago, right-to-left
@@ -73,177 +164,254 @@ def generate_day_graph(server_id: str, data: list):
                        rotation=45, ha='right', fontsize=8, color=DISCORD_SECONDARY_TEXT)
     ax.set_yticks(np.arange(0, config.GRAPH_MAX_POP + 1, 4)) # Example: 0, 4, 8, ...
 
-    # Highlight min/max and notate
-    min_msg = "N/A"
-    max_msg = "N/A"
-    if populations:
-        min_pop = min(populations)
-        max_pop = max(populations)
-        min_idx = populations.index(min_pop)
-        max_idx = populations.index(max_pop)
+    # Current population large in the middle
+    template.add_dynamic("current_pop", ax.text(ax.get_xlim()[0] / 2, config.GRAPH_MAX_POP / 2, "",
+                                                horizontalalignment='center', verticalalignment='center',
+                                                transform=ax.transData, fontsize=60,
+                                                color=DISCORD_SECONDARY_TEXT, alpha=0.5))
+    _add_title_bar(template)
+    template.finalize()
+    return template
 
-        min_time_ago = hours_ago_raw[min_idx]
-        max_time_ago = hours_ago_raw[max_idx]
+def _build_week_template(ordered_weekdays: tuple):
+    template = FigureTemplate(figsize=(15, 7)) # Wider for weekly data
+    ax = template.ax
 
-        ax.plot(min_time_ago, min_pop, 'o', color=DISCORD_ERROR_COLOR, markersize=8, label=f'Min: {min_pop}')
-        ax.plot(max_time_ago, max_pop, 'o', color=DISCORD_ACCENT_COLOR, markersize=8, label=f'Max: {max_pop}')
+    template.add_dynamic("line", ax.plot([], [], color=DISCORD_LINE_COLOR, marker='o', linestyle='-', markersize=3)[0])
 
-        # Use actual time from data point for message
-        min_msg = f"{min_pop} at {datetime.fromtimestamp(data[min_idx]['timestamp']).strftime('%I:%M %p')}"
-        max_msg = f"{max_pop} at {datetime.fromtimestamp(data[max_idx]['timestamp']).strftime('%I:%M %p')}"
+    # Day mapping for labels
+    day_names = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+    # Create a label every 6 hours (which includes the start of each day)
+    x_labels = [f"{day_names[weekday]} {hour:02d}:00" if hour % 6 == 0 else ""
+                for weekday in ordered_weekdays for hour in range(24)]
 
+    ax.set_xlim(0, len(x_labels) - 1)
+    ax.set_ylim(0, config.GRAPH_MAX_POP)
+
+    ax.set_xlabel('Day and Hour', color=DISCORD_SECONDARY_TEXT)
+    ax.set_ylabel('Avg. Server Population', color=DISCORD_SECONDARY_TEXT)
 
-    # Add current population large in the middle
-    current_pop = populations[-1] if populations else 0
-    ax.text(ax.get_xlim()[0] / 2, config.GRAPH_MAX_POP / 2, str(current_pop),
-            horizontalalignment='center', verticalalignment='center',
-            transform=ax.transData, fontsize=60, color=DISCORD_SECONDARY_TEXT, alpha=0.5)
+    # Set x-axis ticks and labels
+    ax.set_xticks(range(len(x_labels)))
+    ax.set_xticklabels(x_labels, rotation=60, ha='right', fontsize=8, color=DISCORD_SECONDARY_TEXT)
+    ax.set_yticks(np.arange(0, config.GRAPH_MAX_POP + 1, 5))
 
-    # Add title bar elements
-    current_time_str = datetime.now().strftime("%m/%d/%Y %I:%M %p")
-    fig.text(0.05, 0.95, "👁️‍🗨️  Pop Tracker APP", fontsize=14, color=DISCORD_PRIMARY_TEXT,
-             ha='left', va='top', transform=fig.transFigure)
-    fig.text(0.95, 0.95, current_time_str, fontsize=10, color=DISCORD_SECONDARY_TEXT,
-             ha='right', va='top', transform=fig.transFigure)
+    # Current population large in the middle
+    template.add_dynamic("current_pop", ax.text(ax.get_xlim()[1] / 2, config.GRAPH_MAX_POP / 2, "",
+                                                horizontalalignment='center', verticalalignment='center',
+                                                transform=ax.transData, fontsize=60,
+                                                color=DISCORD_SECONDARY_TEXT, alpha=0.5))
+    _add_title_bar(template)
+    template.finalize()
+    return template
+
+def _build_multi_template():
+    template = FigureTemplate(figsize=(12, 7))
+    ax = template.ax
+
+    # One pre-styled line per possible server; unused lines stay hidden
+    colors = colormaps['tab20'].colors
+    for i in range(config.GRAPH_MULTI_MAX_SERVERS):
+        line = ax.plot([], [], color=colors[i % len(colors)], linestyle='-', linewidth=1.5)[0]
+        line.set_visible(False)
+        template.add_dynamic(f"line{i}", line)
 
+    ax.set_xlim(24, 0) # 0-24 hours ago, right-to-left
+    ax.set_ylim(0, config.GRAPH_MAX_POP)
+    ax.set_xlabel('Hours Ago', color=DISCORD_SECONDARY_TEXT)
+    ax.set_ylabel('Server Population', color=DISCORD_SECONDARY_TEXT)
+    ax.set_xticks(np.arange(0, 25, 2))
+    ax.set_xticklabels([f"{int(h)}h ago" if h != 0 else "Now" for h in np.arange(0, 25, 2)],
+                       fontsize=8, color=DISCORD_SECONDARY_TEXT)
+    ax.set_yticks(np.arange(0, config.GRAPH_MAX_POP + 1, 5))
 
-    plt.tight_layout(rect=(0, 0, 1, 0.9)) # Adjust layout to make space for title text
-    # Save the plot to a BytesIO object
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight', facecolor=DISCORD_BG)
-    buf.seek(0)
-    plt.close(fig) # Close the figure to free memory
+    _add_title_bar(template)
+    template.finalize()
+    return template
+
+# Templates built so far in this process: {(kind, GRAPH_MAX_POP, ...): FigureTemplate}
+_templates = {}
+_templates_lock = threading.Lock()
+
+def get_template(kind: str, *variant):
+    """
+    Returns the template for a graph kind, building it on first use.
+    The weekly template also varies with the weekday order of its tick labels.
+    """
+    key = (kind, config.GRAPH_MAX_POP) + variant
+    with _templates_lock:
+        template = _templates.get(key)
+        if template is None:
+            if kind == "day":
+                template = _build_day_template()
+            elif kind == "multi":
+                template = _build_multi_template()
+            else:
+                template = _build_week_template(*variant)
+            _templates[key] = template
+        return template
+
+def generate_day_graph(server_id: str, data):
+    # 'data' is columnar arrays from database.get_pop_arrays_for_hours() or a list of sample dicts
+    if not data_length(data):
+        return None, "No data available for the last 24 hours.", ""
+
+    columns = to_columns(data, 'population')
+    timestamps = columns['timestamp']
+    populations = columns['population']
+
+    # Calculate "hours ago" for x-axis labels
+    hours_ago_raw = (time.time() - timestamps) / 3600
+
+    template = get_template("day")
+    artists = template.artists
+    with template.lock:
+        artists["line"].set_data(hours_ago_raw, populations)
+
+        # Highlight min/max and notate
+        # argmin/argmax return the first occurrence, like list.index() did
+        min_idx = int(np.argmin(populations))
+        max_idx = int(np.argmax(populations))
+        min_pop = int(populations[min_idx])
+        max_pop = int(populations[max_idx])
+        artists["min_marker"].set_data([hours_ago_raw[min_idx]], [min_pop])
+        artists["max_marker"].set_data([hours_ago_raw[max_idx]], [max_pop])
+
+        # Use actual time from data point for message
+        min_msg = f"{min_pop} at {datetime.fromtimestamp(int(timestamps[min_idx])).strftime('%I:%M %p')}"
+        max_msg = f"{max_pop} at {datetime.fromtimestamp(int(timestamps[max_idx])).strftime('%I:%M %p')}"
+
+        artists["current_pop"].set_text(str(int(populations[-1])))
+        artists["time_text"].set_text(datetime.now().strftime("%m/%d/%Y %I:%M %p"))
+        buf = template.render_png()
 
     return buf, min_msg, max_msg
 
-def generate_week_graph(server_id: str, data: list):
-    if not data:
+def generate_week_graph(server_id: str, data):
+    # 'data' is usually hourly rollups from database.get_hourly_pop_arrays() (population = hourly avg),
+    # but raw samples and lists of row dicts work too since all carry 'timestamp' and 'population'
+    if not data_length(data):
         return None, "No data available for the last 7 days."
 
-    data.sort(key=lambda x: x['timestamp'])
+    columns = to_columns(data, 'population', 'min_population', 'max_population', 'last_population')
+    timestamps = columns['timestamp']
+    populations = columns['population'].astype(float)
+    # Hourly rollups carry each hour's real low and high; for raw samples they are the samples themselves
+    min_pops = columns.get('min_population', populations).astype(float)
+    max_pops = columns.get('max_population', populations).astype(float)
 
-    # Aggregate data by hour of the day for each day
-    # Structure: {weekday_hour: [pop1, pop2, ...]}
-    hourly_pops = {}
-    # Structure for daily min/max times: {weekday: {'min_pop': val, 'min_time': hour, 'max_pop': val, 'max_time': hour}}
-    daily_min_max = {}
+    # Aggregate data by hour of the day for each day: slot = weekday * 24 + hour (Monday 0, Sunday 6)
+    weekdays, hours = local_weekday_hour(timestamps)
+    slots = weekdays * 24 + hours
+
+    # Calculate average population for each hour of the week (0 where there is no data)
+    slot_sums = np.bincount(slots, weights=populations, minlength=7 * 24)
+    slot_counts = np.bincount(slots, minlength=7 * 24)
+    avg_hourly_pops = np.divide(slot_sums, slot_counts, out=np.zeros(7 * 24), where=slot_counts > 0)
 
-    for entry in data:
-        dt_obj = datetime.fromtimestamp(entry['timestamp'])
-        weekday = dt_obj.weekday() # Monday 0, Sunday 6
-        hour = dt_obj.hour
-        
-        key = (weekday, hour)
-        if key not in hourly_pops:
-            hourly_pops[key] = []
-        hourly_pops[key].append(entry['population'])
-
-        # Track daily min/max for specific hours
-        day_key = weekday
-        if day_key not in daily_min_max:
-            daily_min_max[day_key] = {'min_pop': float('inf'), 'min_time': None, 'max_pop': float('-inf'), 'max_time': None}
-
-        current_pop = entry['population']
-        # Only update min/max if we have data for that hour
-        if current_pop < daily_min_max[day_key]['min_pop']:
-            daily_min_max[day_key]['min_pop'] = current_pop
-            daily_min_max[day_key]['min_time'] = hour
-        if current_pop > daily_min_max[day_key]['max_pop']:
-            daily_min_max[day_key]['max_pop'] = current_pop
-            daily_min_max[day_key]['max_time'] = hour
-
-    # Calculate average population for each hour of the week
-    avg_hourly_pops = {}
-    for (weekday, hour), pops in hourly_pops.items():
-        avg_hourly_pops[(weekday, hour)] = sum(pops) / len(pops)
-
-    # Prepare data for plotting
-    x_labels = []
-    y_values = []
-    plot_points = [] # To store (x_index, avg_pop) for plotting
+    # Daily min/max times: {weekday: {'min_pop': val, 'min_time': hour, 'max_pop': val, 'max_time': hour}}
+    # argmin/argmax pick the earliest hour on ties, matching a chronological scan
+    daily_min_max = {}
+    for weekday in np.unique(weekdays):
+        day_idx = np.flatnonzero(weekdays == weekday)
+        min_idx = day_idx[np.argmin(min_pops[day_idx])]
+        max_idx = day_idx[np.argmax(max_pops[day_idx])]
+        daily_min_max[int(weekday)] = {'min_pop': min_pops[min_idx], 'min_time': int(hours[min_idx]),
+                                       'max_pop': max_pops[max_idx], 'max_time': int(hours[max_idx])}
 
     # Day mapping for labels
     day_names = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
 
-    # Generate labels and data points for each hour of each day
-    # Iterate through days and then hours to ensure proper order on graph
-    x_index = 0
-    # Start from 6 days ago (Monday), loop up to today (Sunday)
+    # Start from 6 days ago, loop up to today
     # Get the current day's weekday (e.g., if today is Thursday, start from previous Friday)
     today_weekday = datetime.now().weekday()
     
     # Create an ordered list of weekdays starting from 6 days ago to today
-    ordered_weekdays = []
-    for i in range(7):
-        ordered_weekdays.append((today_weekday - 6 + i) % 7)
-
-    for current_weekday in ordered_weekdays:
-        for hour in range(24):
-            key = (current_weekday, hour)
-            avg_pop = avg_hourly_pops.get(key, 0) # Default to 0 if no data
-            y_values.append(avg_pop)
-            plot_points.append((x_index, avg_pop))
-            
-            # Create a label every 6 hours or at start of day
-            if hour % 6 == 0 or hour == 0:
-                x_labels.append(f"{day_names[current_weekday]} {hour:02d}:00")
-            else:
-                x_labels.append("") # Empty label for intermediate ticks
+    ordered_weekdays = tuple((today_weekday - 6 + i) % 7 for i in range(7))
 
-            x_index += 1
+    # Reorder the 168 hourly averages so the graph runs from 6 days ago to today
+    plot_slots = (np.array(ordered_weekdays)[:, None] * 24 + np.arange(24)).ravel()
+    y_coords = avg_hourly_pops[plot_slots]
+    x_coords = np.arange(len(plot_slots))
 
-    # Create the plot
-    fig, ax = plt.subplots(figsize=(15, 7)) # Wider for weekly data
-    setup_plot_style(ax)
-
-    # Plot the line
-    x_coords = [p[0] for p in plot_points]
-    y_coords = [p[1] for p in plot_points]
-    ax.plot(x_coords, y_coords, color=DISCORD_LINE_COLOR, marker='o', linestyle='-', markersize=3)
-
-    ax.set_xlim(0, len(x_labels) - 1)
-    ax.set_ylim(0, config.GRAPH_MAX_POP)
-
-    ax.set_xlabel('Day and Hour', color=DISCORD_SECONDARY_TEXT)
-    ax.set_ylabel('Avg. Server Population', color=DISCORD_SECONDARY_TEXT)
-
-    # Set x-axis ticks and labels
-    ax.set_xticks(range(len(x_labels)))
-    ax.set_xticklabels(x_labels, rotation=60, ha='right', fontsize=8, color=DISCORD_SECONDARY_TEXT)
-    ax.set_yticks(np.arange(0, config.GRAPH_MAX_POP + 1, 5))
-
-    # Add current population large in the middle (optional for weekly, but can be done)
-    populations = [d['population'] for d in data] if data else []
-    current_pop = populations[-1] if populations else 0 # Get last known pop for display
-    ax.text(ax.get_xlim()[1] / 2, config.GRAPH_MAX_POP / 2, str(current_pop),
-            horizontalalignment='center', verticalalignment='center',
-            transform=ax.transData, fontsize=60, color=DISCORD_SECONDARY_TEXT, alpha=0.5)
-
-    # Add title bar elements
-    current_time_str = datetime.now().strftime("%m/%d/%Y %I:%M %p")
-    fig.text(0.05, 0.95, "👁️‍🗨️  Pop Tracker APP", fontsize=14, color=DISCORD_PRIMARY_TEXT,
-             ha='left', va='top', transform=fig.transFigure)
-    fig.text(0.95, 0.95, current_time_str, fontsize=10, color=DISCORD_SECONDARY_TEXT,
-             ha='right', va='top', transform=fig.transFigure)
+    # Hourly rollups carry the newest raw sample; raw samples are their own latest sample
+    last_pops = columns.get('last_population', populations)
+    current_pop = int(round(last_pops[-1])) # Get last known pop for display
 
-    plt.tight_layout(rect=(0, 0, 1, 0.9))
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight', facecolor=DISCORD_BG)
-    buf.seek(0)
-    plt.close(fig)
+    template = get_template("week", ordered_weekdays)
+    with template.lock:
+        template.artists["line"].set_data(x_coords, y_coords)
+        template.artists["current_pop"].set_text(str(current_pop))
+        template.artists["time_text"].set_text(datetime.now().strftime("%m/%d/%Y %I:%M %p"))
+        buf = template.render_png()
 
     # Summarize weekly trends (text message)
-    summary_messages = ["**Weekly Population Trends (Avg. per day):**"]
+    summary_messages = ["**Weekly Population Trends (daily low and peak):**"]
     # Ensure consistent order of days for the summary
     for weekday in ordered_weekdays:
         day_name = day_names[weekday]
         if weekday in daily_min_max and daily_min_max[weekday]['min_time'] is not None:
             min_info = daily_min_max[weekday]
             summary_messages.append(
-                f"- **{day_name}:** Lowest Avg Pop around {min_info['min_time']:02d}:00 ({min_info['min_pop']:.0f} players)"
-                f", Highest Avg Pop around {min_info['max_time']:02d}:00 ({min_info['max_pop']:.0f} players)"
+                f"- **{day_name}:** Lowest Pop around {min_info['min_time']:02d}:00 ({min_info['min_pop']:.0f} players)"
+                f", Peak Pop around {min_info['max_time']:02d}:00 ({min_info['max_pop']:.0f} players)"
             )
         else:
             summary_messages.append(f"- **{day_name}:** Not enough data.")
     
-    return buf, "\n".join(summary_messages)
\ No newline at end of file
+    return buf, "\n".join(summary_messages)
+
+def generate_multi_graph(series: dict, names: dict = None):
+    """
+    Overlays the last 24 hours of several servers on one chart.
+    'series' is {server_id: columnar data}, as returned by database.get_pop_arrays_for_servers();
+    'names' optionally maps server ids to display names for the legend.
+    Returns (PNG buffer, summary message), or (None, message) if there's nothing to plot.
+    """
+    names = names or {}
+    series = {sid: data for sid, data in series.items() if data_length(data)}
+    if not series:
+        return None, "No data available for the last 24 hours."
+
+    template = get_template("multi")
+    ax = template.ax
+    now = time.time()
+    summary_messages = ["**Population over the last 24 hours:**"]
+    with template.lock:
+        handles = []
+        labels = []
+        for i in range(config.GRAPH_MULTI_MAX_SERVERS):
+            template.artists[f"line{i}"].set_visible(False)
+        for i, (server_id, data) in enumerate(list(series.items())[:config.GRAPH_MULTI_MAX_SERVERS]):
+            columns = to_columns(data, 'population')
+            populations = columns['population']
+            line = template.artists[f"line{i}"]
+            line.set_data((now - columns['timestamp']) / 3600, populations)
+            line.set_visible(True)
+            label = names.get(server_id, server_id)
+            handles.append(line)
+            labels.append(label)
+            summary_messages.append(f"- **{label}** (`{server_id}`): now {int(populations[-1])}, "
+                                    f"low {int(populations.min())}, high {int(populations.max())}")
+
+        # The legend depends on which servers were requested, so it's rebuilt and blitted per render
+        legend = ax.legend(handles, labels, loc='upper left', fontsize=8, ncol=2 if len(handles) > 10 else 1,
+                           facecolor=DISCORD_BG, edgecolor=DISCORD_SECONDARY_TEXT, labelcolor=DISCORD_PRIMARY_TEXT)
+        template.add_dynamic("legend", legend)
+        template.artists["time_text"].set_text(datetime.now().strftime("%m/%d/%Y %I:%M %p"))
+        buf = template.render_png()
+
+    return buf, "\n".join(summary_messages)
+
+def prewarm():
+    """
+    Renders each graph kind once from synthetic data, so the first real graph in this process
+    doesn't pay for building templates, matplotlib's font cache or the PNG encoder.
+    Called in every render process by the Graph cog after on_ready.
+    """
+    now = int(time.time())
+    timestamps = np.arange(now - 7 * 24 * 3600, now, 3600, dtype=np.int64)
+    data = {'timestamp': timestamps, 'population': np.zeros(timestamps.size, dtype=np.int32)}
+    generate_day_graph("prewarm", data)
+    generate_week_graph("prewarm", data)
+    generate_multi_graph({"prewarm": data})
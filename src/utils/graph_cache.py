@@ -0,0 +1,139 @@
+# src/utils/graph_cache.py
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import config
+
+def make_key(server_id: str, kind: str, last_timestamp: int):
+    """
+    A rendered graph only changes when a new sample arrives or GRAPH_MAX_POP changes,
+    so those (plus the graph kind) identify it.
+    """
+    return (str(server_id), kind, int(last_timestamp), config.GRAPH_MAX_POP)
+
+class GraphCache:
+    """
+    Cache of rendered graph PNGs and their accompanying text messages.
+    - The memory tier holds up to 'max_bytes' of PNG data, evicting least recently used graphs.
+    - If 'disk_dir' is set, graphs are also written there and survive restarts / memory evictions.
+    Thread-safe, since DB flushes (which invalidate entries) run on executor threads.
+    """
+    def __init__(self, max_bytes: int, disk_dir: str = None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        # {key: (png_bytes, messages)}, ordered from least to most recently used
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        server_id, kind, last_timestamp, max_pop = key
+        safe_id = "".join(c for c in server_id if c.isalnum() or c == "-")
+        return os.path.join(self.disk_dir, f"{safe_id}_{kind}_{last_timestamp}_{max_pop}")
+
+    def get(self, key):
+        """
+        Returns (png_bytes, messages) for 'key', or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path + ".png", "rb") as f:
+                    png = f.read()
+                with open(path + ".json", "r", encoding="utf-8") as f:
+                    messages = tuple(json.load(f))
+            except (OSError, ValueError):
+                pass
+            else:
+                self._store(key, png, messages)
+                with self._lock:
+                    self.disk_hits += 1
+                return png, messages
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, png: bytes, messages: tuple):
+        """
+        Stores a rendered graph in memory (and on disk, if enabled).
+        """
+        messages = tuple(messages)
+        self._store(key, png, messages)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path + ".png", "wb") as f:
+                    f.write(png)
+                with open(path + ".json", "w", encoding="utf-8") as f:
+                    json.dump(list(messages), f)
+            except OSError as e:
+                print(f"Could not write graph cache file {path}: {e}")
+
+    def _store(self, key, png: bytes, messages: tuple):
+        if len(png) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[0])
+            self._entries[key] = (png, messages)
+            self._size += len(png)
+            while self._size > self.max_bytes:
+                _, (evicted_png, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted_png)
+                self.evictions += 1
+
+    def invalidate_servers(self, server_ids):
+        """
+        Drops every cached graph for the given servers, e.g. after new samples were inserted.
+        """
+        server_ids = {str(sid) for sid in server_ids}
+        if not server_ids:
+            return
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in server_ids]:
+                png, _ = self._entries.pop(key)
+                self._size -= len(png)
+
+        if self.disk_dir:
+            try:
+                filenames = os.listdir(self.disk_dir)
+            except OSError:
+                return
+            for filename in filenames:
+                if filename.split("_", 1)[0] in server_ids:
+                    try:
+                        os.remove(os.path.join(self.disk_dir, filename))
+                    except OSError:
+                        pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+# Shared by the graph commands; the database invalidates it when samples are flushed
+graph_cache = GraphCache(config.GRAPH_CACHE_MAX_BYTES, config.GRAPH_CACHE_DIR)
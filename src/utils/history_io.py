@@ -0,0 +1,135 @@
+# src/utils/history_io.py
+import csv
+import gzip
+import itertools
+import os
+
+import config
+
+from . import database
+
+FORMATS = ("csv", "parquet")
+
+# Every exported row names what it holds: a raw sample or an hourly/daily rollup bucket.
+# Raw rows fill 'population'; rollup rows put the bucket start in 'timestamp' and fill the rest.
+KINDS = {"raw": None, "hourly": "population_hourly", "daily": "population_daily"}
+ROLLUP_FIELDS = ("min_population", "max_population", "sum_population", "sample_count", "last_timestamp", "last_population")
+COLUMNS = ("kind", "server_id", "timestamp", "population") + ROLLUP_FIELDS
+
+def _require_pyarrow():
+    # Parquet support is optional, so pyarrow is only imported when a Parquet file is used
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet export/import needs pyarrow (pip install pyarrow); use csv instead") from None
+    return pyarrow, pyarrow.parquet
+
+def detect_format(path: str, fmt: str = None):
+    """
+    Returns "csv" or "parquet": 'fmt' if given, otherwise from the file extension.
+    """
+    if fmt is None:
+        fmt = "parquet" if path.endswith(".parquet") else "csv"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}' (expected one of: {', '.join(FORMATS)})")
+    return fmt
+
+def _export_batches(since: int, batch_size: int):
+    """
+    Yields (kind, rows) with rows already shaped like COLUMNS: the raw samples, then each rollup table.
+    """
+    for rows in database.iter_pop_rows(since, batch_size):
+        yield "raw", [("raw", server_id, timestamp, population) + (None,) * len(ROLLUP_FIELDS)
+                      for server_id, timestamp, population in rows]
+    for kind, table in KINDS.items():
+        if table is None:
+            continue
+        for rows in database.iter_rollup_rows(table, since, batch_size):
+            yield kind, [(kind, server_id, bucket, None) + tuple(rest) for server_id, bucket, *rest in rows]
+
+def export_population(path: str, fmt: str = None, since: int = 0, batch_size: int = None):
+    """
+    Streams population history with data at or after 'since' to 'path': the raw samples plus the
+    hourly and daily rollups, so weekly graphs and long-range views survive the move. Written as
+    gzipped CSV or Parquet (one row group per batch); only one batch is in memory at a time.
+    Returns {kind: rows written}.
+    """
+    fmt = detect_format(path, fmt)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    batches = _export_batches(since, batch_size)
+    counts = dict.fromkeys(KINDS, 0)
+    if fmt == "csv":
+        with gzip.open(path, "wt", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            for kind, rows in batches:
+                writer.writerows(rows)
+                counts[kind] += len(rows)
+        return counts
+
+    pa, pq = _require_pyarrow()
+    schema = pa.schema([("kind", pa.string()), ("server_id", pa.string())]
+                       + [(column, pa.int64()) for column in COLUMNS[2:]])
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for kind, rows in batches:
+            writer.write_table(pa.table([list(column) for column in zip(*rows)], schema=schema))
+            counts[kind] += len(rows)
+    return counts
+
+def _to_import_row(kind: str, row):
+    """
+    Turns one exported row (COLUMNS order, without 'kind') into database.import_history()'s shape.
+    """
+    server_id, timestamp, population, *rollup = row
+    if KINDS[kind] is None:
+        return (server_id, int(timestamp), int(population))
+    return (server_id, int(timestamp), *(int(value) for value in rollup))
+
+def _batch_by_kind(rows, batch_size: int):
+    """
+    Groups (kind, ...) rows into (table kind, import rows) batches of up to 'batch_size'.
+    """
+    for kind, group in itertools.groupby(rows, key=lambda row: row[0]):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown row kind '{kind}' (expected one of: {', '.join(KINDS)})")
+        group = iter(group)
+        while True:
+            batch = [_to_import_row(kind, row[1:]) for row in itertools.islice(group, batch_size)]
+            if not batch:
+                break
+            yield KINDS[kind] or "raw", batch
+
+def _read_csv_rows(path: str):
+    with gzip.open(path, "rt", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        if tuple(header) != COLUMNS:
+            raise ValueError(f"Unexpected CSV header (expected {','.join(COLUMNS)}); is this a population export?")
+        yield from reader
+
+def _read_parquet_rows(path: str, batch_size: int):
+    _, pq = _require_pyarrow()
+    parquet_file = pq.ParquetFile(path)
+    for record_batch in parquet_file.iter_batches(batch_size=batch_size, columns=list(COLUMNS)):
+        columns = record_batch.to_pydict()
+        yield from zip(*(columns[column] for column in COLUMNS))
+
+def import_population(path: str, fmt: str = None, batch_size: int = None):
+    """
+    Loads a file written by export_population() back into the database, one committed batch at
+    a time (see database.import_history). Returns {kind: rows imported}.
+    """
+    fmt = detect_format(path, fmt)
+    batch_size = batch_size or config.EXPORT_BATCH_ROWS
+    rows = _read_csv_rows(path) if fmt == "csv" else _read_parquet_rows(path, batch_size)
+    imported = database.import_history(_batch_by_kind(rows, batch_size))
+    return {kind: imported.get(KINDS[kind] or "raw", 0) for kind in KINDS}
+
+def describe_counts(counts: dict):
+    """
+    "120 raw samples, 40 hourly and 2 daily rollup rows" for export/import results.
+    """
+    return f"{counts['raw']} raw samples, {counts['hourly']} hourly and {counts['daily']} daily rollup rows"
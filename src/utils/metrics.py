@@ -0,0 +1,225 @@
+# src/utils/metrics.py
+import asyncio
+import functools
+import math
+import threading
+import time
+
+import config
+
+# Default latency buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class _Metric:
+    """
+    Base for labelled metrics. Values are keyed by the tuple of label values, in 'labelnames' order.
+    Thread-safe, since database calls report from executor threads.
+    """
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _format_labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{self._format_labels(key)} {_format_number(value)}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts..., sum, count]
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def _render_value(self, key, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{self._format_labels(key, [('le', _format_number(bound))])} {cumulative}")
+        lines.append(f"{self.name}_bucket{self._format_labels(key, [('le', '+Inf')])} {state[-1]}")
+        lines.append(f"{self.name}_sum{self._format_labels(key)} {_format_number(state[-2])}")
+        lines.append(f"{self.name}_count{self._format_labels(key)} {state[-1]}")
+        return lines
+
+class _NullMetric:
+    """
+    Stands in for every metric while METRICS_ENABLED is False, so instrumented code pays one no-op call.
+    """
+    def inc(self, amount: float = 1, **labels):
+        pass
+
+    def set(self, value: float, **labels):
+        pass
+
+    def observe(self, value: float, **labels):
+        pass
+
+_NULL_METRIC = _NullMetric()
+_registry = []
+
+def _format_number(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+def _register(metric):
+    if not config.METRICS_ENABLED:
+        return _NULL_METRIC
+    _registry.append(metric)
+    return metric
+
+def counter(name: str, documentation: str, labelnames=()):
+    return _register(Counter(name, documentation, labelnames))
+
+def gauge(name: str, documentation: str, labelnames=()):
+    return _register(Gauge(name, documentation, labelnames))
+
+def histogram(name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+def timed(metric, **labels):
+    """
+    Decorator that observes a function's run time in 'metric'.
+    Returns the function unchanged while metrics are disabled.
+    """
+    def decorator(func):
+        if metric is _NULL_METRIC:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metric.observe(time.perf_counter() - started, **labels)
+        return wrapper
+    return decorator
+
+def render():
+    """
+    All registered metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# --- Metrics shared across the bot ---
+BATTLEMETRICS_REQUESTS = counter(
+    "asa_pop_battlemetrics_requests_total", "BattleMetrics HTTP requests by endpoint and status", ("endpoint", "status"))
+BATTLEMETRICS_LATENCY = histogram(
+    "asa_pop_battlemetrics_request_seconds", "BattleMetrics HTTP request latency", ("endpoint", "status"))
+DB_STATEMENT_SECONDS = histogram(
+    "asa_pop_db_statement_seconds", "Time spent in database calls, including waiting for the connection lock", ("query",))
+GRAPH_RENDER_SECONDS = histogram(
+    "asa_pop_graph_render_seconds", "Graph render time as seen by the command, including the render pool queue", ("kind",))
+GRAPH_PNG_BYTES = histogram(
+    "asa_pop_graph_png_bytes", "Size of rendered graph PNGs", ("kind",),
+    buckets=(16_384, 32_768, 65_536, 131_072, 262_144, 524_288, 1_048_576))
+SWEEP_SECONDS = histogram(
+    "asa_pop_sweep_seconds", "Duration of background polling sweeps", ("task",))
+SWEEP_SERVERS = counter(
+    "asa_pop_sweep_servers_total", "Servers processed by background polling sweeps", ("task",))
+POLL_LAG_SECONDS = histogram(
+    "asa_pop_poll_lag_seconds", "How late monitored servers were polled relative to their scheduled time")
+DISCORD_SEND_SECONDS = histogram(
+    "asa_pop_discord_send_seconds", "Latency of notification DMs by result", ("result",))
+EVENT_LOOP_LAG_SECONDS = histogram(
+    "asa_pop_event_loop_lag_seconds", "How late the event loop woke a sleeping probe task")
+EVENT_LOOP_LAG_LAST = gauge(
+    "asa_pop_event_loop_lag_last_seconds", "Most recent event-loop lag probe")
+
+async def monitor_loop_lag(interval: float):
+    """
+    Background task that sleeps 'interval' seconds at a time and records how late it wakes up.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - started - interval)
+        EVENT_LOOP_LAG_SECONDS.observe(lag)
+        EVENT_LOOP_LAG_LAST.set(lag)
+
+_runner = None
+
+async def start_server():
+    """
+    Serves render() at http://METRICS_HOST:METRICS_PORT/metrics. Does nothing while metrics are disabled.
+    """
+    global _runner
+    if not config.METRICS_ENABLED or _runner is not None:
+        return
+    from aiohttp import web
+
+    async def handle_metrics(request):
+        return web.Response(text=render(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Prometheus-Format": "0.0.4"})
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    _runner = web.AppRunner(app, access_log=None)
+    await _runner.setup()
+    await web.TCPSite(_runner, config.METRICS_HOST, config.METRICS_PORT).start()
+    print(f"Serving metrics on http://{config.METRICS_HOST}:{config.METRICS_PORT}/metrics")
+
+async def stop_server():
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
@@ -0,0 +1,325 @@
+# src/utils/timeseries.py
+import os
+import struct
+import threading
+
+import numpy as np
+
+import config
+
+def empty_series():
+    """
+    A series with no samples, in the same shape the stores return.
+    """
+    return {'timestamp': np.empty(0, dtype=np.int64), 'population': np.empty(0, dtype=np.int32)}
+
+def step_series(series, start: int, end: int, resolution: int, max_gap: int):
+    """
+    Rebuilds a series stored as change points: the samples at or after 'start', plus a point on
+    every multiple of 'resolution' up to 'end' that carries the latest sample forward, so flat
+    stretches that were never written show up like regularly polled data.
+    A value is never carried more than 'max_gap' seconds past its sample; a longer silence means
+    the server wasn't observed (the bot was down or the server gone) and stays a gap.
+    """
+    timestamps = series['timestamp']
+    populations = series['population']
+    if timestamps.size == 0:
+        return empty_series()
+    grid = np.arange(-(-start // resolution) * resolution, end + 1, resolution, dtype=np.int64)
+    points = np.union1d(grid, timestamps[timestamps >= start])
+    latest = np.searchsorted(timestamps, points, side='right') - 1
+    valid = latest >= 0
+    valid[valid] = points[valid] - timestamps[latest[valid]] <= max_gap
+    return {'timestamp': points[valid], 'population': populations[latest[valid]].astype(np.int32)}
+
+class SQLiteStore:
+    """
+    Raw samples in the population_data table, keyed by the integer id from the servers table.
+    Every method takes a cursor from database.transaction(), so writes share the caller's transaction.
+    """
+    name = "sqlite"
+
+    def append(self, cursor, pop_rows):
+        """
+        Stores (server_id, timestamp, population) samples. A sample at an existing timestamp replaces it.
+        """
+        cursor.executemany('INSERT OR IGNORE INTO servers (server_id) VALUES (?)',
+                           [(server_id,) for server_id in {row[0] for row in pop_rows}])
+        cursor.executemany('''
+            INSERT OR REPLACE INTO population_data (server_key, timestamp, population)
+            VALUES ((SELECT id FROM servers WHERE server_id = ?), ?, ?)
+        ''', pop_rows)
+
+    def read(self, cursor, server_ids, since: int):
+        """
+        Returns {server_id: {'timestamp': int64 array, 'population': int32 array}} for samples at or
+        after 'since'. Servers without data are left out.
+        """
+        server_ids = list(server_ids)
+        if not server_ids:
+            return {}
+        placeholders = ", ".join("?" for _ in server_ids)
+        id_width = max(len(sid) for sid in server_ids)
+        cursor.row_factory = None # Plain tuples are what np.fromiter consumes fastest
+        cursor.execute(f'''
+            SELECT s.server_id, p.timestamp, p.population
+            FROM servers s JOIN population_data p ON p.server_key = s.id
+            WHERE s.server_id IN ({placeholders}) AND p.timestamp >= ?
+            ORDER BY s.server_id, p.timestamp
+        ''', (*server_ids, since))
+        rows = np.fromiter(cursor, dtype=[('server_id', f'U{id_width}'), ('timestamp', 'i8'), ('population', 'i4')])
+        ids = rows['server_id']
+        if ids.size == 0:
+            return {}
+        # Rows arrive grouped by server, so each server is one contiguous slice between change points
+        boundaries = np.flatnonzero(ids[1:] != ids[:-1]) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [ids.size]))
+        return {str(ids[start]): {'timestamp': rows['timestamp'][start:end],
+                                  'population': rows['population'][start:end]}
+                for start, end in zip(starts, ends)}
+
+    def prune(self, cursor, before: int):
+        """
+        Deletes samples older than 'before'. Returns the number of samples deleted.
+        """
+        cursor.execute('DELETE FROM population_data WHERE timestamp < ?', (before,))
+        return cursor.rowcount
+
+    def server_ids(self, cursor):
+        cursor.execute('SELECT server_id FROM servers s WHERE EXISTS (SELECT 1 FROM population_data WHERE server_key = s.id)')
+        return [row[0] for row in cursor.fetchall()]
+
+    def delete_servers(self, cursor, server_ids):
+        """
+        Deletes every sample of the given servers.
+        """
+        cursor.executemany('DELETE FROM population_data WHERE server_key = (SELECT id FROM servers WHERE server_id = ?)',
+                           [(str(server_id),) for server_id in server_ids])
+
+class ColumnarFileStore:
+    """
+    One append-only file per server under 'root_dir'.
+    - A 32 byte header holds the format version, the population width and the
+      first/last timestamps and record count.
+    - Each record is a uint16 seconds-since-previous-sample followed by a uint8
+      population. The file switches to uint16 the first time a population needs it.
+    - A gap longer than 65535s is written as filler records with the GAP population,
+      which only advance time.
+    - Reads memory-map the records and rebuild timestamps with a cumulative sum.
+    - Samples newer than a file's last timestamp are appended; older ones (e.g. an imported
+      backfill) are merged in by rewriting the file.
+    - Appends write the records first and update the header last. A torn append is
+      discarded the next time the file is opened.
+    The cursor arguments only exist so both stores share one interface.
+    """
+    name = "columnar"
+    MAGIC = b"ASAPOP"
+    VERSION = 1
+    HEADER = struct.Struct("<6sBBqqq") # magic, version, population width (bytes), base_ts, last_ts, record count
+    MAX_DELTA = 0xFFFF
+    SUFFIX = ".pop"
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self._lock = threading.Lock()
+        os.makedirs(root_dir, exist_ok=True)
+
+    @staticmethod
+    def _dtype(width: int):
+        return np.dtype([('delta', '<u2'), ('population', '<u1' if width == 1 else '<u2')])
+
+    @staticmethod
+    def _gap(width: int):
+        return 0xFF if width == 1 else 0xFFFF
+
+    def _path(self, server_id: str):
+        safe_id = "".join(c for c in str(server_id) if c.isalnum() or c == "-")
+        return os.path.join(self.root_dir, safe_id + self.SUFFIX)
+
+    def _read_header(self, f):
+        raw = f.read(self.HEADER.size)
+        if len(raw) < self.HEADER.size:
+            return None
+        magic, version, width, base_ts, last_ts, count = self.HEADER.unpack(raw)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"{f.name} is not a population file (or a newer format version)")
+        return width, base_ts, last_ts, count
+
+    def _encode(self, timestamps, populations, prev_ts, width: int):
+        """
+        Turns strictly increasing samples into records, with deltas relative to 'prev_ts'
+        (None when the file is empty, making the first delta 0).
+        """
+        deltas = np.diff(timestamps, prepend=timestamps[0] if prev_ts is None else prev_ts)
+        gaps = np.maximum(deltas - 1, 0) // self.MAX_DELTA # Filler records needed before each sample
+        positions = np.arange(timestamps.size) + np.cumsum(gaps)
+        records = np.empty(timestamps.size + int(gaps.sum()), dtype=self._dtype(width))
+        records['delta'] = self.MAX_DELTA
+        records['population'] = self._gap(width)
+        records['delta'][positions] = deltas - gaps * self.MAX_DELTA
+        records['population'][positions] = populations
+        return records
+
+    def _load(self, path: str):
+        """
+        Returns (width, timestamps, populations) for every sample in a file, or None if it doesn't exist.
+        The records are memory-mapped; the returned arrays are copies, so the map is released on return.
+        """
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        with f:
+            header = self._read_header(f)
+        if header is None:
+            return None
+        width, base_ts, _, count = header
+        if count == 0:
+            return width, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32)
+        records = np.memmap(path, dtype=self._dtype(width), mode="r", offset=self.HEADER.size, shape=(count,))
+        timestamps = base_ts + np.cumsum(records['delta'], dtype=np.int64)
+        real = records['population'] != self._gap(width)
+        return width, timestamps[real], records['population'][real]
+
+    def _rewrite(self, path: str, timestamps, populations, width: int):
+        """
+        Atomically replaces a file with the given samples.
+        """
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            if timestamps.size:
+                records = self._encode(timestamps, populations, None, width)
+                f.write(self.HEADER.pack(self.MAGIC, self.VERSION, width, int(timestamps[0]),
+                                         int(timestamps[-1]), records.size))
+                f.write(records.tobytes())
+            else:
+                f.write(self.HEADER.pack(self.MAGIC, self.VERSION, width, 0, 0, 0))
+        os.replace(tmp_path, path)
+
+    def append_series(self, server_id: str, timestamps, populations):
+        """
+        Appends samples for one server. Returns the number of samples stored.
+        Like INSERT OR REPLACE, a sample at a timestamp the file already holds replaces it.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        populations = np.clip(np.asarray(populations, dtype=np.int64), 0, 0xFFFE)
+        if timestamps.size == 0:
+            return 0
+        order = np.argsort(timestamps, kind="stable")
+        timestamps, populations = timestamps[order], populations[order]
+        # Like INSERT OR REPLACE, the last sample at a given timestamp wins
+        last_of_run = np.append(timestamps[1:] != timestamps[:-1], True)
+        timestamps, populations = timestamps[last_of_run], populations[last_of_run]
+
+        path = self._path(server_id)
+        with self._lock:
+            try:
+                f = open(path, "r+b")
+            except FileNotFoundError:
+                width = 1 if populations.max() < self._gap(1) else 2
+                self._rewrite(path, timestamps, populations, width)
+                return int(timestamps.size)
+            with f:
+                width, base_ts, last_ts, count = self._read_header(f)
+                wider = width == 1 and populations.max() >= self._gap(1)
+                if wider or (count and timestamps[0] <= last_ts):
+                    # Out-of-order samples, or populations that need the file widened to uint16:
+                    # merge with what's stored and rewrite the whole file
+                    f.close()
+                    _, old_ts, old_pops = self._load(path)
+                    kept = ~np.isin(old_ts, timestamps)
+                    merged_ts = np.concatenate((old_ts[kept], timestamps))
+                    order = np.argsort(merged_ts, kind="stable")
+                    merged_pops = np.concatenate((old_pops[kept].astype(np.int64), populations))
+                    self._rewrite(path, merged_ts[order], merged_pops[order], 2 if wider else width)
+                    return int(timestamps.size)
+                records = self._encode(timestamps, populations, last_ts if count else None, width)
+                if not count:
+                    base_ts = int(timestamps[0])
+                # Anything past 'count' records is a torn append and gets overwritten
+                f.seek(self.HEADER.size + count * records.dtype.itemsize)
+                f.write(records.tobytes())
+                f.truncate()
+                f.seek(0)
+                f.write(self.HEADER.pack(self.MAGIC, self.VERSION, width, base_ts,
+                                         int(timestamps[-1]), count + records.size))
+        return int(timestamps.size)
+
+    def append(self, cursor, pop_rows):
+        """
+        Stores (server_id, timestamp, population) samples, grouped into one append per server.
+        """
+        by_server = {}
+        for server_id, timestamp, population in pop_rows:
+            series = by_server.setdefault(str(server_id), ([], []))
+            series[0].append(timestamp)
+            series[1].append(population)
+        for server_id, (timestamps, populations) in by_server.items():
+            self.append_series(server_id, timestamps, populations)
+
+    def read(self, cursor, server_ids, since: int):
+        """
+        Returns {server_id: {'timestamp': int64 array, 'population': int32 array}} for samples at or
+        after 'since'. Servers without data are left out.
+        """
+        results = {}
+        for server_id in server_ids:
+            with self._lock:
+                loaded = self._load(self._path(server_id))
+            if loaded is None:
+                continue
+            _, timestamps, populations = loaded
+            start = np.searchsorted(timestamps, since) # Timestamps are strictly increasing
+            if start < timestamps.size:
+                results[str(server_id)] = {'timestamp': timestamps[start:],
+                                           'population': populations[start:].astype(np.int32)}
+        return results
+
+    def prune(self, cursor, before: int):
+        """
+        Rewrites files that hold samples older than 'before' and deletes files left empty.
+        Returns the number of samples deleted.
+        """
+        deleted = 0
+        with self._lock:
+            for server_id in self.server_ids(cursor):
+                path = self._path(server_id)
+                loaded = self._load(path)
+                if loaded is None:
+                    continue
+                width, timestamps, populations = loaded
+                start = int(np.searchsorted(timestamps, before))
+                if start == 0:
+                    continue
+                deleted += start
+                if start == timestamps.size:
+                    os.remove(path)
+                else:
+                    self._rewrite(path, timestamps[start:], populations[start:], width)
+        return deleted
+
+    def server_ids(self, cursor=None):
+        return [name[:-len(self.SUFFIX)] for name in os.listdir(self.root_dir) if name.endswith(self.SUFFIX)]
+
+    def delete_servers(self, cursor, server_ids):
+        """
+        Deletes the files of the given servers.
+        """
+        with self._lock:
+            for server_id in server_ids:
+                try:
+                    os.remove(self._path(server_id))
+                except FileNotFoundError:
+                    pass
+
+def make_store(backend: str = None):
+    """
+    Creates the raw sample store selected by POP_STORAGE_BACKEND ("sqlite" or "columnar").
+    """
+    backend = backend or config.POP_STORAGE_BACKEND
+    if backend == SQLiteStore.name:
+        return SQLiteStore()
+    if backend == ColumnarFileStore.name:
+        return ColumnarFileStore(config.POP_COLUMNAR_DIR)
+    raise ValueError(f"Unknown POP_STORAGE_BACKEND '{backend}'")
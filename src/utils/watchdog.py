@@ -0,0 +1,150 @@
+# src/utils/watchdog.py
+import asyncio
+import collections
+import logging
+import sys
+import threading
+import time
+import traceback
+
+import config
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+STALLS = metrics.counter("asa_pop_event_loop_stalls_total", "Times the event loop was blocked past WATCHDOG_THRESHOLD")
+
+def _describe_task(loop):
+    """
+    Name and coroutine of the task the loop is currently running, read from another thread.
+    Best effort: the loop may switch tasks while we look.
+    """
+    try:
+        task = asyncio.current_task(loop)
+    except RuntimeError:
+        return None
+    if task is None:
+        return None
+    coro = task.get_coro()
+    return f"{task.get_name()} ({getattr(coro, '__qualname__', coro)})"
+
+class LoopWatchdog:
+    """
+    Detects event-loop stalls from a separate thread.
+    - A heartbeat coroutine on the loop records the time every 'interval' seconds.
+    - The watchdog thread checks the heartbeat. When it is older than 'threshold',
+      the loop is blocked by whatever is on the loop thread's stack right now, so that
+      stack (and the running task) is captured and logged once per stall.
+    The most recent 'max_reports' stalls are kept in 'reports' for the admin commands.
+    """
+    def __init__(self, threshold: float, interval: float, max_reports: int):
+        self.threshold = threshold
+        self.interval = interval
+        self.reports = collections.deque(maxlen=max_reports)
+        self._loop = None
+        self._loop_thread_id = None
+        self._last_beat = time.monotonic()
+        self._heartbeat_task = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    async def _heartbeat(self):
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def start(self, loop):
+        """
+        Starts watching 'loop'. Must be called from the loop's own thread.
+        """
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._heartbeat_task = loop.create_task(self._heartbeat())
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+
+    def _watch(self):
+        report = None # The stall being tracked, if the loop is blocked right now
+        while not self._stop.wait(self.interval / 2):
+            blocked_for = time.monotonic() - self._last_beat - self.interval
+            if blocked_for < self.threshold:
+                if report is not None:
+                    logger.warning("Event loop was blocked for %.2fs by %s", report["blocked_for"], report["task"])
+                    report = None
+                continue
+            if report is None:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                report = {
+                    "at": time.time(),
+                    "blocked_for": blocked_for,
+                    "task": _describe_task(self._loop) or "a callback outside any task",
+                    "stack": "".join(traceback.format_stack(frame)) if frame is not None else "",
+                }
+                self.reports.append(report)
+                STALLS.inc()
+                logger.warning("Event loop blocked for %.2fs (threshold %.2fs) by %s:\n%s",
+                               blocked_for, self.threshold, report["task"], report["stack"])
+            else:
+                report["blocked_for"] = blocked_for
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename}:{frame.f_lineno})"
+
+def sample_profile(thread_id: int, duration: float, interval: float):
+    """
+    Sampling profiler: records the stack of thread 'thread_id' every 'interval' seconds for
+    'duration' seconds, then returns (samples, folded) where 'folded' maps a
+    "outer;...;inner" stack (the format flame graph tools read) to its sample count.
+    Run it from another thread; it only reads the target thread's frames.
+    """
+    folded = collections.Counter()
+    samples = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            folded[";".join(reversed(labels))] += 1
+            samples += 1
+        time.sleep(interval)
+    return samples, folded
+
+def format_profile(samples: int, folded, top: int = 25):
+    """
+    Text report of a sample_profile() result: functions by inclusive and self time, then the
+    folded stacks themselves.
+    """
+    inclusive = collections.Counter()
+    own = collections.Counter()
+    for stack, count in folded.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for label in set(frames):
+            inclusive[label] += count
+
+    lines = [f"{samples} samples"]
+    for title, counter in (("Inclusive (on the stack)", inclusive), ("Self (top of the stack)", own)):
+        lines.append("")
+        lines.append(title)
+        for label, count in counter.most_common(top):
+            lines.append(f"{count / max(samples, 1):7.1%} {count:7d}  {label}")
+    lines.append("")
+    lines.append("Folded stacks")
+    lines.extend(f"{stack} {count}" for stack, count in folded.most_common())
+    return "\n".join(lines) + "\n"
+
+# Started from bot.py's main(); the admin commands read its reports
+watchdog = LoopWatchdog(config.WATCHDOG_THRESHOLD, config.WATCHDOG_INTERVAL, config.WATCHDOG_MAX_REPORTS)
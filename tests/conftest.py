@@ -0,0 +1,36 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+# Make config.py and src/ importable when pytest runs from anywhere
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from src.utils import database
+
+@pytest.fixture
+def db_file(tmp_path, monkeypatch):
+    """
+    Points the database (and the columnar sample directory) at an empty tmp_path and resets the
+    module's connection, store and write queue. Returns the database path; nothing is created yet.
+    """
+    path = tmp_path / "data" / "pop_data.db"
+    monkeypatch.setattr(config, "DATABASE_FILE", str(path))
+    monkeypatch.setattr(config, "POP_COLUMNAR_DIR", str(tmp_path / "data" / "population"))
+    monkeypatch.setattr(database, "_connection", None)
+    monkeypatch.setattr(database, "_raw_store", None)
+    monkeypatch.setattr(database, "_last_raw_samples", {})
+    monkeypatch.setattr(database, "_pending_pop_rows", [])
+    monkeypatch.setattr(database, "_pending_status_rows", [])
+    yield path
+    database.close_db()
+
+@pytest.fixture
+def db(db_file):
+    """
+    A freshly initialized database (see db_file); yields the database module.
+    """
+    database.init_db()
+    return database
@@ -0,0 +1,160 @@
+# tests/test_history_io.py
+import asyncio
+import os
+import time
+import types
+
+import numpy as np
+import pytest
+from discord.ext import commands
+from discord.ext.commands.view import StringView
+
+import config
+from src.commands.admin import AdminCommands
+from src.utils import database
+from src.utils import history_io
+from src.utils import timeseries
+
+def record_history(count: int = 50):
+    """
+    Writes 'count' changing samples ten minutes apart for two servers. Returns them sorted.
+    """
+    now = int(time.time()) - count * 600
+    rows = [(server_id, now + i * 600, (i * 7 + offset) % 60)
+            for server_id, offset in (("100", 0), ("200", 3)) for i in range(count)]
+    database.insert_pop_data_bulk(rows)
+    return sorted(rows)
+
+def snapshot():
+    raw = sorted(row for rows in database.iter_pop_rows() for row in rows)
+    rollups = {table: sorted(row for rows in database.iter_rollup_rows(table) for row in rows)
+               for table in database.ROLLUP_TABLES}
+    return raw, rollups
+
+def use_new_database(tmp_path, monkeypatch, name: str):
+    database.close_db()
+    monkeypatch.setattr(config, "DATABASE_FILE", str(tmp_path / name / "pop_data.db"))
+    monkeypatch.setattr(config, "POP_COLUMNAR_DIR", str(tmp_path / name / "population"))
+    monkeypatch.setattr(database, "_raw_store", None)
+    monkeypatch.setattr(database, "_last_raw_samples", {})
+    database.init_db()
+
+@pytest.fixture(params=["sqlite", "columnar"])
+def backend_db(request, monkeypatch, db_file):
+    monkeypatch.setattr(config, "POP_STORAGE_BACKEND", request.param)
+    database.init_db()
+    return database
+
+@pytest.mark.parametrize("fmt", history_io.FORMATS)
+def test_export_import_round_trip(backend_db, tmp_path, monkeypatch, fmt):
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+    rows = record_history()
+    before = snapshot()
+    assert before[0] == rows
+    path = str(tmp_path / f"population.{'csv.gz' if fmt == 'csv' else 'parquet'}")
+    exported = history_io.export_population(path, batch_size=16)
+
+    use_new_database(tmp_path, monkeypatch, "restored")
+    imported = history_io.import_population(path, batch_size=16)
+    assert imported == exported
+    assert exported['raw'] == len(rows)
+    assert snapshot() == before
+
+def test_import_merges_older_samples_into_columnar_files(tmp_path):
+    store = timeseries.ColumnarFileStore(str(tmp_path))
+    assert store.append_series("100", [1000, 2000], [5, 6]) == 2
+    # An imported backfill is older than the file's last sample; a repeated timestamp is replaced
+    assert store.append_series("100", [500, 1500, 2000], [1, 2, 300]) == 3
+    series = store.read(None, ["100"], 0)["100"]
+    assert series['timestamp'].tolist() == [500, 1000, 1500, 2000]
+    assert series['population'].tolist() == [1, 5, 2, 300]
+    assert store.append_series("100", [3000], [7]) == 1
+    assert store.read(None, ["100"], 0)["100"]['timestamp'].tolist() == [500, 1000, 1500, 2000, 3000]
+
+def test_bot_writes_get_in_between_import_batches(db, monkeypatch):
+    # A short timeout, so a write stuck behind the import fails fast instead of waiting it out
+    database.close_db()
+    monkeypatch.setattr(config, "DB_BUSY_TIMEOUT_MS", 100)
+    now = int(time.time())
+
+    def batches():
+        for i in range(3):
+            yield "raw", [("100", now - 3600 + i * 60 + j, 10 + j) for j in range(60)]
+            database.insert_pop_data("200", 42)
+            database.flush_writes()
+            assert not database._has_pending_writes()
+
+    assert database.import_history(batches()) == {"raw": 180}
+    raw, _ = snapshot()
+    assert sum(row[0] == "100" for row in raw) == 180
+    assert sum(row[0] == "200" for row in raw) == 1 # Later writes are unchanged samples
+    with database.transaction() as cursor:
+        indexes = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {name for name, _ in database._BULK_LOAD_INDEXES} <= indexes
+
+class FakeContext:
+    guild = None
+
+    def __init__(self):
+        self.messages = []
+        self.files = []
+
+    async def send(self, content=None, file=None):
+        self.messages.append(content)
+        if file is not None:
+            self.files.append(file.filename)
+
+def test_exportpop_format_can_be_given_without_days():
+    cog = AdminCommands(None)
+
+    async def parse(text):
+        ctx = commands.Context(message=types.SimpleNamespace(_state=None, attachments=[]), bot=None,
+                               view=StringView(text), prefix="/", command=cog.exportpop)
+        await cog.exportpop._parse_arguments(ctx)
+        return ctx.args[1:]
+
+    assert asyncio.run(parse("parquet")) == [0, "parquet"]
+    assert asyncio.run(parse("7 parquet")) == [7.0, "parquet"]
+    assert asyncio.run(parse("")) == [0, "csv"]
+
+@pytest.mark.parametrize("fmt", history_io.FORMATS)
+def test_exportpop_sends_each_format(db, tmp_path, monkeypatch, fmt):
+    monkeypatch.setattr(config, "EXPORT_DIR", str(tmp_path / "exports"))
+    record_history()
+    ctx = FakeContext()
+    asyncio.run(AdminCommands.exportpop.callback(AdminCommands(None), ctx, 1, fmt))
+    try:
+        import pyarrow
+    except ImportError:
+        pyarrow = None
+    if fmt == "parquet" and pyarrow is None:
+        assert ctx.messages[-1].startswith("Export failed: Parquet export/import needs pyarrow")
+        assert not ctx.files
+    else:
+        assert ctx.messages[-1].startswith("Exported 100 raw samples")
+        assert ctx.files[0].endswith(".csv.gz" if fmt == "csv" else ".parquet")
+    # Sent or failed, nothing is left behind
+    assert os.listdir(config.EXPORT_DIR) == []
+
+def test_exportpop_removes_a_failed_export(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "EXPORT_DIR", str(tmp_path / "exports"))
+
+    def failing_export(path, fmt, since):
+        with open(path, "wb") as f:
+            f.write(b"partial")
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(history_io, "export_population", failing_export)
+    os.makedirs(config.EXPORT_DIR)
+    ctx = FakeContext()
+    asyncio.run(AdminCommands.exportpop.callback(AdminCommands(None), ctx, 0, "csv"))
+    assert ctx.messages[-1] == "Export failed: No space left on device"
+    assert os.listdir(config.EXPORT_DIR) == []
+
+@pytest.mark.parametrize("days", [-1, float("inf"), float("nan")])
+def test_exportpop_rejects_bad_days(tmp_path, monkeypatch, days):
+    monkeypatch.setattr(config, "EXPORT_DIR", str(tmp_path / "exports"))
+    ctx = FakeContext()
+    asyncio.run(AdminCommands.exportpop.callback(AdminCommands(None), ctx, days, "csv"))
+    assert ctx.messages == ["Days must be 0 (all history) or a positive number."]
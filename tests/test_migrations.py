@@ -0,0 +1,71 @@
+# tests/test_migrations.py
+import sqlite3
+import time
+
+from src.utils import database
+
+def make_baseline_db(path):
+    """
+    Creates a database the way the original bot did (before MIGRATIONS existed): TEXT server IDs
+    in every population row and one notify_user_id per monitored server.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    now = int(time.time())
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE population_data (
+            server_id TEXT NOT NULL,
+            timestamp INTEGER NOT NULL,
+            population INTEGER NOT NULL,
+            PRIMARY KEY (server_id, timestamp)
+        );
+        CREATE TABLE monitored_servers (
+            server_id TEXT PRIMARY KEY,
+            notify_user_id INTEGER NOT NULL,
+            last_known_status TEXT DEFAULT 'unknown',
+            last_status_check INTEGER DEFAULT 0
+        );
+    ''')
+    conn.executemany('INSERT INTO population_data VALUES (?, ?, ?)',
+                     [("100", now - 3600, 10), ("100", now - 1800, 20), ("200", now - 600, 5)])
+    conn.executemany('INSERT INTO monitored_servers VALUES (?, ?, ?, ?)',
+                     [("100", 1, "online", now), ("200", 2, "offline", now)])
+    conn.commit()
+    conn.close()
+    return now
+
+def user_version():
+    with database.transaction() as cursor:
+        return cursor.execute('PRAGMA user_version').fetchone()[0]
+
+def test_baseline_database_is_migrated(db_file):
+    now = make_baseline_db(db_file)
+    database.init_db()
+
+    assert user_version() == len(database.MIGRATIONS)
+    servers = {server['server_id']: server for server in database.get_monitored_servers()}
+    assert servers["100"]['subscriber_ids'] == [1]
+    assert servers["200"]['subscriber_ids'] == [2]
+    assert servers["200"]['last_known_status'] == "offline"
+    with database.transaction() as cursor:
+        columns = [row['name'] for row in cursor.execute('PRAGMA table_info(monitored_servers)')]
+    assert 'notify_user_id' not in columns
+
+    samples = sorted(row for rows in database.iter_pop_rows() for row in rows)
+    assert samples == [("100", now - 3600, 10), ("100", now - 1800, 20), ("200", now - 600, 5)]
+    # The rollups are built from the migrated raw samples
+    hourly = database._get_rollups("population_hourly", "200", 0)
+    assert sum(bucket['sample_count'] for bucket in hourly) == 1
+
+def test_migrations_run_once(db_file, capsys):
+    make_baseline_db(db_file)
+    database.init_db()
+    assert "Applied database migration" in capsys.readouterr().out
+    database.init_db()
+    assert "Applied database migration" not in capsys.readouterr().out
+    assert len(database.get_monitored_servers()) == 2
+
+def test_new_database_starts_at_latest_version(db):
+    assert user_version() == len(database.MIGRATIONS)
+    database.add_monitored_server("300", 3)
+    assert database.get_monitored_servers()[0]['subscriber_ids'] == [3]
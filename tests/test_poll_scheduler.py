@@ -0,0 +1,78 @@
+# tests/test_poll_scheduler.py
+import asyncio
+import time
+
+import pytest
+
+import config
+from src.notifications.poll_scheduler import PollScheduler
+from src.notifications.status_poller import StatusPoller
+from src.services import battlemetrics_api
+from src.services.battlemetrics_api import BattleMetricsAPIError
+
+SERVERS = [{'server_id': '1', 'subscriber_ids': [10]}, {'server_id': '2', 'subscriber_ids': [20]}]
+
+def make_scheduler():
+    return PollScheduler(min_interval=30, max_interval=600, volatility_window=3600)
+
+def test_popped_servers_wait_for_record_or_retry():
+    scheduler = make_scheduler()
+    scheduler.sync(SERVERS, now=0)
+    assert scheduler.pop_due(budget=1, now=0) == ['1']
+    assert scheduler.pop_due(budget=10, now=0) == ['2']
+    assert scheduler.next_due_in(now=0) is None
+
+    scheduler.record('1', 'online', now=0)
+    scheduler.retry('2', now=0)
+    assert scheduler.next_due_in(now=0) == 30 # The retry keeps the starting (min) interval
+    assert scheduler.pop_due(budget=10, now=30) == ['2']
+    assert scheduler.pop_due(budget=10, now=600) == ['1']
+
+def test_sync_drops_removed_servers():
+    scheduler = make_scheduler()
+    scheduler.sync(SERVERS, now=0)
+    scheduler.sync(SERVERS[:1], now=0)
+    assert len(scheduler) == 1
+    assert scheduler.pop_due(budget=10, now=0) == ['1']
+
+@pytest.fixture
+def poller(monkeypatch):
+    monkeypatch.setattr(config, "COLLECTOR_ENABLED", False)
+    poller = StatusPoller(on_status_change=None)
+
+    async def monitored_servers():
+        return SERVERS
+
+    monkeypatch.setattr(poller, "_monitored_servers", monitored_servers)
+    return poller
+
+def due_after_min_interval(poller):
+    return sorted(poller.scheduler.pop_due(budget=10, now=time.monotonic() + config.STATUS_POLL_MIN_INTERVAL + 1))
+
+def test_failed_fetch_reschedules_popped_servers(poller, monkeypatch):
+    async def failing_fetch(*args, **kwargs):
+        raise BattleMetricsAPIError("BattleMetrics is down")
+
+    monkeypatch.setattr(battlemetrics_api, "get_server_records_bulk", failing_fetch)
+    with pytest.raises(BattleMetricsAPIError):
+        asyncio.run(poller.tick())
+    assert due_after_min_interval(poller) == ['1', '2']
+
+def test_failed_check_reschedules_only_that_server(poller, monkeypatch):
+    async def fetch(server_ids, **kwargs):
+        return {server_id: battlemetrics_api._parse_server(
+            {"id": server_id, "attributes": {"name": f"Server {server_id}", "status": "online",
+                                             "players": 5, "maxPlayers": 70}}, check_game=False)
+                for server_id in server_ids}
+
+    async def process_server_status(server_data, server_info, collected=False):
+        if server_data['server_id'] == '2':
+            raise RuntimeError("notification failed")
+
+    monkeypatch.setattr(battlemetrics_api, "get_server_records_bulk", fetch)
+    monkeypatch.setattr(poller, "process_server_status", process_server_status)
+    with pytest.raises(RuntimeError):
+        asyncio.run(poller.tick())
+    # '1' was recorded as online (slow poll); '2' is retried at the minimum interval
+    assert due_after_min_interval(poller) == ['2']
+    assert poller.scheduler._servers['1']['status'] == 'online'
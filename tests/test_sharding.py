@@ -0,0 +1,78 @@
+# tests/test_sharding.py
+import asyncio
+import sqlite3
+
+import pytest
+
+import config
+from src.notifications.status_notifier import StatusNotifier
+from src.services import population_collector
+from src.sharding import event_bus
+from src.sharding import worker
+
+def make_event(event_id="abc", server_id="100"):
+    return {'type': 'status_change', 'id': event_id, 'server_id': server_id, 'name': "Server",
+            'previous': 'offline', 'status': 'online', 'players': 5, 'max_players': 70,
+            'subscriber_ids': [1], 'at': 0}
+
+def test_recent_event_ids_drops_repeats():
+    recent = event_bus.RecentEventIds(max_size=2)
+    assert not recent.seen(make_event("a"))
+    assert recent.seen(make_event("a"))
+    assert not recent.seen(make_event("b"))
+    assert not recent.seen(make_event("c")) # Evicts "a"
+    assert not recent.seen(make_event("a"))
+    # Events from older workers carry no id and are always handled
+    assert not recent.seen({'type': 'status_change'})
+    assert not recent.seen({'type': 'status_change'})
+
+def test_consumer_handles_a_resent_event_once(tmp_path):
+    handled = []
+
+    async def handle_status_change(event):
+        handled.append(event['id'])
+
+    async def run():
+        server = event_bus.UnixSocketEventServer(str(tmp_path / "events.sock"))
+        publisher = event_bus.UnixSocketEventPublisher(server.path)
+        cog = StatusNotifier.__new__(StatusNotifier)
+        cog.event_bus = server
+        cog.seen_events = event_bus.RecentEventIds()
+        cog.handle_status_change = handle_status_change
+        await server.start()
+        try:
+            # A worker whose write failed midway sends the same event again
+            for event in (make_event("a"), make_event("a"), make_event("b")):
+                await publisher.publish(event)
+            for _ in range(3):
+                await asyncio.wait_for(StatusNotifier.consume_events_task.coro(cog), timeout=5)
+        finally:
+            await publisher.close()
+            await server.close()
+
+    asyncio.run(run())
+    assert handled == ["a", "b"]
+
+def test_collector_keeps_running_after_an_unexpected_error(monkeypatch):
+    calls = []
+
+    async def collect_official_populations():
+        calls.append(None)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return 10, True
+
+    monkeypatch.setattr(config, "COLLECTOR_ENABLED", True)
+    monkeypatch.setattr(config, "COLLECTOR_INTERVAL_MINUTES", 0)
+    monkeypatch.setattr(population_collector, "collect_official_populations", collect_official_populations)
+
+    async def run():
+        task = asyncio.create_task(worker._collect_forever())
+        while len(calls) < 2:
+            await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(asyncio.wait_for(run(), timeout=5))
+    assert len(calls) >= 2
@@ -0,0 +1,62 @@
+# tools/migrate_storage.py
+"""
+Copies raw population samples between the storage backends.
+
+    python tools/migrate_storage.py --to columnar
+    python tools/migrate_storage.py --to sqlite --delete-source
+
+Rollups, monitored servers and the server index stay in SQLite and are not touched.
+Re-running is safe: already copied samples are replaced (SQLite) or skipped (columnar).
+After migrating, set POP_STORAGE_BACKEND in config.py to the new backend.
+"""
+import argparse
+import os
+import sys
+import time
+
+# Make config.py and src/ importable when run from anywhere
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from src.utils import database
+from src.utils import timeseries
+
+def migrate(target: str, delete_source: bool = False):
+    source_store = timeseries.make_store("columnar" if target == "sqlite" else "sqlite")
+    target_store = timeseries.make_store(target)
+    database.init_db()
+    started = time.perf_counter()
+    servers = samples = 0
+
+    with database.transaction() as cursor:
+        server_ids = source_store.server_ids(cursor)
+        # Read everything; 0 keeps samples from the very start
+        for server_id in server_ids:
+            series = source_store.read(cursor, [server_id], 0).get(server_id)
+            if series is None:
+                continue
+            rows = list(zip([server_id] * series['timestamp'].size,
+                            series['timestamp'].tolist(), series['population'].tolist()))
+            target_store.append(cursor, rows)
+            servers += 1
+            samples += len(rows)
+            print(f"  {server_id}: {len(rows)} samples")
+
+        if delete_source:
+            source_store.delete_servers(cursor, server_ids)
+
+    print(f"Copied {samples} samples for {servers} servers from {source_store.name} to {target_store.name} "
+          f"in {time.perf_counter() - started:.1f}s.")
+    if config.POP_STORAGE_BACKEND != target:
+        print(f"Set POP_STORAGE_BACKEND = \"{target}\" in config.py to start using it.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy raw population samples between storage backends.")
+    parser.add_argument("--to", required=True, choices=("sqlite", "columnar"), help="Backend to copy samples into")
+    parser.add_argument("--delete-source", action="store_true", help="Remove the samples from the old backend afterwards")
+    args = parser.parse_args()
+    migrate(args.to, args.delete_source)
+    database.close_db()
+
+if __name__ == "__main__":
+    main()
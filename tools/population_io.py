@@ -0,0 +1,52 @@
+# tools/population_io.py
+"""
+Exports population history (raw samples plus hourly/daily rollups) to a file, or bulk-imports it.
+
+    python tools/population_io.py export data/exports/population.csv.gz --since-days 30
+    python tools/population_io.py export population.parquet
+    python tools/population_io.py import population.csv.gz
+
+Files are gzipped CSV or Parquet, picked by extension or --format, with one row per raw sample
+or rollup bucket (see history_io.COLUMNS). Parquet needs pyarrow installed. Exports stream in
+EXPORT_BATCH_ROWS batches, so memory use doesn't grow with the tables. Imports run on their own
+connection and commit each batch, so a running bot keeps reading and writing meanwhile; a failed
+import keeps the batches committed before it. Rollup buckets are merged into existing ones:
+importing the same file twice counts them twice.
+"""
+import argparse
+import os
+import sys
+import time
+
+# Make config.py and src/ importable when run from anywhere
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import database
+from src.utils import history_io
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or bulk-import population history.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Write history to a .csv.gz or .parquet file")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--since-days", type=float, help="Only export samples from the last N days")
+    import_parser = subparsers.add_parser("import", help="Load history from a .csv.gz or .parquet file")
+    import_parser.add_argument("path")
+    for subparser in (export_parser, import_parser):
+        subparser.add_argument("--format", choices=history_io.FORMATS, help="Override the format picked from the extension")
+        subparser.add_argument("--batch-size", type=int, help="Rows per batch (default EXPORT_BATCH_ROWS)")
+    args = parser.parse_args()
+
+    database.init_db()
+    started = time.perf_counter()
+    if args.command == "export":
+        since = int(time.time() - args.since_days * 24 * 3600) if args.since_days else 0
+        counts = history_io.export_population(args.path, args.format, since, args.batch_size)
+        print(f"Exported {history_io.describe_counts(counts)} to {args.path} in {time.perf_counter() - started:.1f}s.")
+    else:
+        counts = history_io.import_population(args.path, args.format, args.batch_size)
+        print(f"Imported {history_io.describe_counts(counts)} from {args.path} in {time.perf_counter() - started:.1f}s.")
+    database.close_db()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import asyncio
+import logging
+
+import config
+from src.services import http_client
+from src.services.rate_limiter import battlemetrics_limiter
+from src.sharding.event_bus import UnixSocketEventPublisher
+from src.sharding.worker import run_worker
+from src.utils import database
+from src.utils import executor
+from src.utils.watchdog import watchdog
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def main(shard: int, shards: int):
+    if config.WATCHDOG_ENABLED:
+        watchdog.start(asyncio.get_running_loop())
+    database.init_db()
+    await http_client.start()
+    # The workers split SHARD_WORKER_RATE_SHARE of the BattleMetrics budget; bot.py keeps the rest
+    battlemetrics_limiter.set_rate(config.BATTLEMETRICS_RATE_LIMIT_PER_MINUTE * config.SHARD_WORKER_RATE_SHARE / shards,
+                                   max(1, config.BATTLEMETRICS_RATE_LIMIT_BURST // shards))
+    flusher = asyncio.create_task(database.write_flusher(config.DB_FLUSH_INTERVAL))
+    bus = UnixSocketEventPublisher(config.SHARD_EVENT_SOCKET)
+    try:
+        await run_worker(shard, shards, bus)
+    finally:
+        flusher.cancel()
+        watchdog.stop()
+        await bus.close()
+        await http_client.close()
+        await executor.run_db(database.flush_writes, enforce_limit=False)
+        database.close_db()
+        executor.shutdown()
+
+# Runs one polling shard next to bot.py, e.g. with SHARD_COUNT = 2:
+#   python worker.py --shard 0
+#   python worker.py --shard 1
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Polls one consistent-hash slice of the monitored servers.")
+    parser.add_argument("--shard", type=int, required=True, help="This worker's shard number, 0 to shards-1")
+    parser.add_argument("--shards", type=int, default=config.SHARD_COUNT, help="Total workers (default: SHARD_COUNT)")
+    args = parser.parse_args()
+    if args.shards < 1 or not 0 <= args.shard < args.shards:
+        parser.error("--shard must be between 0 and --shards - 1, and --shards at least 1 (set SHARD_COUNT in config.py)")
+    try:
+        logger.info(f"Starting polling worker {args.shard}/{args.shards}...")
+        asyncio.run(main(args.shard, args.shards))
+    except KeyboardInterrupt:
+        pass